@@ -0,0 +1,137 @@
+"""
+Scripted-command throughput: one process per command vs. the daemon.
+
+Runs the same mix of commands (add-task, done, tasks, now and search) four
+ways against copies of one seeded corpus:
+
+- local:   a `src.client` process per command with no daemon running, so
+           each one loads the data it needs and saves its change
+- process: a `src.client` process per command talking to the daemon
+- batch:   one `src.client batch` process sending every command over one
+           connection
+- client:  PKMSClient calls from this process (the floor: socket round
+           trip plus the daemon's work)
+
+Usage (from FinalProject/task6):
+    python -m benchmarks.bench_daemon --size 10000 --commands 50 2000
+"""
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from src.models import Task
+from src.data_manager import DataManager
+from src.client import PKMSClient, build_parser, is_listening
+
+from . import datagen
+
+def generate(data_dir: str, size: int) -> List[str]:
+    """Writes `size` notes and tasks plus a week of schedules; returns the pending task IDs."""
+    dm = DataManager(data_dir=data_dir)
+    notes = list(datagen.knowledge_entries(size))
+    tasks = list(datagen.tasks(size, [n.id for n in notes]))
+    dm.save_data(notes, 'pkm')
+    dm.save_data(tasks, 'task')
+    dm.save_data(list(datagen.schedules(50)), 'schedule')
+    return [t.id for t in tasks if t.status == "pending"]
+
+def commands(n: int, pending_ids: List[str]) -> List[str]:
+    """A scripting-style mix, mostly edits: per ten commands, four add-task, two done, two tasks, a now and a search."""
+    words = datagen.WORDS
+    mix = []
+    for i in range(n):
+        kind = i % 10
+        if kind < 4:
+            mix.append(f"add-task 'Scripted task {i}' --due 2025-06-01 --description '{words[i % len(words)]} follow-up'")
+        elif kind < 6:
+            mix.append(f"done {pending_ids[(i // 10 * 2 + kind - 4) % len(pending_ids)]}")
+        elif kind < 8:
+            mix.append("tasks --limit 10")
+        elif kind == 8:
+            mix.append("now --at 2025-06-02T10:30")
+        else:
+            mix.append(f"search {words[i % len(words)]} --limit 10")
+    return mix
+
+def start_daemon(data_dir: str) -> subprocess.Popen:
+    socket_path = os.path.join(data_dir, "pkms.sock")
+    daemon = subprocess.Popen([sys.executable, "-m", "src.daemon", "--data-dir", data_dir],
+                              stdout=subprocess.DEVNULL)
+    while not (os.path.exists(socket_path) and is_listening(socket_path)):
+        if daemon.poll() is not None:
+            raise RuntimeError("the daemon exited during start-up")
+        time.sleep(0.05)
+    return daemon
+
+def stop_daemon(data_dir: str, daemon: subprocess.Popen):
+    with PKMSClient(os.path.join(data_dir, "pkms.sock")) as client:
+        client.call("shutdown")
+    daemon.wait()
+
+def run(mode: str, template: str, mix: List[str]) -> Dict:
+    data_dir = tempfile.mkdtemp(prefix="pkms-bench-")
+    shutil.rmtree(data_dir)
+    shutil.copytree(template, data_dir)
+    client_cmd = [sys.executable, "-m", "src.client", "--data-dir", data_dir]
+    daemon = None
+    try:
+        if mode != "local":
+            daemon = start_daemon(data_dir)
+        start = time.perf_counter()
+        if mode in ("local", "process"):
+            for line in mix:
+                subprocess.run(client_cmd + shlex.split(line), stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+        elif mode == "batch":
+            subprocess.run(client_cmd + ["batch"], input="\n".join(mix), text=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            parser = build_parser()
+            with PKMSClient(os.path.join(data_dir, "pkms.sock")) as client:
+                for line in mix:
+                    args = parser.parse_args(shlex.split(line))
+                    client.call(args.op, **args.build(args))
+        elapsed = time.perf_counter() - start
+        if daemon is not None:
+            stop_daemon(data_dir, daemon)
+            daemon = None
+        tasks = DataManager(data_dir=data_dir).load_data(Task, 'task')
+        return {
+            "mode": mode,
+            "commands": len(mix),
+            "seconds": round(elapsed, 3),
+            "commands_per_s": round(len(mix) / elapsed, 1),
+            "tasks_after": len(tasks),
+        }
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000, help="Notes and tasks in the corpus")
+    parser.add_argument("--commands", type=int, nargs=2, default=[50, 2000], metavar=("PER_PROCESS", "BATCHED"),
+                        help="Commands for the process-per-command modes and for the batched modes")
+    args = parser.parse_args()
+
+    template = tempfile.mkdtemp(prefix="pkms-bench-")
+    try:
+        pending_ids = generate(template, args.size)
+        results = [run(mode, template, commands(n, pending_ids))
+                   for mode, n in (("local", args.commands[0]), ("process", args.commands[0]),
+                                   ("batch", args.commands[1]), ("client", args.commands[1]))]
+    finally:
+        shutil.rmtree(template, ignore_errors=True)
+    print(json.dumps({"size": args.size, "results": results}, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Durable-save throughput: one fsync per save vs. group commit.
+
+Each writer thread appends small task records with `durable=True`. The
+per-save mode fsyncs every append (DataManager(group_commit=False));
+the group modes let concurrent appends share an fsync, optionally
+waiting `--window` seconds for more appends to join.
+
+Usage (from FinalProject/task6):
+    python -m benchmarks.bench_group_commit --threads 1 4 16 --saves 200
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from src.models import Task
+from src.data_manager import DataManager
+
+def run(mode: str, threads: int, saves: int, window: float) -> dict:
+    data_dir = tempfile.mkdtemp(prefix="pkms-bench-")
+    try:
+        dm = DataManager(data_dir=data_dir, compact_threshold=10**9,
+                         group_commit=(mode != "per_save"),
+                         group_commit_window=window if mode == "group_window" else 0.0)
+
+        def writer(n: int):
+            for i in range(saves):
+                task = Task(title=f"Task {n}-{i}", description="", due_date="2025-01-01")
+                dm.append_records([task], 'task', durable=True)
+
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - start
+        total = threads * saves
+        return {
+            "mode": mode,
+            "threads": threads,
+            "saves": total,
+            "fsyncs": dm.fsync_count,
+            "seconds": round(elapsed, 3),
+            "saves_per_s": round(total / elapsed, 1),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--saves", type=int, default=200, help="Durable saves per thread")
+    parser.add_argument("--window", type=float, default=0.002, help="Group commit window in seconds")
+    args = parser.parse_args()
+
+    results = [run(mode, threads, args.saves, args.window)
+               for threads in args.threads
+               for mode in ("per_save", "group", "group_window")]
+    print(json.dumps({"window_s": args.window, "results": results}, indent=4))
+
+if __name__ == "__main__":
+    main()
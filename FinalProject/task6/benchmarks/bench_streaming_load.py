@@ -0,0 +1,113 @@
+"""
+Peak-RSS benchmark for loading a large knowledge.json.
+
+Compares the old whole-file `json.load` path against the streaming
+`DataManager.load_data` and `DataManager.iter_data` APIs. Each mode runs in
+a fresh subprocess so its peak RSS is measured in isolation. The data is
+generated in a subprocess of its own too: on Linux a child starts with its
+parent's ru_maxrss, so generating in this process would make every mode
+report the generator's peak.
+
+Usage (from FinalProject/task6):
+    python -m benchmarks.bench_streaming_load --size-mb 300
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("json_load", "load_data", "iter_data")
+
+def generate(data_dir: str, size_mb: int, seed: int = 0):
+    """Writes a knowledge.json of roughly `size_mb` megabytes."""
+    from src.data_manager import DataManager
+    from src.models import KnowledgeEntry
+
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "notes", "research", "meeting", "draft", "python", "deadline"]
+    target = size_mb * 1024 * 1024
+    # JSON only: the modes measure streaming the JSON snapshot
+    dm = DataManager(data_dir=data_dir, binary_snapshots=False)
+
+    def entries():
+        written = 0
+        i = 0
+        while written < target:
+            content = " ".join(rng.choice(words) for _ in range(rng.randint(50, 400)))
+            entry = KnowledgeEntry(title=f"Note {i}", content=content, tags=rng.sample(words, 2))
+            written += len(content) + 200
+            i += 1
+            yield entry.to_dict()
+
+    dm._save_file(dm.pkm_path, entries())
+    return dm.pkm_path
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_mode(data_dir: str, mode: str) -> dict:
+    """Loads the knowledge file in one mode and reports time and peak RSS."""
+    from src.data_manager import DataManager
+    from src.models import KnowledgeEntry
+
+    dm = DataManager(data_dir=data_dir)
+    start = time.perf_counter()
+    if mode == "json_load":
+        with open(dm.pkm_path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        count = len([KnowledgeEntry.from_dict(d) for d in raw])
+    elif mode == "load_data":
+        count = len(dm.load_data(KnowledgeEntry, 'pkm'))
+    else:
+        count = sum(1 for _ in dm.iter_data(KnowledgeEntry, 'pkm'))
+    return {
+        "mode": mode,
+        "records": count,
+        "seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--data-dir", help="Reuse an existing data directory instead of generating one")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--generate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.data_dir, args.mode)))
+        return
+    if args.generate:
+        generate(args.data_dir, args.size_mb)
+        return
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="pkms-bench-")
+    if not args.data_dir:
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_streaming_load", "--data-dir", data_dir,
+                        "--size-mb", str(args.size_mb), "--generate"], check=True)
+    file_mb = os.path.getsize(os.path.join(data_dir, "knowledge.json")) / (1024 * 1024)
+
+    results = []
+    try:
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_streaming_load", "--data-dir", data_dir, "--mode", mode],
+                check=True, capture_output=True, text=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    print(json.dumps({"file_mb": round(file_mb, 1), "results": results}, indent=4))
+
+if __name__ == "__main__":
+    main()
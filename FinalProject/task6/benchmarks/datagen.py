@@ -0,0 +1,70 @@
+"""
+Seeded synthetic data for benchmarks.
+
+The same seed and size always produce the same records, so timings from
+different commits are measured on identical corpora.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from src.models import KnowledgeEntry, Task, Schedule
+
+WORDS = (
+    "alpha beta gamma delta research meeting draft python deadline notes review "
+    "design budget client launch report urgent critical schedule paper chapter "
+    "experiment dataset model training evaluation summary outline lecture exam"
+).split()
+TAGS = ("work", "school", "personal", "research", "reading", "ideas", "admin", "health")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+PRIORITIES = ("low", "medium", "high")
+EPOCH = datetime(2025, 1, 1)
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _text(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def knowledge_entries(n: int, seed: int = 0) -> Iterator[KnowledgeEntry]:
+    rng = random.Random(seed)
+    for i in range(n):
+        yield KnowledgeEntry(
+            id=_uuid(rng),
+            title=f"{_text(rng, 2, 5).title()} {i}",
+            content=_text(rng, 20, 200),
+            tags=rng.sample(TAGS, rng.randint(0, 3)),
+            created_at=(EPOCH + timedelta(minutes=i)).isoformat(),
+            is_summarized=rng.random() < 0.5,
+        )
+
+def tasks(n: int, knowledge_ids: List[str], seed: int = 1) -> Iterator[Task]:
+    rng = random.Random(seed)
+    for i in range(n):
+        yield Task(
+            id=_uuid(rng),
+            title=f"{_text(rng, 2, 6).capitalize()} {i}",
+            description=_text(rng, 5, 40),
+            due_date=(EPOCH + timedelta(days=rng.randint(0, 365))).strftime("%Y-%m-%d"),
+            knowledge_link_id=rng.choice(knowledge_ids) if knowledge_ids and rng.random() < 0.3 else None,
+            created_at=(EPOCH + timedelta(minutes=i)).isoformat(),
+            status="complete" if rng.random() < 0.6 else "pending",
+            priority=rng.choice(PRIORITIES),
+            is_prioritized=rng.random() < 0.5,
+        )
+
+def schedules(n: int, seed: int = 2) -> Iterator[Schedule]:
+    rng = random.Random(seed)
+    for i in range(n):
+        start = rng.randint(6 * 4, 20 * 4) * 15
+        end = min(start + rng.choice((30, 60, 90, 120, 240)), 24 * 60 - 1)
+        yield Schedule(
+            id=_uuid(rng),
+            title=f"{_text(rng, 1, 3).title()} {i}",
+            day_of_week=rng.choice(DAYS),
+            start_time=f"{start // 60:02d}:{start % 60:02d}",
+            end_time=f"{end // 60:02d}:{end % 60:02d}",
+            location=rng.choice((None, "Office", "Zoom", "Library")),
+            created_at=(EPOCH + timedelta(minutes=i)).isoformat(),
+        )
@@ -0,0 +1,178 @@
+"""
+Scalability benchmarks for the task6 package.
+
+Generates seeded synthetic corpora (see datagen.py) and times persistence,
+search, task listing/completion and the agent cycle (mock LLM) with the
+interactive prompts stubbed out. Results are written as JSON so runs from
+different commits can be compared.
+
+Usage (from FinalProject/task6):
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --compare bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from src.models import KnowledgeEntry, Task, Schedule
+from src.data_manager import DataManager
+from src.__main__ import PKMSTaskManager
+
+from . import datagen
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SEARCH_QUERIES = ("research", "python deadline", "zzzz")
+
+@contextlib.contextmanager
+def quiet():
+    """Discards everything the CLI prints while a benchmark runs."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+class ScriptedInput:
+    """Stands in for input(): returns queued responses in order, then blanks."""
+
+    def __init__(self):
+        self.queue: List[str] = []
+
+    def load(self, *responses: str):
+        self.queue = list(responses)
+
+    def __call__(self, _prompt: str = "") -> str:
+        return self.queue.pop(0) if self.queue else ""
+
+def timed(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Runs `fn` `repeat` times (calling `setup` untimed before each) and summarizes."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+    return {
+        'min_s': round(min(runs), 6),
+        'median_s': round(statistics.median(runs), 6),
+        'runs': len(runs),
+    }
+
+def run_size(n: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    """Times every operation on a fresh data directory holding `n` entries and `n` tasks."""
+    results: Dict[str, Dict[str, float]] = {}
+    data_dir = tempfile.mkdtemp(prefix=f"pkms-bench-{n}-")
+    try:
+        knowledge = list(datagen.knowledge_entries(n, seed=seed))
+        tasks = list(datagen.tasks(n, [e.id for e in knowledge], seed=seed + 1))
+        schedules = list(datagen.schedules(max(10, n // 100), seed=seed + 2))
+        dm = DataManager(data_dir=data_dir)
+
+        for file_type, records in (('pkm', knowledge), ('task', tasks), ('schedule', schedules)):
+            results[f"save_data.{file_type}"] = timed(lambda: dm.save_data(records, file_type), repeat)
+        for file_type, model in (('pkm', KnowledgeEntry), ('task', Task), ('schedule', Schedule)):
+            results[f"load_data.{file_type}"] = timed(lambda: dm.load_data(model, file_type), repeat)
+        del knowledge, tasks, schedules
+
+        managers = []
+        results["manager_init"] = timed(lambda: managers.append(PKMSTaskManager(data_manager=dm)), 1)
+        manager = managers[0]
+        # Collections load on first access; time that separately from construction
+        results["manager_first_load"] = timed(
+            lambda: (manager.knowledge, manager.tasks, manager.schedules, manager.search_index), 1,
+        )
+
+        scripted = ScriptedInput()
+        with patch('builtins.input', scripted):
+            for query in SEARCH_QUERIES:
+                results[f"search_pkm[{query}]"] = timed(
+                    manager.search_pkm, repeat, setup=lambda: scripted.load(query, "n"),
+                )
+
+            results["list_tasks.pending"] = timed(lambda: manager.list_tasks("pending"), repeat)
+
+            pending = iter([t.id for t in manager.tasks if t.status == "pending"])
+            results["complete_task"] = timed(
+                manager.complete_task, repeat, setup=lambda: scripted.load(next(pending)),
+            )
+
+        # The agent cycle mutates state, so it is measured once on the fresh corpus
+        results["run_agent_cycle"] = timed(manager.run_agent_cycle, 1)
+        dm.wait_for_compaction()
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Lists operations whose median got slower than `threshold` (e.g. 0.2 = 20%)."""
+    regressions = []
+    for size, ops in current['results'].items():
+        for op, stats in ops.items():
+            old = baseline.get('results', {}).get(size, {}).get(op)
+            if not old or not old['median_s']:
+                continue
+            change = stats['median_s'] / old['median_s'] - 1
+            if change > threshold:
+                regressions.append(f"{op} @ {size}: {old['median_s']:.4f}s -> {stats['median_s']:.4f}s (+{change:.0%})")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Record counts to benchmark (1000000 is supported but slow)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here instead of stdout")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    for n in args.sizes:
+        print(f"Benchmarking {n} records...", file=sys.stderr)
+        report['results'][str(n)] = run_size(n, args.repeat, args.seed)
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,283 @@
 import sys
 import os
-from typing import List
+import time
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
 
 # Ensure local imports work regardless of execution context
 if __name__ == "__main__":
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 # Imports use single-dot relative paths as they are still siblings in 'src'
-from .models import Task, KnowledgeEntry, Schedule
+from .models import Task, KnowledgeEntry, Schedule, Link
 from .data_manager import DataManager
-from .llm_agent import LLMAgent
+from .id_index import IDIndex, AmbiguousPrefixError
+from .search import InvertedIndex, SEARCH_INDEX_FILE, ALL_FIELDS, ranked_search
+from .change_tracker import ChangeTracker, AutoSaver
+from .schedule_index import ScheduleIndex, WEEKDAYS, weekday_number
+from .task_index import TaskOrderIndex, task_sort_key
+from .link_graph import LinkGraph
+from .metrics import metrics, timed
+# Interactive operations are timed after their prompts, so typing isn't counted
+OPERATION_SECONDS = "pkms_operation_seconds"
+# How many related notes add_task offers for linking
+LINK_SUGGESTIONS = 5
+# Agent results are written durably after every this many items
+AGENT_BATCH_SIZE = 50
+# Records beyond a task's own notes that go into its prioritization context
+RELATED_CONTEXT_LIMIT = 10
+# The LLM client (urllib/http.client), sqlite3 and NumPy are imported on first use
+# so the menu comes up without paying for them.
+
+def make_data_manager(data_dir: str = ".data", storage: Optional[str] = None):
+    """Picks the storage backend: `storage`, else PKMS_STORAGE ('json' by default, or 'sqlite')."""
+    if (storage or os.environ.get("PKMS_STORAGE", "json")).lower() == "sqlite":
+        from .sqlite_store import SQLiteDataManager
+        return SQLiteDataManager(data_dir=data_dir)
+    return DataManager(data_dir=data_dir)
 
 class PKMSTaskManager:
     """
     The main Personal Knowledge Management and Task Manager class.
     (This is the "spec-kit" class requested by the user).
     """
-    def __init__(self):
-        self.data_manager = DataManager()
-        self.llm_agent = LLMAgent()
-        self.knowledge: List[KnowledgeEntry] = self.data_manager.load_data(KnowledgeEntry, 'pkm')
-        self.tasks: List[Task] = self.data_manager.load_data(Task, 'task')
-        self.schedules: List[Schedule] = self.data_manager.load_data(Schedule, 'schedule') 
-        print(f"Manager initialized. Loaded {len(self.knowledge)} knowledge entries, {len(self.tasks)} tasks, and {len(self.schedules)} schedules.")
+    def __init__(self, data_manager=None, autosave_interval: Optional[float] = None):
+        self.data_manager = data_manager if data_manager is not None else make_data_manager()
+        if autosave_interval is None:
+            autosave_interval = float(os.environ.get("PKMS_AUTOSAVE_SECONDS", "0"))
+        self.search_index_path = os.path.join(self.data_manager.data_dir, SEARCH_INDEX_FILE)
+        # With 2+ shards, search_pkm fans queries out to that many worker processes
+        self.search_shards = int(os.environ.get("PKMS_SEARCH_SHARDS", "0"))
+        # Seconds spent loading each collection/index, filled in on first access
+        self.load_times: Dict[str, float] = {}
+        # Edits are marked here and written by flush_changes (or the autosaver)
+        self.changes = ChangeTracker()
+        self.autosaver: Optional[AutoSaver] = None
+        if autosave_interval > 0:
+            self.autosaver = AutoSaver(self.changes, self.data_manager, interval=autosave_interval)
+            self.autosaver.start()
+        print(f"Manager initialized. Data in '{self.data_manager.data_dir}' is loaded as it is needed.")
+
+    # --- Lazy Loading ---
+    # Collections, their indexes and the LLM client are built on first access.
+
+    def _is_loaded(self, name: str) -> bool:
+        return name in self.__dict__
+
+    def _load(self, name: str, model_class, file_type: str) -> List:
+        # Make sure edits still waiting for the autosaver are part of what we read
+        if self.changes.is_dirty(file_type):
+            self.changes.flush(self.data_manager, durable=False)
+        start = time.perf_counter()
+        records = self.data_manager.load_data(model_class, file_type)
+        self.load_times[name] = time.perf_counter() - start
+        return records
+
+    def _flush_for_query(self):
+        """Writes edits still waiting for the autosaver, so a database query sees them."""
+        if self.changes.is_dirty():
+            self.changes.flush(self.data_manager, durable=False)
+
+    @cached_property
+    def llm_agent(self):
+        from .llm_agent import LLMAgent
+        from .llm_cache import LLMCache, LLM_CACHE_FILE
+        start = time.perf_counter()
+        agent = LLMAgent(cache=LLMCache(os.path.join(self.data_manager.data_dir, LLM_CACHE_FILE)))
+        self.load_times['llm_agent'] = time.perf_counter() - start
+        return agent
+
+    @cached_property
+    def knowledge(self) -> List[KnowledgeEntry]:
+        return self._load('knowledge', KnowledgeEntry, 'pkm')
+
+    @cached_property
+    def tasks(self) -> List[Task]:
+        if self.data_manager.supports_queries:
+            # Tasks stay in the database; only tasks touched this session are held here
+            return []
+        return self._load('tasks', Task, 'task')
+
+    @cached_property
+    def schedules(self) -> List[Schedule]:
+        return self._load('schedules', Schedule, 'schedule')
+
+    @cached_property
+    def knowledge_ids(self) -> IDIndex[KnowledgeEntry]:
+        return IDIndex(self.knowledge)
+
+    @cached_property
+    def task_ids(self) -> IDIndex[Task]:
+        return IDIndex(self.tasks)
+
+    @cached_property
+    def pending_tasks(self) -> TaskOrderIndex:
+        return TaskOrderIndex(self.tasks)
+
+    @cached_property
+    def schedule_index(self) -> ScheduleIndex:
+        return ScheduleIndex(self.schedules)
+
+    @cached_property
+    def search_index(self) -> InvertedIndex:
+        knowledge = self.knowledge
+        start = time.perf_counter()
+        index = InvertedIndex.load(self.search_index_path)
+        index.sync(knowledge)
+        self.load_times['search_index'] = time.perf_counter() - start
+        metrics.observe(OPERATION_SECONDS, self.load_times['search_index'], op="load_search_index")
+        return index
+
+    @cached_property
+    def link_graph(self) -> LinkGraph:
+        links = self._load('links', Link, 'link')
+        # With SQLite, tasks aren't held in memory; stream them once for their primary links
+        tasks = self.data_manager.iter_data(Task, 'task') if self.data_manager.supports_queries else self.tasks
+        return LinkGraph(links, tasks)
+
+    @cached_property
+    def sharded_search(self):
+        from .sharded_search import ShardedSearch
+        knowledge = self.knowledge
+        start = time.perf_counter()
+        search = ShardedSearch(knowledge, shards=self.search_shards)
+        self.load_times['sharded_search'] = time.perf_counter() - start
+        metrics.observe(OPERATION_SECONDS, self.load_times['sharded_search'], op="load_sharded_search")
+        return search
+
+    def _tasks_with_status(self, status: str, **filters) -> List[Task]:
+        """Returns tasks with a status, filtered by the backend when it supports queries."""
+        if self.data_manager.supports_queries:
+            self._flush_for_query()
+            return self.data_manager.query_tasks(Task, status=status, **filters)
+        if status == self.pending_tasks.status:
+            tasks = list(self.pending_tasks)
+        else:
+            tasks = [t for t in self.tasks if t.status == status]
+        if 'is_prioritized' in filters:
+            tasks = [t for t in tasks if t.is_prioritized == filters['is_prioritized']]
+        return tasks
+
+    def _find_knowledge(self, entry_id: str) -> Optional[KnowledgeEntry]:
+        """Looks up a knowledge entry by exact ID."""
+        if self.data_manager.supports_queries:
+            self._flush_for_query()
+            return self.data_manager.get_record(KnowledgeEntry, 'pkm', entry_id)
+        return self.knowledge_ids.get(entry_id)
+
+    def _find_task(self, task_id: str) -> Optional[Task]:
+        """Looks up a task by exact ID."""
+        if self.data_manager.supports_queries:
+            self._flush_for_query()
+            return self.data_manager.get_record(Task, 'task', task_id)
+        return self.task_ids.get(task_id)
+
+    def _resolve_record(self, id_prefix: str):
+        """Finds the note or task with a full ID or unique prefix (notes first); None if there is none."""
+        note = self.knowledge_ids.resolve(id_prefix)
+        if note is not None:
+            return note
+        return self.resolve_task(id_prefix)
+
+    def _record_change(self, records: List, file_type: str):
+        """Marks records dirty; without an autosaver they are written straight away."""
+        self.changes.mark_all(records, file_type)
+        if self.autosaver is None:
+            self.changes.flush(self.data_manager, durable=False)
+
+    def _index_entries(self, entries: List[KnowledgeEntry]):
+        """
+        Adds new or changed notes to whichever search index is loaded. One
+        that isn't loaded yet indexes them when it is (see InvertedIndex.sync).
+        """
+        if self._is_loaded('search_index'):
+            for entry in entries:
+                self.search_index.add(entry)
+        if self._is_loaded('sharded_search'):
+            self.sharded_search.add_many(entries)
+
+    def _record_delete(self, record_ids: List[str], file_type: str):
+        """Marks records deleted; without an autosaver they are removed straight away."""
+        for record_id in record_ids:
+            self.changes.mark_deleted(record_id, file_type)
+        if self.autosaver is None:
+            self.changes.flush(self.data_manager, durable=False)
+
+    # --- Record Operations ---
+    # Shared by the menu and the daemon (daemon.py); they neither prompt nor print.
+
+    def create_entry(self, title: str, content: str, tags: Optional[List[str]] = None) -> KnowledgeEntry:
+        with metrics.timer(OPERATION_SECONDS, op="add_knowledge_entry"):
+            entry = KnowledgeEntry(title=title, content=content, tags=tags)
+            # Adding a note doesn't load the collection; if it isn't loaded yet
+            # the note is read back (and indexed) with the rest on first use.
+            if self._is_loaded('knowledge'):
+                self.knowledge.append(entry)
+            if self._is_loaded('knowledge_ids'):
+                self.knowledge_ids.add(entry)
+            self._index_entries([entry])
+            self._record_change([entry], 'pkm')
+        return entry
+
+    def create_task(self, title: str, description: str, due_date: str,
+                    knowledge_link_id: Optional[str] = None) -> Task:
+        with metrics.timer(OPERATION_SECONDS, op="add_task"):
+            task = Task(title=title, description=description, due_date=due_date, knowledge_link_id=knowledge_link_id)
+            if self._is_loaded('tasks'):
+                self.tasks.append(task)
+            if self._is_loaded('task_ids'):
+                self.task_ids.add(task)
+            if self._is_loaded('pending_tasks'):
+                self.pending_tasks.update(task)
+            if self._is_loaded('link_graph'):
+                self.link_graph.update_task(task)
+            self._record_change([task], 'task')
+        return task
+
+    def create_schedule(self, schedule: Schedule):
+        """Adds a schedule block; checking it for conflicts is up to the caller."""
+        with metrics.timer(OPERATION_SECONDS, op="add_work_schedule"):
+            self.schedules.append(schedule)
+            self.schedule_index.add(schedule)
+            self._record_change([schedule], 'schedule')
+
+    def resolve_task(self, id_prefix: str, status: Optional[str] = None) -> Optional[Task]:
+        """
+        Finds the task with a full ID or unique ID prefix (and `status`, if
+        given); None if there is none. Raises AmbiguousPrefixError.
+        """
+        if self.data_manager.supports_queries:
+            self._flush_for_query()
+            return self.data_manager.find_task(Task, id_prefix, status=status)
+        return self.task_ids.resolve(id_prefix, None if status is None else lambda t: t.status == status)
+
+    def mark_complete(self, task: Task):
+        task.status = "complete"
+        self.pending_tasks.update(task)
+        self._record_change([task], 'task')
+
+    def delete_task(self, task: Task):
+        """Deletes a task along with the links to and from it."""
+        with metrics.timer(OPERATION_SECONDS, op="delete_task"):
+            if self._is_loaded('tasks') and task in self.tasks:
+                self.tasks.remove(task)
+            if self._is_loaded('task_ids'):
+                self.task_ids.remove(task.id)
+            self.pending_tasks.remove(task.id)
+            link_ids = self.link_graph.link_ids(task.id)
+            self.link_graph.remove_node(task.id)
+            self._record_delete(link_ids, 'link')
+            self._record_delete([task.id], 'task')
+
+    def tasks_by_priority(self, status: str = "pending", limit: Optional[int] = None) -> List[Task]:
+        """Tasks with a status, most urgent first (high before medium before low, then by due date)."""
+        if self.data_manager.supports_queries:
+            self._flush_for_query()
+            return self.data_manager.query_tasks(Task, status=status, order_by='priority', limit=limit)
+        if status == self.pending_tasks.status:
+            return self.pending_tasks.top(limit) if limit is not None else list(self.pending_tasks)
+        return sorted([t for t in self.tasks if t.status == status], key=task_sort_key)[:limit]
 
     # --- CRUD Operations ---
 
@@ -31,8 +286,7 @@ class PKMSTaskManager:
         content = input("Enter Content: ")
         tags_input = input("Enter Tags (comma-separated, optional): ")
         tags = [t.strip() for t in tags_input.split(',')] if tags_input else []
-        entry = KnowledgeEntry(title=title, content=content, tags=tags)
-        self.knowledge.append(entry)
+        entry = self.create_entry(title, content, tags)
         print(f"Knowledge entry '{title}' added with ID: {entry.id}")
     
     def add_task(self):
@@ -41,30 +295,38 @@ class PKMSTaskManager:
         due_date = input("Enter Due Date (YYYY-MM-DD): ")
         
         if self.knowledge:
-            print("\nAvailable Knowledge Entries for Linking:")
-            for i, entry in enumerate(self.knowledge, 1):
-                print(f"  {i}. {entry.title} (ID: {entry.id[:8]}...)")
-        
+            from .related import related_entries # NumPy, if installed, loads here
+            # Offer the few notes most similar to the task instead of all of them
+            with metrics.timer(OPERATION_SECONDS, op="suggest_links"):
+                suggestions = related_entries(self.search_index, f"{title} {description}", k=LINK_SUGGESTIONS)
+            if suggestions:
+                print("\nRelated Knowledge Entries:")
+                for i, (_, entry) in enumerate(suggestions, 1):
+                    print(f"  {i}. {entry.title} (ID: {entry.id[:8]}...)")
+
             link_choice = input("Enter ID or number to link (or leave blank): ")
             link_id = None
             if link_choice:
                 try:
                     index = int(link_choice) - 1
-                    if 0 <= index < len(self.knowledge):
-                        link_id = self.knowledge[index].id
+                    if 0 <= index < len(suggestions):
+                        link_id = suggestions[index][1].id
                     else:
                         print("Invalid index. Linking by ID...")
                 except ValueError:
-                    linked_entry = next((e for e in self.knowledge if e.id.startswith(link_choice)), None)
-                    if linked_entry:
-                        link_id = linked_entry.id
+                    try:
+                        linked_entry = self.knowledge_ids.resolve(link_choice)
+                    except AmbiguousPrefixError as e:
+                        print(f"'{e.prefix}' matches {len(e.matches)} knowledge entries. Task left unlinked.")
                     else:
-                        print("No matching Knowledge ID found.")
+                        if linked_entry:
+                            link_id = linked_entry.id
+                        else:
+                            print("No matching Knowledge ID found.")
         else:
             link_id = None
 
-        task = Task(title=title, description=description, due_date=due_date, knowledge_link_id=link_id)
-        self.tasks.append(task)
+        task = self.create_task(title, description, due_date, link_id)
         print(f"\nTask '{title}' added with ID: {task.id}. Priority: {task.priority}")
     
     def add_work_schedule(self): 
@@ -75,6 +337,11 @@ class PKMSTaskManager:
         end_time = input("Enter End Time (HH:MM format, e.g., 17:00): ")
         location = input("Enter Location/Platform (optional): ") or None
 
+        try:
+            day = WEEKDAYS[weekday_number(day)]
+        except ValueError as e:
+            print(f"Error: {e}.")
+            return
         schedule = Schedule(
             title=title,
             day_of_week=day,
@@ -82,11 +349,26 @@ class PKMSTaskManager:
             end_time=end_time,
             location=location
         )
-        self.schedules.append(schedule)
+        try:
+            with metrics.timer(OPERATION_SECONDS, op="schedule_conflicts"):
+                conflicts = self.schedule_index.conflicts(schedule)
+        except ValueError as e:
+            print(f"Error: {e}.")
+            return
+        if conflicts:
+            print("\nThis overlaps with:")
+            for other in conflicts:
+                print(f"  - {other.day_of_week} {other.start_time} - {other.end_time} | {other.title}")
+            if input("Add it anyway? (y/N): ").lower() != 'y':
+                print("Schedule not added.")
+                return
+
+        self.create_schedule(schedule)
         print(f"\nSchedule '{title}' on {day} added successfully.")
 
     def complete_task(self): # <-- NEW METHOD: Complete Task
-        pending_tasks = [t for t in self.tasks if t.status == "pending"]
+        with metrics.timer(OPERATION_SECONDS, op="list_pending_tasks"):
+            pending_tasks = self._tasks_with_status("pending")
         
         if not pending_tasks:
             print("\nNo pending tasks to complete.")
@@ -99,25 +381,28 @@ class PKMSTaskManager:
             
         task_id_prefix = input("Enter the full or first few chars of the Task ID to mark complete: ")
         
-        found = False
-        for task in self.tasks:
-            if task.id.startswith(task_id_prefix) and task.status == "pending":
-                task.status = "complete"
-                print(f"\nTask '{task.title}' marked as COMPLETE.")
-                found = True
-                break
-        
-        if not found:
+        start = time.perf_counter()
+        try:
+            task = self.resolve_task(task_id_prefix, status="pending")
+        except AmbiguousPrefixError as e:
+            print(f"Error: '{e.prefix}' matches {len(e.matches)} pending tasks. Enter more of the ID.")
+            return
+
+        if task is None:
             print("Error: Could not find a pending task matching that ID.")
+            return
+
+        self.mark_complete(task)
+        metrics.observe(OPERATION_SECONDS, time.perf_counter() - start, op="complete_task")
+        print(f"\nTask '{task.title}' marked as COMPLETE.")
 
     # --- Retrieval and Display ---
 
-    def list_tasks(self, status: str = "pending"):
+    @timed(OPERATION_SECONDS, op="list_tasks")
+    def list_tasks(self, status: str = "pending", limit: Optional[int] = None):
+        """Prints tasks most urgent first (high before medium before low, then by due date)."""
         print(f"\n--- {status.upper()} TASKS ---")
-        filtered_tasks = sorted(
-            [t for t in self.tasks if t.status == status], 
-            key=lambda t: t.priority, reverse=True
-        )
+        filtered_tasks = self.tasks_by_priority(status, limit)
 
         if not filtered_tasks:
             print("No tasks found.")
@@ -129,51 +414,147 @@ class PKMSTaskManager:
             print(f"{i}. {priority_tag} {task.title} (Due: {task.due_date}){link}")
             print(f"   Description: {task.description}")
 
+    @timed(OPERATION_SECONDS, op="list_schedules")
     def list_schedules(self):
         print("\n--- CURRENT WORK SCHEDULE ---")
         if not self.schedules:
             print("No schedules found.")
             return
 
-        # Sort schedules by day of the week (simple alphabetical sort for prototype)
-        sorted_schedules = sorted(self.schedules, key=lambda s: s.day_of_week)
-
-        for i, schedule in enumerate(sorted_schedules, 1):
+        for i, schedule in enumerate(self.schedule_index.ordered(), 1):
             time_slot = f"{schedule.start_time} - {schedule.end_time}"
             location_info = f" ({schedule.location})" if schedule.location else ""
             
             print(f"{i}. {schedule.day_of_week.ljust(10)} | {time_slot.ljust(15)} | {schedule.title}{location_info}")
             print("-" * 50)
-            
-    def search_pkm(self):
+
+    @timed(OPERATION_SECONDS, op="show_current_schedule")
+    def show_current_schedule(self, when: Optional[datetime] = None):
+        """Prints the schedule blocks in progress right now (or at `when`)."""
+        when = when or datetime.now()
+        current = self.schedule_index.at_datetime(when)
+        print(f"\n--- ON NOW ({when.strftime('%A %H:%M')}) ---")
+        if not current:
+            print("Nothing scheduled.")
+        for schedule in current:
+            location_info = f" ({schedule.location})" if schedule.location else ""
+            print(f"- {schedule.start_time} - {schedule.end_time} | {schedule.title}{location_info}")
+
+    def _describe(self, record) -> str:
+        kind = "Note" if isinstance(record, KnowledgeEntry) else "Task"
+        return f"[{kind}] {record.title} (ID: {record.id[:8]}...)"
+
+    def link_records(self, source_id: str, target_id: str) -> Link:
+        """Adds a link between two records (a no-op if they are already linked)."""
+        link = Link(source_id, target_id)
+        self.link_graph.add_link(link)
+        self._record_change([link], 'link')
+        return link
+
+    def show_links(self):
+        """Shows what a note or task links to and what links to it, then offers to add a link."""
+        id_prefix = input("Enter the ID (or first few chars) of a note or task: ")
+        try:
+            record = self._resolve_record(id_prefix) if id_prefix else None
+        except AmbiguousPrefixError as e:
+            print(f"Error: '{e.prefix}' matches {len(e.matches)} records. Enter more of the ID.")
+            return
+        if record is None:
+            print("Error: No note or task matches that ID.")
+            return
+
+        with metrics.timer(OPERATION_SECONDS, op="show_links"):
+            graph = self.link_graph
+            print(f"\n--- Links for {self._describe(record)} ---")
+            for heading, arrow, ids in (("Links to:", "->", graph.targets(record.id)),
+                                        ("Linked from:", "<-", graph.sources(record.id))):
+                print(heading)
+                found = [r for r in (self._find_knowledge(i) or self._find_task(i) for i in ids) if r is not None]
+                for other in found:
+                    print(f"  {arrow} {self._describe(other)}")
+                if not found:
+                    print("  (none)")
+
+        target_prefix = input("Link to another note or task (ID, or leave blank): ")
+        if not target_prefix:
+            return
+        try:
+            target = self._resolve_record(target_prefix)
+        except AmbiguousPrefixError as e:
+            print(f"Error: '{e.prefix}' matches {len(e.matches)} records. Link not added.")
+            return
+        if target is None or target.id == record.id:
+            print("Error: No other note or task matches that ID. Link not added.")
+            return
+        self.link_records(record.id, target.id)
+        print(f"Linked {self._describe(record)} -> {self._describe(target)}")
+
+    def search_pkm(self, page_size: int = 10):
         query = input("Enter search keywords: ").lower()
         if not query:
             print("Please enter keywords.")
             return
 
-        results = []
-        for entry in self.knowledge:
-            searchable_text = f"{entry.title} {entry.content} {' '.join(entry.tags)}".lower()
-            if all(word in searchable_text for word in query.split()):
-                results.append(entry)
+        # Build the index (or shards) first; that is timed separately as load_search_index/load_sharded_search
+        self.load_search()
+        with metrics.timer(OPERATION_SECONDS, op="search_count"):
+            total = self.search_count(query)
 
-        print(f"\n--- Found {len(results)} PKM results for '{query}' ---")
-        if not results:
-            return
+        print(f"\n--- Found {total} PKM results for '{query}' ---")
+        offset = 0
+        while offset < total:
+            with metrics.timer(OPERATION_SECONDS, op="search_page"):
+                page = self.search_page(query, limit=page_size, offset=offset)
+            self._print_search_page(page, offset)
+            offset += page_size
+            if offset >= total or input("Show more results? (y/N): ").lower() != 'y':
+                break
+
+    def load_search(self):
+        """Returns the search backend, loading it if needed: the shards when PKMS_SEARCH_SHARDS is set, else the index."""
+        return self.sharded_search if self.search_shards > 1 else self.search_index
+
+    def search_count(self, query: str) -> int:
+        """Number of entries matching every query word."""
+        if self.search_shards > 1:
+            return self.sharded_search.count(query)
+        return len(self.search_index.search_docs(query, field_mask=ALL_FIELDS))
 
-        for i, entry in enumerate(results, 1):
-            summary_display = entry.summary if entry.summary else entry.content[:100] + "..."
-            print(f"{i}. [PKM Entry] Title: {entry.title}")
+    def search_page(self, query: str, limit: int = 10, offset: int = 0) -> List:
+        """One page of (score, entry) results, from the shards when PKMS_SEARCH_SHARDS is set."""
+        if self.search_shards > 1:
+            hits = self.sharded_search.ranked(query, limit=limit, offset=offset)
+            page = [(score, self._find_knowledge(entry_id)) for score, entry_id in hits]
+            return [(score, entry) for score, entry in page if entry is not None]
+        return ranked_search(self.search_index, query, limit=limit, offset=offset)
+
+    def _print_search_page(self, page: List, offset: int):
+        for i, (score, entry) in enumerate(page, offset + 1):
+            summary_display = entry.summary if entry.summary else entry.preview(100) + "..."
+            print(f"{i}. [PKM Entry] Title: {entry.title} (Score: {score:.2f})")
             print(f"   Summary: {summary_display}")
             print(f"   Tags: {', '.join(entry.tags)}")
             print(f"   ID: {entry.id}")
 
     # --- AI Agent Integration ---
     
-    def run_agent_cycle(self):
-        """Processes unsaved tasks and knowledge using the AI agent."""
+    @timed(OPERATION_SECONDS, op="run_agent_cycle")
+    def run_agent_cycle(self, max_seconds: Optional[float] = None, max_calls: Optional[int] = None,
+                        batch_size: int = AGENT_BATCH_SIZE):
+        """
+        Summarizes new knowledge and prioritizes new pending tasks using the AI agent.
+
+        Results are written durably every `batch_size` items, and finished
+        items are flagged (is_summarized / is_prioritized), so a cycle that is
+        interrupted or stopped by its budget resumes where it left off on the
+        next run. No call is started once `max_seconds` have passed or
+        `max_calls` model calls have been made. Items whose call failed stay
+        unflagged and are retried by the next cycle.
+        """
+        from .llm_agent import CycleBudget
         knowledge_updated = False
         tasks_updated = False
+        budget = CycleBudget(self.llm_agent, max_seconds, max_calls)
         
         print("\n==============================================")
         print("     PKMS AI Agent - Processing Cycle Start   ")
@@ -182,36 +563,152 @@ class PKMSTaskManager:
         # 1. Summarize new knowledge entries
         new_entries = [e for e in self.knowledge if not e.is_summarized]
         print(f"AI: Found {len(new_entries)} entries to summarize.")
+        # Exact copies (same title and body, e.g. a re-import) share one LLM
+        # call; near-duplicates differ somewhere, so each gets its own summary
+        copies: Dict[str, List[KnowledgeEntry]] = {}
+        originals = []
+        first_of: Dict[Tuple[str, str], KnowledgeEntry] = {}
         for entry in new_entries:
-            summary = self.llm_agent.summarize_entry(entry)
-            entry.summary = summary
-            entry.is_summarized = True
-            knowledge_updated = True
-            print(f"[SUMMARIZED] '{entry.title}'.")
+            first = first_of.setdefault((entry.title, entry.content), entry)
+            if first is entry:
+                originals.append(entry)
+            else:
+                copies.setdefault(first.id, []).append(entry)
+        if copies:
+            print(f"AI: {len(new_entries) - len(originals)} copied entries reuse another entry's summary.")
+        done = summarized = 0
+        while done < len(originals):
+            n = budget.allowance(batch_size)
+            if n == 0:
+                break
+            batch = originals[done:done + n]
+            finished = []
+            for entry, summary in zip(batch, self.llm_agent.summarize_entries(batch, budget)):
+                if summary is None:
+                    continue # failed or over budget; left for the next cycle
+                summarized += 1
+                for e in [entry] + copies.get(entry.id, []):
+                    e.summary = summary
+                    e.is_summarized = True
+                    finished.append(e)
+                    print(f"[SUMMARIZED] '{e.title}'.")
+            if finished:
+                self._index_entries(finished)
+                self._checkpoint(finished, 'pkm')
+                knowledge_updated = True
+            done += n
+        entries_left = len(originals) - summarized
         
         # 2. Prioritize tasks
-        unprioritized_tasks = [t for t in self.tasks if t.status == "pending" and not t.is_prioritized]
+        unprioritized_tasks = self._tasks_with_status("pending", is_prioritized=False)
         print(f"AI: Found {len(unprioritized_tasks)} pending tasks to prioritize.")
-        for task in unprioritized_tasks:
-            linked_content = ""
-            if task.knowledge_link_id:
-                linked = next((e for e in self.knowledge if e.id == task.knowledge_link_id), None)
-                linked_content = linked.summary or linked.content if linked else "No linked content found."
-
-            new_priority = self.llm_agent.prioritize_task(task, linked_content)
-            task.priority = new_priority
-            task.is_prioritized = True
-            tasks_updated = True
-            print(f"[PRIORITIZED] '{task.title}' to '{new_priority.upper()}'.")
-
-        print("\nAgent cycle complete.")
+        done = prioritized = 0
+        while done < len(unprioritized_tasks):
+            n = budget.allowance(batch_size)
+            if n == 0:
+                break
+            batch = unprioritized_tasks[done:done + n]
+            requests = [(task, self._task_context(task)) for task in batch]
+
+            finished = []
+            for task, new_priority in zip(batch, self.llm_agent.prioritize_tasks(requests, budget)):
+                if new_priority is None:
+                    continue
+                task.priority = new_priority
+                task.is_prioritized = True
+                self.pending_tasks.update(task)
+                finished.append(task)
+                print(f"[PRIORITIZED] '{task.title}' to '{new_priority.upper()}'.")
+            if finished:
+                self._checkpoint(finished, 'task')
+                tasks_updated = True
+            prioritized += len(finished)
+            done += n
+        tasks_left = len(unprioritized_tasks) - prioritized
+
+        if self.llm_agent.cache is not None:
+            stats = self.llm_agent.cache.stats()
+            print(f"AI: LLM cache {stats['hits']} hits, {stats['misses']} misses.")
+        if entries_left or tasks_left:
+            print(f"\nAgent cycle stopped at its budget or on failed calls ({budget.calls} calls). "
+                  f"{entries_left} entries and {tasks_left} tasks are left for the next run.")
+        else:
+            print("\nAgent cycle complete.")
         return knowledge_updated, tasks_updated
 
+    def _task_context(self, task: Task) -> str:
+        """
+        Linked context for prioritizing a task: the text of the notes it links
+        to, then the titles of records up to three links away (other tasks on
+        those notes, their notes, ...), found by walking the link graph.
+        """
+        graph = self.link_graph
+        if not graph.targets(task.id):
+            return ""
+        parts = []
+        related = []
+        for record_id, distance in graph.neighborhood(task.id, hops=3, limit=RELATED_CONTEXT_LIMIT).items():
+            note = self._find_knowledge(record_id)
+            if note is not None and distance == 1 and record_id in graph.forward[task.id]:
+                parts.append(note.summary or note.content)
+            elif note is not None:
+                related.append(f"note '{note.title}'")
+            else:
+                other = self._find_task(record_id)
+                if other is not None:
+                    related.append(f"task '{other.title}'")
+        if not parts:
+            parts.append("No linked content found.")
+        if related:
+            parts.append("Related: " + "; ".join(related))
+        return "\n\n".join(parts)
+
+    def _checkpoint(self, records: List, file_type: str):
+        """Durably writes a finished batch of agent results (and any other pending edits)."""
+        self.changes.mark_all(records, file_type)
+        self.changes.flush(self.data_manager)
+
+    @timed(OPERATION_SECONDS, op="flush_changes")
+    def flush_changes(self) -> int:
+        """Durably writes every record changed since the last flush; returns how many."""
+        if self.autosaver is not None:
+            self.autosaver.stop(flush=False) # flushed below, so the count includes its records
+            self.autosaver = None
+        written = self.save_changes()
+        # The index is only a cache of the notes: it is saved on the way out,
+        # and InvertedIndex.sync re-indexes whatever changed if it wasn't
+        if self._is_loaded('search_index') and self.search_index.modified:
+            self.search_index.save(self.search_index_path)
+        if not self.data_manager.supports_queries:
+            self.data_manager.wait_for_compaction()
+        return written
+
+    def save_changes(self) -> int:
+        """Like flush_changes, but leaves the autosaver running."""
+        return self.changes.flush(self.data_manager)
+
+    def show_stats(self):
+        """Prints per-operation latency percentiles and I/O counters for this session."""
+        print("\n--- SESSION STATS ---")
+        print(metrics.report())
+        path = self.dump_metrics()
+        if path:
+            print(f"\nMetrics written to {path}")
+
+    def dump_metrics(self) -> Optional[str]:
+        """Writes metrics to PKMS_METRICS_FILE (.json, else Prometheus text) if it is set."""
+        path = os.environ.get("PKMS_METRICS_FILE")
+        if path:
+            metrics.dump(path)
+        return path
+
     def save_and_exit(self):
-        """Saves all data before exiting."""
-        self.data_manager.save_data(self.knowledge, 'pkm')
-        self.data_manager.save_data(self.tasks, 'task')
-        self.data_manager.save_data(self.schedules, 'schedule') 
+        """Saves pending changes before exiting."""
+        written = self.flush_changes()
+        if self._is_loaded('sharded_search'):
+            self.sharded_search.close()
+        self.dump_metrics()
+        print(f"\n--- Saved {written} changed records to {self.data_manager.data_dir} ---")
         sys.exit(0)
     
     def run_cli(self):
@@ -228,9 +725,12 @@ class PKMSTaskManager:
             print("7. List Work Schedules")
             print("8. Complete Task") # <-- NEW MENU ITEM
             print("9. Save & Exit") # <-- UPDATED OPTION
+            print("10. What's Scheduled Now")
+            print("11. Session Stats")
+            print("12. Show/Add Links")
             
 
-            choice = input("Select an option (1-9): ")
+            choice = input("Select an option (1-12): ")
             
             try:
                 if choice == '1':
@@ -251,14 +751,40 @@ class PKMSTaskManager:
                     self.complete_task() # <-- CALL NEW METHOD
                 elif choice == '9':
                     self.save_and_exit()
+                elif choice == '10':
+                    self.show_current_schedule()
+                elif choice == '11':
+                    self.show_stats()
+                elif choice == '12':
+                    self.show_links()
                 else:
                     print("Invalid choice. Please try again.")
             except Exception as e:
                 print(f"\n[ERROR] An unexpected error occurred: {e}")
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Entry point function for uv run task6."""
+    import argparse
+    parser = argparse.ArgumentParser(prog="task6", description="Integrated PKMS & Task Manager")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print import, start-up and per-collection load times, then exit")
+    parser.add_argument("--agent-cycle", action="store_true",
+                        help="Run one AI agent cycle without the menu (e.g. from cron), then exit")
+    parser.add_argument("--max-seconds", type=float, help="Time budget for --agent-cycle")
+    parser.add_argument("--max-calls", type=int, help="Model-call budget for --agent-cycle")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
     manager = PKMSTaskManager()
+    init_seconds = time.perf_counter() - start
+    if args.startup_report:
+        from .startup_report import print_startup_report
+        print_startup_report(manager, init_seconds, module=f"{__package__}.__main__")
+        return
+    if args.agent_cycle:
+        manager.run_agent_cycle(max_seconds=args.max_seconds, max_calls=args.max_calls)
+        manager.flush_changes()
+        return
     manager.run_cli()
 
 if __name__ == "__main__":
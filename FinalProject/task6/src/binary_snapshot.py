@@ -0,0 +1,198 @@
+"""
+Binary companions for the JSON snapshots, for fast cold loads.
+
+Whenever DataManager writes a snapshot (save or compaction) it also writes
+`<snapshot>.bin`: the records as columns, one list per field, serialized
+with `marshal` in chunks of CHUNK_ROWS records as they stream past, so
+writing one holds a chunk in memory rather than the whole collection.
+Repeated strings that were interned (statuses, priorities, tags, weekdays)
+are written once per chunk and come back interned. Decoding is a C call
+per chunk instead of parsing indented JSON record by record, and objects
+are built by calling the model class over the columns rather than through
+a dict per record.
+
+A header at the end of the file records the Python version (marshal's
+format is private to it), the chunk sizes, and the size and SHA-256 of the
+JSON snapshot it was written with. A .bin file from another Python, or
+whose JSON has since changed (edited by hand, copied over, or a crash
+between the two writes), is ignored and JSON is used. Hashing the JSON
+costs a read of the file but is still a fraction of parsing it.
+"""
+import hashlib
+import inspect
+import itertools
+import marshal
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar('T')
+
+BINARY_SUFFIX = ".bin"
+MAGIC = b"PKMSBIN1"
+FORMAT_VERSION = 3
+# Records per marshalled chunk: bounds the memory a write holds
+CHUNK_ROWS = 4096
+_HEADER_LENGTH = struct.Struct("<I")
+
+class SnapshotWriter:
+    """
+    Writes `<json_path>.bin` alongside a JSON snapshot, one record at a time.
+
+    Records go to a temp file in column chunks; `finish` appends the header
+    and renames it into place once the JSON is written. Writing is
+    abandoned (`valid` becomes False) if records don't all have the same
+    keys, since the columns could not reproduce them exactly.
+    """
+
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self.bin_path = json_path + BINARY_SUFFIX
+        self.tmp_path = self.bin_path + ".tmp"
+        self.fields: Optional[Tuple[str, ...]] = None
+        self.columns: List[List[Any]] = []
+        self.chunks: List[int] = [] # byte size of each chunk written
+        self.count = 0
+        self.valid = True
+        self._file = open(self.tmp_path, 'wb')
+        self._file.write(MAGIC)
+
+    def add(self, record: Dict[str, Any]):
+        if not self.valid:
+            return
+        if self.fields is None:
+            self.fields = tuple(record)
+            self.columns = [[] for _ in self.fields]
+        if len(record) != len(self.fields) or any(f not in record for f in self.fields):
+            self.abort()
+            return
+        for column, field in zip(self.columns, self.fields):
+            column.append(record[field])
+        self.count += 1
+        if len(self.columns[0]) >= CHUNK_ROWS:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        data = marshal.dumps(self.columns)
+        self._file.write(data)
+        self.chunks.append(len(data))
+        self.columns = [[] for _ in self.columns]
+
+    def finish(self, json_sha256: str):
+        """Completes the .bin for the JSON just written, or removes a stale one."""
+        if not self.valid:
+            if os.path.exists(self.bin_path):
+                os.remove(self.bin_path)
+            return
+        if self.columns and self.columns[0]:
+            self._write_chunk()
+        header = marshal.dumps({
+            'version': FORMAT_VERSION,
+            'python': _python_version(),
+            'source_size': os.path.getsize(self.json_path),
+            'source_sha256': json_sha256,
+            'fields': self.fields or (),
+            'count': self.count,
+            'chunks': self.chunks,
+        })
+        self._file.write(header)
+        self._file.write(_HEADER_LENGTH.pack(len(header)))
+        self._file.write(MAGIC)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.bin_path)
+
+    def abort(self):
+        """Stops writing and removes the temp file."""
+        self.valid = False
+        self.columns = []
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def _python_version() -> Tuple[int, int, int]:
+    return sys.version_info[0], sys.version_info[1], marshal.version
+
+def _sha256_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def _read_header(f) -> Optional[Dict[str, Any]]:
+    """The trailing header of an open .bin file, or None if it isn't one of ours."""
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    f.seek(-(_HEADER_LENGTH.size + len(MAGIC)), os.SEEK_END)
+    (length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    f.seek(-(length + _HEADER_LENGTH.size + len(MAGIC)), os.SEEK_END)
+    header = marshal.loads(f.read(length))
+    return header if header.get('version') == FORMAT_VERSION else None
+
+def read_snapshot(json_path: str) -> Optional[Tuple[Tuple[str, ...], List[List[Any]]]]:
+    """
+    Returns (fields, columns) from a fresh `<json_path>.bin`, else None.
+
+    Fresh means it was written by this Python version and the JSON snapshot
+    still has the size and SHA-256 recorded when the .bin was written.
+    """
+    bin_path = json_path + BINARY_SUFFIX
+    if not os.path.exists(bin_path) or not os.path.exists(json_path):
+        return None
+    try:
+        with open(bin_path, 'rb') as f:
+            header = _read_header(f)
+            if header is None or tuple(header['python']) != _python_version():
+                return None
+            if header['source_size'] != os.path.getsize(json_path):
+                return None
+            if header['source_sha256'] != _sha256_file(json_path):
+                return None
+            f.seek(len(MAGIC))
+            data = memoryview(f.read(sum(header['chunks'])))
+        columns: List[List[Any]] = [[] for _ in header['fields']]
+        offset = 0
+        for size in header['chunks']:
+            for column, part in zip(columns, marshal.loads(data[offset:offset + size])):
+                column.extend(part)
+            offset += size
+    except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error):
+        print(f"Warning: Could not read binary snapshot {bin_path}. Using JSON.")
+        return None
+    return header['fields'], columns
+
+def verify_snapshot(json_path: str) -> bool:
+    """Re-hashes the JSON snapshot and checks it against the hash stored in the .bin."""
+    try:
+        with open(json_path + BINARY_SUFFIX, 'rb') as f:
+            header = _read_header(f)
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return False
+    if header is None:
+        return False
+    return _sha256_file(json_path) == header['source_sha256']
+
+def build_objects(model_class: Type[T], fields: Tuple[str, ...], columns: List[List[Any]]) -> List[T]:
+    """
+    Creates model objects by calling `model_class` over the columns.
+
+    Each constructor parameter takes the column of the same name, or its
+    default when the snapshot has no such field; fields the constructor
+    doesn't take (a Link's derived id) are dropped. That is what the
+    models' from_dict methods do record by record, so objects get the same
+    defaults and interning, without a dict per record. Stored knowledge
+    bodies must already be ContentRefs (see DataManager._resolve_columns).
+    """
+    count = len(columns[0]) if columns else 0
+    args = []
+    for name, param in inspect.signature(model_class).parameters.items():
+        if name in fields:
+            args.append(columns[fields.index(name)])
+        elif param.default is not param.empty:
+            args.append(itertools.repeat(param.default, count))
+        else:
+            raise KeyError(name)
+    return list(map(model_class, *args))
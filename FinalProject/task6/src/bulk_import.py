@@ -0,0 +1,264 @@
+"""
+Non-interactive bulk import of knowledge entries and tasks.
+
+Sources are streamed record by record and written to the store in
+batches, one append/transaction per batch:
+
+    python -m src.bulk_import pkm notes.jsonl
+    python -m src.bulk_import pkm ~/vault/          # folder of .md files
+    python -m src.bulk_import task tasks.csv
+
+Tasks may name their linked note by title (`knowledge_link_title`)
+instead of by ID; titles are resolved against notes already in the store
+and notes imported earlier in the same run.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import KnowledgeEntry, Task
+
+DEFAULT_BATCH_SIZE = 5000
+VALID_PRIORITIES = {"low", "medium", "high"}
+VALID_STATUSES = {"pending", "complete"}
+TRUE_STRINGS = {"1", "true", "yes", "y"}
+
+# --- Sources ---
+
+def iter_jsonl(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yields (line number, parsed object) for each non-blank JSON line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, ValueError(f"invalid JSON: {e}")
+
+def iter_csv(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yields (row number, dict) for each CSV row; `tags` is comma-separated."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row_no, row in enumerate(csv.DictReader(f), 2):
+            record: Dict[str, Any] = {k: v for k, v in row.items() if k and v != ""}
+            if 'tags' in record:
+                record['tags'] = [t.strip() for t in record['tags'].split(',') if t.strip()]
+            for flag in ('is_summarized', 'is_prioritized'):
+                if flag in record:
+                    record[flag] = record[flag].strip().lower() in TRUE_STRINGS
+            yield row_no, record
+
+def _parse_markdown(text: str, fallback_title: str) -> Dict[str, Any]:
+    """Reads optional `---` front matter (title, tags), then uses the first `# ` heading as title."""
+    title, tags = None, []
+    lines = text.splitlines()
+    if lines and lines[0].strip() == "---" and "---" in (l.strip() for l in lines[1:]):
+        end = next(i for i in range(1, len(lines)) if lines[i].strip() == "---")
+        for line in lines[1:end]:
+            key, _, value = line.partition(":")
+            key, value = key.strip().lower(), value.strip()
+            if key == "title":
+                title = value.strip('"\'')
+            elif key == "tags":
+                tags = [t.strip().strip('"\'') for t in value.strip("[]").split(",") if t.strip()]
+        lines = lines[end + 1:]
+    if title is None:
+        for i, line in enumerate(lines):
+            if line.startswith("# "):
+                title = line[2:].strip()
+                del lines[i]
+                break
+    return {'title': title or fallback_title, 'content': "\n".join(lines).strip(), 'tags': tags}
+
+def iter_markdown_folder(path: str) -> Iterator[Tuple[str, Any]]:
+    """Yields (relative path, record) for every .md file under a folder, in sorted order."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(".md"):
+                continue
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, path)
+            try:
+                with open(full, 'r', encoding='utf-8') as f:
+                    yield rel, _parse_markdown(f.read(), os.path.splitext(name)[0])
+            except (OSError, UnicodeDecodeError) as e:
+                yield rel, ValueError(str(e))
+
+def open_source(path: str) -> Iterator[Tuple[Any, Any]]:
+    """Picks a reader from the path: a folder of Markdown, .csv, or JSON Lines."""
+    if os.path.isdir(path):
+        return iter_markdown_folder(path)
+    if path.lower().endswith(".csv"):
+        return iter_csv(path)
+    return iter_jsonl(path)
+
+# --- Validation ---
+
+def _check_common(record: Any):
+    """Checks the fields knowledge entries and tasks share: an object with a title and an optional string id."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    if not isinstance(record.get('title'), str) or not record['title'].strip():
+        raise ValueError("missing title")
+    if 'id' in record and (not isinstance(record['id'], str) or not record['id'].strip()):
+        raise ValueError("id must be a non-empty string")
+    if not isinstance(record.get('created_at', ""), str):
+        raise ValueError("created_at must be a string")
+
+def _check_optional_string(record: Dict[str, Any], field: str):
+    if record.get(field) is not None and not isinstance(record[field], str):
+        raise ValueError(f"{field} must be a string")
+
+def _check_choice(record: Dict[str, Any], field: str, default: str, choices: set):
+    # Type first: a list or dict value would make the set lookup raise TypeError
+    value = record.get(field, default)
+    if not isinstance(value, str) or value not in choices:
+        raise ValueError(f"{field} must be one of {sorted(choices)}")
+
+def validate_knowledge(record: Any) -> KnowledgeEntry:
+    """Builds a KnowledgeEntry or raises ValueError describing what is wrong."""
+    _check_common(record)
+    if not isinstance(record.get('content', ""), str):
+        raise ValueError("content must be a string")
+    _check_optional_string(record, 'summary')
+    tags = record.get('tags') or []
+    if not isinstance(tags, list) or not all(isinstance(t, str) for t in tags):
+        raise ValueError("tags must be a list of strings")
+    if not isinstance(record.get('is_summarized', False), bool):
+        raise ValueError("is_summarized must be true or false")
+    return KnowledgeEntry.from_dict({**record, 'content': record.get('content', ""), 'tags': tags})
+
+def validate_task(record: Any, titles: Dict[str, str]) -> Task:
+    """Builds a Task (resolving `knowledge_link_title`) or raises ValueError."""
+    _check_common(record)
+    if not isinstance(record.get('description', ""), str):
+        raise ValueError("description must be a string")
+    due_date = record.get('due_date', "")
+    if due_date:
+        try:
+            datetime.strptime(due_date, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValueError(f"due_date '{due_date}' is not YYYY-MM-DD")
+    _check_choice(record, 'priority', "medium", VALID_PRIORITIES)
+    _check_choice(record, 'status', "pending", VALID_STATUSES)
+    _check_optional_string(record, 'knowledge_link_id')
+    _check_optional_string(record, 'knowledge_link_title')
+    if not isinstance(record.get('is_prioritized', False), bool):
+        raise ValueError("is_prioritized must be true or false")
+
+    data = {**record, 'description': record.get('description', ""), 'due_date': due_date}
+    link_title = data.pop('knowledge_link_title', None)
+    if link_title and not data.get('knowledge_link_id'):
+        link_id = titles.get(link_title.strip().lower())
+        if link_id is None:
+            raise ValueError(f"no knowledge entry titled '{link_title}'")
+        data['knowledge_link_id'] = link_id
+    return Task.from_dict(data)
+
+# --- Pipeline ---
+
+class ImportReport:
+    """Counts of what a bulk import wrote and rejected."""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected: List[Tuple[Any, str]] = [] # (line/row/file, reason)
+        self.batches = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (f"ImportReport(imported={self.imported}, rejected={len(self.rejected)}, "
+                f"batches={self.batches}, seconds={self.seconds:.1f})")
+
+def known_titles(data_manager) -> Dict[str, str]:
+    """Maps lowercased knowledge titles already in the store to their IDs."""
+    return {e.title.strip().lower(): e.id for e in data_manager.iter_data(KnowledgeEntry, 'pkm')}
+
+def bulk_import(data_manager, file_type: str, records: Iterable[Tuple[Any, Any]],
+                batch_size: int = DEFAULT_BATCH_SIZE, titles: Optional[Dict[str, str]] = None,
+                progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """
+    Validates (location, record) pairs and writes them to the store in batches.
+
+    Each batch is a single durable write: one fsynced journal append for the
+    JSON DataManager or one transaction for SQLite. Invalid records are
+    skipped and listed in the returned report. `titles` is updated with
+    imported knowledge so later tasks can link to it by title.
+
+    The JSON journal is compacted once after the import rather than after
+    every batch that crosses its threshold.
+    """
+    if titles is None:
+        titles = known_titles(data_manager) if file_type == 'task' else {}
+    report = ImportReport()
+    start = time.perf_counter()
+    batch: List[Any] = []
+
+    def flush():
+        if batch:
+            data_manager.append_records(batch, file_type, durable=True)
+            report.imported += len(batch)
+            report.batches += 1
+            batch.clear()
+            if progress is not None:
+                progress(report)
+
+    suspended = nullcontext() if data_manager.supports_queries else data_manager.compaction_suspended()
+    with suspended:
+        for location, record in records:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                if file_type == 'pkm':
+                    obj = validate_knowledge(record)
+                    titles.setdefault(obj.title.strip().lower(), obj.id)
+                else:
+                    obj = validate_task(record, titles)
+            except ValueError as e:
+                report.rejected.append((location, str(e)))
+                continue
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import knowledge entries or tasks.")
+    parser.add_argument("kind", choices=("pkm", "task"), help="What the source contains")
+    parser.add_argument("source", help="A .jsonl or .csv file, or a folder of .md notes")
+    parser.add_argument("--data-dir", default=".data")
+    parser.add_argument("--storage", choices=("json", "sqlite"), help="Defaults to $PKMS_STORAGE, else json")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from .__main__ import make_data_manager
+    data_manager = make_data_manager(args.data_dir, args.storage)
+
+    started = time.perf_counter()
+
+    def print_progress(report: ImportReport):
+        rate = report.imported / max(time.perf_counter() - started, 1e-9)
+        print(f"  ...{report.imported} imported, {len(report.rejected)} rejected ({rate:,.0f} records/s)")
+
+    report = bulk_import(data_manager, args.kind, open_source(args.source),
+                         batch_size=args.batch_size, progress=print_progress)
+    if not data_manager.supports_queries:
+        data_manager.wait_for_compaction()
+
+    print(f"Imported {report.imported} records in {report.batches} batches ({report.seconds:.1f}s).")
+    for location, reason in report.rejected[:20]:
+        print(f"  Rejected {location}: {reason}")
+    if len(report.rejected) > 20:
+        print(f"  ...and {len(report.rejected) - 20} more rejected records.")
+    return 0 if not report.rejected else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class ChangeTracker:
+    """
+    Remembers which records were added, modified or deleted since the last flush.
+
+    Records are keyed by file type and ID, so editing the same task twice
+    before a flush writes it once. A deleted record is kept as a None
+    tombstone under its ID. `flush` hands each file type's dirty
+    records to the data manager in one durable append, which keeps the
+    cost of a save proportional to the edits rather than the collection.
+    """
+
+    def __init__(self):
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Held from taking the dirty set until it is written, so two flushes
+        # can't append an older version of a record after a newer one
+        self._flush_lock = threading.Lock()
+        # Set whenever a record is marked; the autosaver waits on it
+        self.changed = threading.Event()
+        self.last_change = 0.0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(records) for records in self._dirty.values())
+
+    def mark(self, record: Any, file_type: str):
+        """Flags a new or modified record for the next flush."""
+        with self._lock:
+            self._dirty.setdefault(file_type, {})[record.id] = record
+            self.last_change = time.monotonic()
+        self.changed.set()
+
+    def mark_all(self, records, file_type: str):
+        for record in records:
+            self.mark(record, file_type)
+
+    def mark_deleted(self, record_id: str, file_type: str):
+        """Flags a record for removal at the next flush (replacing any unsaved edit)."""
+        with self._lock:
+            self._dirty.setdefault(file_type, {})[record_id] = None
+            self.last_change = time.monotonic()
+        self.changed.set()
+
+    def is_dirty(self, file_type: Optional[str] = None) -> bool:
+        with self._lock:
+            if file_type is None:
+                return any(self._dirty.values())
+            return bool(self._dirty.get(file_type))
+
+    def flush(self, data_manager, durable: bool = True) -> int:
+        """Writes (or deletes) every dirty record and returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+                self.changed.clear()
+            written = 0
+            try:
+                for file_type, records in dirty.items():
+                    deleted = [record_id for record_id, record in records.items() if record is None]
+                    # When puts follow, their durable append also covers the deletes
+                    if deleted:
+                        data_manager.delete_records(deleted, file_type, durable=durable and len(deleted) == len(records))
+                    if len(deleted) < len(records):
+                        data_manager.append_records([r for r in records.values() if r is not None], file_type,
+                                                    durable=durable)
+                    written += len(records)
+            except Exception:
+                # Put back what was not written so a later flush can retry it
+                with self._lock:
+                    for file_type, records in dirty.items():
+                        for record_id, record in records.items():
+                            self._dirty.setdefault(file_type, {}).setdefault(record_id, record)
+                    self.changed.set()
+                raise
+            return written
+
+class AutoSaver(threading.Thread):
+    """
+    Write-behind thread that flushes a ChangeTracker after edits settle.
+
+    A flush happens once no record has been marked for `interval` seconds,
+    or `max_delay` seconds after the first unsaved edit during a steady
+    stream of edits, so at most that many seconds of work is lost on a crash.
+    """
+
+    def __init__(self, tracker: ChangeTracker, data_manager, interval: float = 2.0,
+                 max_delay: Optional[float] = None):
+        super().__init__(name="pkms-autosave", daemon=True)
+        self.tracker = tracker
+        self.data_manager = data_manager
+        self.interval = interval
+        self.max_delay = max_delay if max_delay is not None else 5 * interval
+        self.flushes = 0
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            if not self.tracker.changed.wait(timeout=0.5):
+                continue
+            first_change = time.monotonic()
+            # Debounce: wait for a quiet period, bounded by max_delay
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                quiet_until = self.tracker.last_change + self.interval
+                deadline = first_change + self.max_delay
+                if now >= quiet_until or now >= deadline:
+                    break
+                self._stopping.wait(min(quiet_until, deadline) - now)
+            if self._stopping.is_set():
+                break # stop() decides whether to flush
+            try:
+                if self.tracker.flush(self.data_manager):
+                    self.flushes += 1
+            except OSError as e:
+                print(f"\n[AUTOSAVE] Could not save changes: {e}")
+                self._stopping.wait(self.interval)
+
+    def stop(self, flush: bool = True):
+        """Stops the thread and (by default) writes anything still dirty."""
+        self._stopping.set()
+        if self.is_alive():
+            self.join()
+        if flush:
+            self.tracker.flush(self.data_manager)
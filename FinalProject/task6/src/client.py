@@ -0,0 +1,279 @@
+"""
+Command-line client for the PKMS daemon (daemon.py).
+
+    python -m src.client add-task "Write report" --due 2025-06-01
+    python -m src.client done 3f2a
+    python -m src.client search budget review
+    python -m src.client batch < commands.txt    # one command per line
+
+Each command is one request to the running daemon, so it costs a round
+trip over the socket rather than a load and save of the data. `batch`
+sends many commands over one connection. With no daemon listening, a
+command runs in this process instead: it loads what it needs and saves
+its change before exiting, like the menu.
+
+This module imports only the standard library, so the client starts fast;
+scripts can also use PKMSClient directly.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shlex
+import socket
+import sys
+from typing import Any, Dict, List, Optional
+
+SOCKET_FILE = "pkms.sock"
+TOKEN_FILE = "pkms.token"
+DEFAULT_PORT = 8765
+
+class DaemonError(Exception):
+    """A request that the daemon (or the in-process fallback) answered with an error."""
+
+def _result(response: Dict[str, Any]) -> Any:
+    if not response.get('ok'):
+        raise DaemonError(response.get('error'))
+    return response.get('result')
+
+def is_listening(socket_path: str) -> bool:
+    """True if something accepts connections on the Unix socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+def read_token(data_dir: str) -> Optional[str]:
+    """The token a daemon listening on TCP wrote for `data_dir`, or None."""
+    try:
+        with open(os.path.join(data_dir, TOKEN_FILE), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+class PKMSClient:
+    """
+    One connection to the daemon. `call` sends a request and waits for its
+    answer; raises OSError if no daemon is listening.
+
+    Over TCP the connection first presents `token` (see read_token); a
+    daemon that refuses it raises DaemonError.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, port: Optional[int] = None,
+                 timeout: Optional[float] = None, token: Optional[str] = None):
+        tcp = port is not None or socket_path is None or not hasattr(socket, 'AF_UNIX')
+        if tcp:
+            self.sock = socket.create_connection(("127.0.0.1", port if port is not None else DEFAULT_PORT), timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            try:
+                self.sock.connect(socket_path)
+            except OSError:
+                self.sock.close()
+                raise
+        self._reader = self.sock.makefile('rb')
+        if tcp:
+            try:
+                self._send({'token': token})
+            except (DaemonError, ConnectionError):
+                self.close()
+                raise
+
+    def _send(self, request: Dict[str, Any]) -> Any:
+        self.sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return _result(json.loads(line))
+
+    def call(self, op: str, **args) -> Any:
+        return self._send({'op': op, 'args': args})
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self) -> 'PKMSClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class LocalClient:
+    """Runs requests in this process, for when no daemon is listening. Saves on close."""
+
+    def __init__(self, data_dir: str):
+        from .daemon import PKMSService
+        from .__main__ import PKMSTaskManager, make_data_manager
+        # Keep stdout to results; the manager announces itself on start-up
+        with contextlib.redirect_stdout(sys.stderr):
+            manager = PKMSTaskManager(data_manager=make_data_manager(data_dir), autosave_interval=0)
+        self.service = PKMSService(manager)
+
+    def call(self, op: str, **args) -> Any:
+        return _result(self.service.handle({'op': op, 'args': args}))
+
+    def close(self):
+        self.service.close()
+
+    def __enter__(self) -> 'LocalClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# --- Output ---
+
+def _show_task(task: Dict[str, Any]) -> str:
+    due = f" (Due: {task['due_date']})" if task['due_date'] else ""
+    return f"{task['id'][:8]}  {('[' + task['priority'].upper() + ']').ljust(9)}{task['title']}{due}"
+
+def _show_schedule(schedule: Dict[str, Any]) -> str:
+    location = f" ({schedule['location']})" if schedule['location'] else ""
+    return (f"{schedule['day_of_week'].ljust(10)} | {schedule['start_time']} - {schedule['end_time']}"
+            f" | {schedule['title']}{location}")
+
+def _show_search(result: Dict[str, Any]) -> str:
+    lines = [f"{hit['id'][:8]}  {hit['score']:6.2f}  {hit['title']}" for hit in result['results']]
+    return "\n".join(lines + [f"({len(result['results'])} of {result['total']} results)"])
+
+SHOW = {
+    'add_note': lambda r: f"Knowledge entry '{r['title']}' added with ID: {r['id']}",
+    'add_task': lambda r: f"Task '{r['title']}' added with ID: {r['id']}. Priority: {r['priority']}",
+    'tasks': lambda r: "\n".join(_show_task(t) for t in r) or "No tasks found.",
+    'done': lambda r: f"Task '{r['title']}' marked as COMPLETE.",
+    'delete': lambda r: f"Task '{r['title']}' deleted.",
+    'search': _show_search,
+    'schedules': lambda r: "\n".join(_show_schedule(s) for s in r) or "No schedules found.",
+    'now': lambda r: "\n".join(_show_schedule(s) for s in r) or "Nothing scheduled.",
+    'add_schedule': lambda r: f"Schedule '{r['title']}' on {r['day_of_week']} added successfully.",
+    'link': lambda r: f"Linked {r['source_id'][:8]}... -> {r['target_id'][:8]}...",
+    'flush': lambda r: f"Saved {r} changed records.",
+    'shutdown': lambda r: f"Daemon stopped; saved {r} changed records.",
+    'ping': lambda r: "Daemon is running.",
+}
+
+# --- Commands ---
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pkms", description="Talk to the PKMS daemon (or run a command in-process).")
+    parser.add_argument("--data-dir", default=".data")
+    parser.add_argument("--socket", help=f"Daemon socket (default: <data-dir>/{SOCKET_FILE})")
+    parser.add_argument("--port", type=int, help="Connect to 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name: str, op: str, build, help: str) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help)
+        sub.set_defaults(op=op, build=build)
+        return sub
+
+    sub = command("add-note", "add_note", lambda a: {'title': a.title, 'content': a.content,
+                  'tags': [t.strip() for t in a.tags.split(',') if t.strip()] if a.tags else []}, "Add a knowledge entry")
+    sub.add_argument("title")
+    sub.add_argument("content", nargs="?", default="")
+    sub.add_argument("--tags", help="Comma-separated")
+    sub = command("add-task", "add_task", lambda a: {'title': a.title, 'description': a.description,
+                  'due_date': a.due, 'link': a.link}, "Add a task")
+    sub.add_argument("title")
+    sub.add_argument("--description", default="")
+    sub.add_argument("--due", default="", help="YYYY-MM-DD")
+    sub.add_argument("--link", help="ID (or prefix) of a knowledge entry")
+    sub = command("tasks", "tasks", lambda a: {'status': a.status, 'limit': a.limit}, "List tasks, most urgent first")
+    sub.add_argument("--status", choices=("pending", "complete"), default="pending")
+    sub.add_argument("--limit", type=int)
+    command("done", "done", lambda a: {'id': a.id}, "Mark a task complete").add_argument("id")
+    command("delete", "delete", lambda a: {'id': a.id}, "Delete a task").add_argument("id")
+    sub = command("search", "search", lambda a: {'query': " ".join(a.query), 'limit': a.limit, 'offset': a.offset},
+                  "Search knowledge entries")
+    sub.add_argument("query", nargs="+")
+    sub.add_argument("--limit", type=int, default=10)
+    sub.add_argument("--offset", type=int, default=0)
+    command("schedules", "schedules", lambda a: {}, "List schedule blocks")
+    command("now", "now", lambda a: {'at': a.at}, "Show what's scheduled now").add_argument(
+        "--at", help="ISO date and time instead of now")
+    sub = command("add-schedule", "add_schedule", lambda a: {'title': a.title, 'day': a.day, 'start_time': a.start,
+                  'end_time': a.end, 'location': a.location, 'force': a.force}, "Add a weekly schedule block")
+    for name in ("title", "day", "start", "end"):
+        sub.add_argument(name)
+    sub.add_argument("--location")
+    sub.add_argument("--force", action="store_true", help="Add it even if it overlaps another block")
+    sub = command("link", "link", lambda a: {'source': a.source, 'target': a.target}, "Link two notes or tasks")
+    sub.add_argument("source")
+    sub.add_argument("target")
+    command("flush", "flush", lambda a: {}, "Save pending edits now")
+    command("stop", "shutdown", lambda a: {}, "Save and stop the daemon")
+    command("ping", "ping", lambda a: {}, "Check that the daemon is running")
+    command("batch", None, None, "Run commands read from stdin, one per line, over one connection")
+    return parser
+
+def run(client, args: argparse.Namespace) -> None:
+    result = client.call(args.op, **args.build(args))
+    print(json.dumps(result) if args.json else SHOW[args.op](result))
+
+def run_batch(client, parser: argparse.ArgumentParser, lines, as_json: bool) -> int:
+    """Runs one command per line (blank lines and # comments are skipped); returns how many failed."""
+    failed = 0
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.op is None:
+                raise DaemonError("batch can't be nested")
+            args.json = args.json or as_json
+            run(client, args)
+        except (DaemonError, ValueError) as e:
+            print(f"line {line_no}: Error: {e}", file=sys.stderr)
+            failed += 1
+        except SystemExit: # argparse has printed why
+            failed += 1
+    return failed
+
+def connect(args: argparse.Namespace):
+    """
+    A PKMSClient if the daemon answers, else a LocalClient (None for
+    commands that need the daemon).
+
+    Only "nothing is listening" (no socket file, or the connection is
+    refused) falls back to running in-process. Any other failure, such as
+    a reset handshake, a timeout or a permission error, is raised: the
+    daemon may be running, and running the command locally too would
+    write the same data from two processes.
+    """
+    try:
+        return PKMSClient(args.socket or os.path.join(args.data_dir, SOCKET_FILE), args.port,
+                          token=read_token(args.data_dir))
+    except (FileNotFoundError, ConnectionRefusedError):
+        if args.op in ('shutdown', 'ping'):
+            return None
+        return LocalClient(args.data_dir)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        client = connect(args)
+    except (DaemonError, OSError) as e:
+        print(f"Error: {e}")
+        return 1
+    if client is None:
+        print("No daemon is running.")
+        return 1
+    with client:
+        try:
+            if args.command == "batch":
+                return 1 if run_batch(client, parser, sys.stdin, args.json) else 0
+            run(client, args)
+        except (DaemonError, ConnectionError) as e:
+            print(f"Error: {e}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
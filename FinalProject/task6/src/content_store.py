@@ -0,0 +1,137 @@
+"""
+Out-of-line storage for large knowledge entry bodies.
+
+Bodies longer than LARGE_CONTENT_THRESHOLD characters are appended, UTF-8
+encoded, to one file per data directory (`.data/content.dat`). Snapshots,
+journals and SQLite rows then store the body's [offset, length] in that
+file instead of the text, and an entry loaded from them holds a small
+ContentRef and reads the body only when `content` is accessed.
+
+Reads go through a read-only memory map of the file: `get` and `preview`
+decode straight from the mapped pages, so a body is copied once (into the
+str the caller asked for), and the OS rather than the process heap
+decides how much of the file stays resident.
+
+A body is appended when an entry whose text is in memory (new or edited)
+is written; writing the same entry again reuses its reference. Bodies of
+edited or deleted entries are not reclaimed and stay in the file.
+"""
+import mmap
+import os
+import threading
+from typing import Any, List, Optional, Union
+
+from .metrics import metrics
+
+CONTENT_FILE = "content.dat"
+# Bodies longer than this many characters are kept in the content store
+LARGE_CONTENT_THRESHOLD = 4096
+
+class ContentRef:
+    """Pointer to a body held in a ContentStore (byte offset and length)."""
+    __slots__ = ('store', 'offset', 'length')
+
+    def __init__(self, store: 'ContentStore', offset: int, length: int):
+        self.store = store
+        self.offset = offset
+        self.length = length
+
+class ContentStore:
+    """
+    Append-only file of large bodies. The file is opened on first use, so
+    a data directory without large notes never gets one.
+
+    Writes go straight to the OS (no Python buffer), so a body is in the
+    file before any journal line or row that refers to it is written.
+    `sync` fsyncs it for durable writes. The map is re-created when a read
+    reaches past its end, i.e. after appends.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._end = 0
+        self._dirty = False
+        self._map: Optional[mmap.mmap] = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a+b', buffering=0)
+            self._end = self._file.seek(0, os.SEEK_END)
+        return self._file
+
+    def put(self, text: str) -> ContentRef:
+        """Appends a body and returns a reference to it."""
+        data = text.encode('utf-8')
+        with self._lock:
+            f = self._open()
+            f.write(data)
+            ref = ContentRef(self, self._end, len(data))
+            self._end += len(data)
+            self._dirty = True
+        metrics.inc("pkms_storage_written_bytes_total", len(data), file=CONTENT_FILE)
+        return ref
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        """Zero-copy bytes of the file, remapping it if they lie past the mapped end."""
+        end = offset + length
+        current = self._map
+        if current is None or len(current) < end:
+            with self._lock:
+                if self._map is None or len(self._map) < end:
+                    # The old map is left to the garbage collector; another
+                    # thread may still be decoding from it
+                    self._map = mmap.mmap(self._open().fileno(), 0, access=mmap.ACCESS_READ)
+                current = self._map
+        metrics.inc("pkms_storage_read_bytes_total", length, file=CONTENT_FILE)
+        return memoryview(current)[offset:end]
+
+    def get(self, ref: ContentRef) -> str:
+        """Decodes a body from its reference."""
+        return str(self._view(ref.offset, ref.length), 'utf-8')
+
+    def preview(self, ref: ContentRef, chars: int) -> str:
+        """The first `chars` characters of a body, decoding only that prefix."""
+        # At most 4 bytes per character; a character cut in half is dropped
+        return str(self._view(ref.offset, min(ref.length, chars * 4)), 'utf-8', 'ignore')[:chars]
+
+    def ref(self, stored: List[int]) -> ContentRef:
+        """A reference from the [offset, length] pair stored in a record."""
+        offset, length = stored
+        return ContentRef(self, offset, length)
+
+    def stored(self, value: Union[str, ContentRef]) -> Union[str, List[int]]:
+        """
+        What a record stores for a body: the text itself if it is short,
+        else its [offset, length] here (appending the body if it isn't in
+        this store yet).
+        """
+        if isinstance(value, ContentRef):
+            if value.store is self:
+                return [value.offset, value.length]
+            value = value.store.get(value)
+        if len(value) <= LARGE_CONTENT_THRESHOLD:
+            return value
+        ref = self.put(value)
+        return [ref.offset, ref.length]
+
+    def sync(self):
+        """Fsyncs bodies appended since the last sync."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def close(self):
+        with self._lock:
+            self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._dirty = False
+
+def is_stored_ref(value: Any) -> bool:
+    """True for a stored [offset, length] pair rather than the body text."""
+    return isinstance(value, list)
@@ -0,0 +1,323 @@
+"""
+Resident PKMS server: keeps notes, tasks, schedules and links in memory
+and answers requests over a local socket, so scripts don't pay for
+loading (and saving) the data on every command.
+
+    python -m src.daemon                    # listens on .data/pkms.sock
+    python -m src.daemon --port 8765        # or on 127.0.0.1:8765, with a token
+
+The protocol is JSON Lines. Each request is one line,
+{"op": "add_task", "args": {"title": "..."}}, answered by one line,
+{"ok": true, "result": ...} or {"ok": false, "error": "..."}, and a
+connection can carry any number of requests. `python -m src.client` is
+the command-line client.
+
+The Unix socket is created readable and writable by this user only. TCP
+has no such check, so a TCP daemon writes a random token to
+`<data-dir>/pkms.token` (mode 0600) and every connection must open with
+{"token": "..."} before its first request.
+
+Edits are written behind by the manager's AutoSaver (see
+change_tracker.py) once they pause; anything still pending is saved on
+`flush`, `shutdown`, SIGTERM or Ctrl+C. While the daemon is up, use it
+rather than the menu on the same data directory: neither sees the
+other's edits.
+"""
+import argparse
+import hmac
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .models import KnowledgeEntry, Schedule
+from .id_index import AmbiguousPrefixError
+from .schedule_index import WEEKDAYS, weekday_number
+from .metrics import metrics
+from .client import DEFAULT_PORT, SOCKET_FILE, TOKEN_FILE, is_listening
+from .__main__ import PKMSTaskManager, OPERATION_SECONDS, make_data_manager
+
+# Seconds without edits before the daemon writes them
+DEFAULT_AUTOSAVE_SECONDS = 1.0
+
+def _note_dict(entry: KnowledgeEntry, score: Optional[float] = None) -> Dict[str, Any]:
+    # Bodies can be large and the client never prints them
+    result = {'id': entry.id, 'title': entry.title, 'tags': entry.tags, 'summary': entry.summary}
+    if score is not None:
+        result['score'] = score
+    return result
+
+class PKMSService:
+    """
+    The daemon's operations over a PKMSTaskManager, called by name with
+    JSON-friendly arguments and results (each `op_<name>` method is
+    operation `<name>`).
+
+    Requests run one at a time under a lock: the manager's collections
+    and indexes aren't safe to change from several threads at once.
+    """
+
+    def __init__(self, manager: PKMSTaskManager):
+        self.manager = manager
+        self.ops = {name[3:]: getattr(self, name) for name in dir(self) if name.startswith('op_')}
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """Runs one request and returns its response; errors become responses too."""
+        op = request.get('op') if isinstance(request, dict) else None
+        if not isinstance(op, str) or op not in self.ops:
+            return {'ok': False, 'error': f"unknown operation {op!r}"}
+        args = request.get('args') or {}
+        if not isinstance(args, dict):
+            return {'ok': False, 'error': "'args' must be an object"}
+        try:
+            with self._lock, metrics.timer(OPERATION_SECONDS, op=f"daemon_{op}"):
+                if self.closed:
+                    return {'ok': False, 'error': "the daemon is shutting down"}
+                result = self.ops[op](**args)
+        except AmbiguousPrefixError as e:
+            return {'ok': False, 'error': f"'{e.prefix}' matches {len(e.matches)} records. Use more of the ID."}
+        except (LookupError, ValueError, TypeError) as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            print(f"[ERROR] {op}: {e}")
+            return {'ok': False, 'error': f"unexpected error: {e}"}
+        return {'ok': True, 'result': result}
+
+    def close(self) -> int:
+        """Refuses further requests and saves everything; returns how many records were written."""
+        with self._lock:
+            self.closed = True
+            written = self.manager.flush_changes()
+            if self.manager._is_loaded('sharded_search'):
+                self.manager.sharded_search.close()
+        return written
+
+    def warm_up(self):
+        """Loads the collections and indexes the operations use, so the first request isn't slow."""
+        manager = self.manager
+        for name in ('knowledge_ids', 'task_ids', 'pending_tasks', 'schedule_index', 'link_graph'):
+            getattr(manager, name)
+        manager.load_search()
+
+    def _task(self, id_prefix: str, status: Optional[str] = None):
+        task = self.manager.resolve_task(id_prefix, status)
+        if task is None:
+            raise LookupError(f"no {status + ' ' if status else ''}task matches '{id_prefix}'")
+        return task
+
+    # --- Operations ---
+
+    def op_ping(self) -> str:
+        return "pong"
+
+    def op_add_note(self, title: str, content: str = "", tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        if tags is not None and not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+            raise TypeError("'tags' must be a list of strings")
+        return _note_dict(self.manager.create_entry(title, content, tags))
+
+    def op_add_task(self, title: str, description: str = "", due_date: str = "",
+                    link: Optional[str] = None) -> Dict[str, Any]:
+        link_id = None
+        if link:
+            note = self.manager.knowledge_ids.resolve(link)
+            if note is None:
+                raise LookupError(f"no knowledge entry matches '{link}'")
+            link_id = note.id
+        return self.manager.create_task(title, description, due_date, link_id).to_dict()
+
+    def op_tasks(self, status: str = "pending", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [t.to_dict() for t in self.manager.tasks_by_priority(status, limit)]
+
+    def op_done(self, id: str) -> Dict[str, Any]:
+        task = self._task(id, status="pending")
+        self.manager.mark_complete(task)
+        return task.to_dict()
+
+    def op_delete(self, id: str) -> Dict[str, Any]:
+        task = self._task(id)
+        self.manager.delete_task(task)
+        return task.to_dict()
+
+    def op_search(self, query: str, limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+        query = query.lower()
+        page = self.manager.search_page(query, limit=limit, offset=offset)
+        return {'total': self.manager.search_count(query),
+                'results': [_note_dict(entry, score) for score, entry in page]}
+
+    def op_schedules(self) -> List[Dict[str, Any]]:
+        return [s.to_dict() for s in self.manager.schedule_index.ordered()]
+
+    def op_now(self, at: Optional[str] = None) -> List[Dict[str, Any]]:
+        when = datetime.fromisoformat(at) if at else datetime.now()
+        return [s.to_dict() for s in self.manager.schedule_index.at_datetime(when)]
+
+    def op_add_schedule(self, title: str, day: str, start_time: str, end_time: str,
+                        location: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+        """Adds a schedule block; one that overlaps others is refused unless `force` is set."""
+        schedule = Schedule(title=title, day_of_week=WEEKDAYS[weekday_number(day)],
+                            start_time=start_time, end_time=end_time, location=location)
+        conflicts = self.manager.schedule_index.conflicts(schedule)
+        if conflicts and not force:
+            overlaps = "; ".join(f"{o.day_of_week} {o.start_time} - {o.end_time} {o.title}" for o in conflicts)
+            raise ValueError(f"overlaps with {overlaps}")
+        self.manager.create_schedule(schedule)
+        return schedule.to_dict()
+
+    def op_link(self, source: str, target: str) -> Dict[str, Any]:
+        records = [self.manager._resolve_record(id_prefix) for id_prefix in (source, target)]
+        if records[0] is None or records[1] is None or records[0].id == records[1].id:
+            raise LookupError("both IDs must match a note or task, and not the same one")
+        return self.manager.link_records(records[0].id, records[1].id).to_dict()
+
+    def op_flush(self) -> int:
+        return self.manager.save_changes()
+
+    def op_shutdown(self) -> int:
+        # The server stops once this answer is sent; close() saves the rest
+        return self.manager.save_changes()
+
+# --- Server ---
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers the JSON Lines requests on one connection, in order."""
+
+    def setup(self):
+        # Answers are small; don't let TCP hold them back waiting for more
+        self.disable_nagle_algorithm = self.request.family != getattr(socket, 'AF_UNIX', None)
+        super().setup()
+
+    def _authenticate(self) -> bool:
+        """Reads the connection's opening {"token": ...} line; False (and an error sent) if it doesn't match."""
+        try:
+            token = json.loads(self.rfile.readline()).get('token')
+        except (ValueError, AttributeError):
+            token = None
+        if isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), self.server.token.encode('utf-8')):
+            self.wfile.write(b'{"ok": true, "result": null}\n')
+            return True
+        self.wfile.write(b'{"ok": false, "error": "missing or wrong token"}\n')
+        return False
+
+    def handle(self):
+        service: PKMSService = self.server.service
+        if self.server.token is not None and not self._authenticate():
+            return
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request, response = None, {'ok': False, 'error': f"invalid JSON: {e}"}
+            else:
+                response = service.handle(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            if response['ok'] and request.get('op') == 'shutdown':
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+if hasattr(socket, 'AF_UNIX'):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+def make_server(service: PKMSService, socket_path: Optional[str] = None,
+                port: Optional[int] = None, token: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    Binds a server for `service` to a Unix socket at `socket_path`, or to
+    127.0.0.1:`port` when a port is given (or Unix sockets aren't available).
+    A TCP server needs a `token` that clients must present.
+    """
+    if port is not None or socket_path is None or not hasattr(socket, 'AF_UNIX'):
+        if not token:
+            raise ValueError("a TCP server needs a token")
+        server = _TCPServer(("127.0.0.1", port if port is not None else DEFAULT_PORT), _RequestHandler)
+    else:
+        if os.path.exists(socket_path):
+            if is_listening(socket_path):
+                raise OSError(f"a daemon is already listening on {socket_path}")
+            os.remove(socket_path) # left behind by a daemon that didn't shut down
+        # Create the socket with no access for others, rather than chmod it after bind
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixServer(socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        token = None
+    server.service = service
+    server.token = token
+    return server
+
+def write_token(data_dir: str, token: str):
+    """Writes `token` to `<data-dir>/pkms.token`, readable by this user only."""
+    path = os.path.join(data_dir, TOKEN_FILE)
+    os.makedirs(data_dir, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path) # so the new file gets the mode below
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+
+def serve(manager: PKMSTaskManager, socket_path: Optional[str] = None, port: Optional[int] = None) -> int:
+    """Serves requests until `shutdown`, SIGTERM or Ctrl+C; returns how many records were saved on the way out."""
+    service = PKMSService(manager)
+    service.warm_up()
+    data_dir = manager.data_manager.data_dir
+    tcp = port is not None or not hasattr(socket, 'AF_UNIX')
+    token = secrets.token_hex(32) if tcp else None
+    server = make_server(service, socket_path, port, token)
+    if token is not None:
+        write_token(data_dir, token)
+    address = server.server_address
+    address = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else address
+    # shutdown() waits for serve_forever() to return, so it can't run on this (the serving) thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Serving '{data_dir}' on {address}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.address_family == getattr(socket, 'AF_UNIX', None):
+            os.remove(address)
+        if token is not None:
+            os.remove(os.path.join(data_dir, TOKEN_FILE))
+        written = service.close()
+    print(f"\nSaved {written} changed records to {data_dir}.")
+    return written
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve the PKMS data from memory over a local socket.")
+    parser.add_argument("--data-dir", default=".data")
+    parser.add_argument("--storage", choices=("json", "sqlite"),
+                        default=os.environ.get("PKMS_STORAGE", "json").lower())
+    parser.add_argument("--socket", help=f"Unix socket path (default: <data-dir>/{SOCKET_FILE})")
+    parser.add_argument("--port", type=int, help="Listen on 127.0.0.1:PORT instead of a Unix socket")
+    parser.add_argument("--autosave", type=float,
+                        default=float(os.environ.get("PKMS_AUTOSAVE_SECONDS") or DEFAULT_AUTOSAVE_SECONDS),
+                        help="Seconds without edits before they are written")
+    args = parser.parse_args(argv)
+
+    manager = PKMSTaskManager(data_manager=make_data_manager(args.data_dir, args.storage),
+                              autosave_interval=args.autosave)
+    try:
+        serve(manager, args.socket or os.path.join(args.data_dir, SOCKET_FILE), args.port)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
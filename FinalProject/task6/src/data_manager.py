@@ -1,47 +1,525 @@
+import functools
+import hashlib
 import json
 import os
-from typing import List, Type, TypeVar, Dict, Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Type, TypeVar, Dict, Any, Iterable, Iterator, Optional, TextIO, Tuple
+
+from .metrics import metrics
+from .content_store import CONTENT_FILE, ContentStore, is_stored_ref
+from .binary_snapshot import BINARY_SUFFIX, SnapshotWriter, build_objects, read_snapshot
 
 # Define a generic type for our standard model classes
 T = TypeVar('T')
 
+# Journal files sit next to their snapshot, e.g. knowledge.json.journal
+JOURNAL_SUFFIX = ".journal"
+# A journal being folded into the snapshot is renamed to this suffix first
+COMPACTING_SUFFIX = ".journal.compacting"
+# Characters read per step when streaming a JSON snapshot
+READ_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+def _skip_whitespace(buf: str, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+def _indent(text: str) -> str:
+    """Indents every line of a dumped element by one level (4 spaces)."""
+    return "    " + text.replace("\n", "\n    ")
+
+def _open_or_none(path: str) -> Optional[TextIO]:
+    """Opens a text file for reading; None if it doesn't exist (a missing journal is an empty one)."""
+    try:
+        return open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return None
+
+def _fsync_path(path: str):
+    """Fsyncs a file by path; missing files are skipped."""
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _fsync_dir(path: str):
+    """Makes a rename inside `path` durable (a no-op where directories can't be opened)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
 class DataManager:
-    """Handles loading and saving model objects to JSON files."""
+    """
+    Handles loading and saving model objects to JSON files.
 
-    def __init__(self, data_dir: str = ".data"):
+    Each JSON file is a snapshot plus an append-only journal. Adding or
+    updating a record appends one line to the journal (`append_record`),
+    so a save costs O(changed records) instead of rewriting the whole file.
+    `load_data` replays the journal over the snapshot, and once a journal
+    grows past `compact_threshold` records it is folded into a new snapshot
+    on a background thread.
+
+    Snapshots are written to a temp file, fsynced and renamed over the old
+    one, so a crash leaves either the old or the new snapshot. Durable
+    appends use group commit: concurrent callers share one fsync, and
+    `group_commit_window` (seconds) lets the syncing thread wait briefly
+    for more appends to join before flushing.
+
+    With `binary_snapshots`, every snapshot write also produces a columnar
+    `<snapshot>.bin` (see binary_snapshot.py) that `load_data` reads instead
+    of the JSON while it is still fresh.
+
+    Large knowledge bodies go to `content.dat` (see content_store.py);
+    knowledge records hold their [offset, length] there.
+    """
+
+    # The JSON files have no query engine; callers filter in Python
+    supports_queries = False
+
+    def __init__(self, data_dir: str = ".data", compact_threshold: int = 1000,
+                 group_commit: bool = True, group_commit_window: float = 0.0,
+                 binary_snapshots: bool = True):
         # Create data directory if it doesn't exist (portable)
         self.data_dir = data_dir
         os.makedirs(data_dir, exist_ok=True)
         self.pkm_path = os.path.join(self.data_dir, "knowledge.json")
         self.task_path = os.path.join(self.data_dir, "tasks.json")
+        self.schedule_path = os.path.join(self.data_dir, "schedule.json")
+        self.link_path = os.path.join(self.data_dir, "links.json")
+        self.content_store = ContentStore(os.path.join(self.data_dir, CONTENT_FILE))
+        self.compact_threshold = compact_threshold
+        self.binary_snapshots = binary_snapshots
+        # Guards journal appends and journal rotation
+        self._lock = threading.Lock()
+        # Serializes snapshot rewrites (compaction vs. full save) and is held
+        # by readers while they pick up the journals and snapshot, so they
+        # never see a rotated journal without the snapshot that folds it in.
+        # Reentrant because compaction reads the records it is rewriting.
+        self._snapshot_lock = threading.RLock()
+        self._journal_counts: Dict[str, int] = {}
+        self._compactions: Dict[str, threading.Thread] = {}
+        self._compaction_suspended = 0 # nesting depth of compaction_suspended()
+        # Group commit state: appends are numbered, and _synced_seq is the
+        # highest number known to be on disk. One thread at a time syncs.
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window
+        self._write_seq = 0
+        self._synced_seq = 0
+        self._syncing = False
+        self._unsynced: set = set() # snapshot paths whose journals have unsynced appends
+        self._sync_cond = threading.Condition()
+        self.fsync_count = 0
 
-    def _load_file(self, filepath: str) -> List[Dict[str, Any]]:
-        """Reads and parses a JSON file."""
-        if not os.path.exists(filepath):
-            return []
+    def _path_for(self, file_type: str) -> str:
+        """Maps a file type ('pkm', 'schedule', 'link' or 'task') to its snapshot path."""
+        if file_type == 'pkm':
+            return self.pkm_path
+        if file_type == 'schedule':
+            return self.schedule_path
+        if file_type == 'link':
+            return self.link_path
+        return self.task_path
+
+    def _to_dict(self, obj: Any, file_type: str) -> Dict[str, Any]:
+        """obj.to_dict(), with knowledge bodies stored in the content store."""
+        return obj.to_dict(self.content_store) if file_type == 'pkm' else obj.to_dict()
+
+    def _from_dict(self, model_class: Type[T], file_type: str) -> Callable[[Dict[str, Any]], T]:
+        """model_class.from_dict, resolving knowledge bodies against the content store."""
+        if file_type == 'pkm':
+            return functools.partial(model_class.from_dict, content_store=self.content_store)
+        return model_class.from_dict
+
+    def _resolve_columns(self, fields: Tuple[str, ...], columns: List[List[Any]],
+                         file_type: str) -> Tuple[Tuple[str, ...], List[List[Any]]]:
+        """Column-wise _from_dict: stored knowledge bodies become content store references."""
+        if file_type == 'pkm' and 'content' in fields:
+            i = fields.index('content')
+            ref = self.content_store.ref
+            columns[i] = [ref(c) if is_stored_ref(c) else c for c in columns[i]]
+        return fields, columns
+
+    def _iter_file(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the elements of a JSON array file one at a time.
+
+        Only the current element (plus one read chunk) is held in memory,
+        so parsing a large snapshot does not need the whole document.
+        """
+        f = _open_or_none(filepath)
+        if f is not None:
+            yield from self._iter_open_file(f, filepath)
+
+    def _iter_open_file(self, f: TextIO, filepath: str) -> Iterator[Dict[str, Any]]:
+        """_iter_file over an already opened snapshot; closes it when done."""
+        decoder = json.JSONDecoder()
+        chunk_size = READ_CHUNK_SIZE
+        with f:
+            metrics.inc("pkms_storage_read_bytes_total", os.fstat(f.fileno()).st_size,
+                        file=os.path.basename(filepath))
+            buf = f.read(chunk_size)
+            pos = _skip_whitespace(buf, 0)
+            if pos >= len(buf):
+                return
+            if buf[pos] != '[':
+                print(f"Warning: Could not decode JSON from {filepath}. Starting with empty list.")
+                return
+            pos += 1
+            eof = False
+            while True:
+                pos = _skip_whitespace(buf, pos)
+                if pos < len(buf) and buf[pos] == ',':
+                    pos = _skip_whitespace(buf, pos + 1)
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+                if pos < len(buf):
+                    try:
+                        obj, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError:
+                        obj = None
+                    if obj is not None and (end < len(buf) or eof):
+                        yield obj
+                        pos = end
+                        chunk_size = READ_CHUNK_SIZE
+                        continue
+                if eof:
+                    print(f"Warning: Could not decode JSON from {filepath}. Keeping records read so far.")
+                    return
+                # Element spans the buffer boundary: drop consumed text and read more.
+                # The read size doubles so one huge element is not re-parsed quadratically.
+                more = f.read(chunk_size)
+                chunk_size *= 2
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+
+    def _save_file(self, filepath: str, data: Iterable[Dict[str, Any]]):
+        """
+        Atomically writes dictionaries to a JSON file, one element at a time.
+
+        Produces the same layout as json.dump(data, f, indent=4) without
+        building the whole document in memory. The data goes to a temp file
+        that is fsynced and then renamed over `filepath`.
+        """
+        tmp_path = filepath + ".tmp"
+        writer = SnapshotWriter(filepath) if self.binary_snapshots else None
+        digest = hashlib.sha256()
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: Could not decode JSON from {filepath}. Starting with empty list.")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                first = True
+                for d in data:
+                    piece = ("[\n" if first else ",\n") + _indent(json.dumps(d, indent=4))
+                    f.write(piece)
+                    if writer is not None:
+                        writer.add(d)
+                        digest.update(piece.encode('utf-8'))
+                    first = False
+                piece = "[]" if first else "\n]"
+                f.write(piece)
+                digest.update(piece.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        metrics.inc("pkms_storage_written_bytes_total", os.path.getsize(tmp_path), file=os.path.basename(filepath))
+        self.content_store.sync() # the bodies the snapshot refers to
+        os.replace(tmp_path, filepath)
+        _fsync_dir(os.path.dirname(filepath))
+        if writer is not None:
+            writer.finish(digest.hexdigest())
+
+    # --- Journal ---
+
+    def _read_journal(self, journal_path: str) -> List[Dict[str, Any]]:
+        """Reads journal operations, skipping a torn trailing line from a crash."""
+        f = _open_or_none(journal_path)
+        if f is None:
             return []
+        ops = []
+        with f:
+            metrics.inc("pkms_storage_read_bytes_total", os.fstat(f.fileno()).st_size,
+                        file=os.path.basename(journal_path))
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ops.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping corrupt journal line in {journal_path}.")
+        return ops
+
+    def _read_journal_overrides(self, filepath: str, include_live_journal: bool = True) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Returns the final journaled version of each record ID (None if deleted).
+
+        Callers hold _snapshot_lock so the journal can't be rotated between
+        the two reads; the live journal is read under _lock as well, so an
+        append in progress isn't seen half-written.
+        """
+        overrides: Dict[str, Optional[Dict[str, Any]]] = {}
+        journals = [self._read_journal(filepath + COMPACTING_SUFFIX)]
+        if include_live_journal:
+            with self._lock:
+                ops = self._read_journal(filepath + JOURNAL_SUFFIX)
+                self._journal_counts[filepath] = len(ops)
+            journals.append(ops)
 
-    def _save_file(self, filepath: str, data: List[Dict[str, Any]]):
-        """Writes a list of dictionaries to a JSON file."""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        for ops in journals:
+            for op in ops:
+                if op.get('op') == 'put':
+                    overrides[op['record']['id']] = op['record']
+                elif op.get('op') == 'delete':
+                    overrides[op['id']] = None
+        return overrides
+
+    def _iter_records(self, filepath: str, include_live_journal: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the snapshot with any journals replayed over it.
+
+        Only the journal is held in memory: updated records are substituted
+        in their snapshot position as the snapshot streams past, and records
+        first added in the journal follow in journal order.
+
+        The journals are read and the snapshot opened under _snapshot_lock;
+        the open file keeps streaming the snapshot it opened even if a
+        compaction replaces it afterwards.
+        """
+        with self._snapshot_lock:
+            overrides = self._read_journal_overrides(filepath, include_live_journal)
+            snapshot = _open_or_none(filepath)
+        records = self._iter_open_file(snapshot, filepath) if snapshot is not None else ()
+        for record in records:
+            if record['id'] in overrides:
+                record = overrides.pop(record['id'])
+                if record is None:
+                    continue
+            yield record
+        for record in overrides.values():
+            if record is not None:
+                yield record
+
+    def append_records(self, data: Iterable[Any], file_type: str, durable: bool = False):
+        """
+        Appends added or updated model objects to the journal for a file type.
+
+        With `durable`, the append is on disk before returning. Under group
+        commit it shares an fsync with any other appends made meanwhile.
+        """
+        start = time.perf_counter()
+        lines = [json.dumps({'op': 'put', 'record': self._to_dict(d, file_type)}) + "\n" for d in data]
+        self._append_ops(lines, file_type, durable, start)
+
+    def delete_records(self, ids: Iterable[str], file_type: str, durable: bool = False):
+        """Journals the removal of records by ID; they are dropped from the snapshot on compaction."""
+        start = time.perf_counter()
+        lines = [json.dumps({'op': 'delete', 'id': record_id}) + "\n" for record_id in ids]
+        self._append_ops(lines, file_type, durable, start)
+
+    def _append_ops(self, lines: List[str], file_type: str, durable: bool, start: float):
+        if not lines:
+            return
+        filepath = self._path_for(file_type)
+        # json.dumps escapes non-ASCII, so characters == bytes
+        metrics.inc("pkms_storage_written_bytes_total", sum(len(line) for line in lines),
+                    file=os.path.basename(filepath) + JOURNAL_SUFFIX)
+        with self._lock:
+            with open(filepath + JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+                if durable and not self.group_commit:
+                    self.content_store.sync()
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.fsync_count += 1
+            count = self._journal_counts.get(filepath, 0) + len(lines)
+            self._journal_counts[filepath] = count
+            self._write_seq += 1
+            seq = self._write_seq
+            if not (durable and not self.group_commit):
+                self._unsynced.add(filepath)
+        if durable and self.group_commit:
+            self._wait_synced(seq)
+        metrics.observe("pkms_storage_seconds", time.perf_counter() - start,
+                        op="append_durable" if durable else "append", file=file_type)
+        if count >= self.compact_threshold and not self._compaction_suspended:
+            self.compact_async(file_type)
+
+    def append_record(self, obj: Any, file_type: str):
+        """Appends a single added or updated model object to the journal."""
+        self.append_records([obj], file_type)
+
+    # --- Group commit ---
+
+    def sync(self) -> int:
+        """
+        Fsyncs every journal appended to since the last sync.
+
+        Returns the append sequence number that is now durable.
+        """
+        with self._lock:
+            target = self._write_seq
+            paths, self._unsynced = self._unsynced, set()
+        try:
+            with metrics.timer("pkms_storage_seconds", op="fsync", file="journals"):
+                self.content_store.sync()
+                for filepath in paths:
+                    # A rotated journal may still be waiting to be compacted
+                    _fsync_path(filepath + JOURNAL_SUFFIX)
+                    _fsync_path(filepath + COMPACTING_SUFFIX)
+        except OSError:
+            with self._lock:
+                self._unsynced |= paths
+            raise
+        self.fsync_count += len(paths)
+        return target
+
+    def _wait_synced(self, seq: int):
+        """Blocks until append `seq` is on disk, syncing on behalf of others if no one else is."""
+        with self._sync_cond:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._sync_cond.wait()
+                    continue
+                self._syncing = True
+                self._sync_cond.release()
+                target = None
+                try:
+                    if self.group_commit_window > 0:
+                        time.sleep(self.group_commit_window)
+                    target = self.sync()
+                finally:
+                    self._sync_cond.acquire()
+                    self._syncing = False
+                    if target is not None:
+                        self._synced_seq = max(self._synced_seq, target)
+                    self._sync_cond.notify_all()
+
+    # --- Compaction ---
+
+    def compact(self, file_type: str):
+        """Folds the journal for a file type into a new snapshot."""
+        filepath = self._path_for(file_type)
+        journal_path = filepath + JOURNAL_SUFFIX
+        compacting_path = filepath + COMPACTING_SUFFIX
+
+        with self._snapshot_lock:
+            with self._lock:
+                # Rotate the journal so appends keep going while we compact.
+                # A leftover compacting file from a crash is folded in as well.
+                if os.path.exists(journal_path) and not os.path.exists(compacting_path):
+                    os.replace(journal_path, compacting_path)
+                    self._journal_counts[filepath] = 0
+            if not os.path.exists(compacting_path):
+                return
+
+            with metrics.timer("pkms_storage_seconds", op="compact", file=file_type):
+                self._save_file(filepath, self._iter_records(filepath, include_live_journal=False))
+            os.remove(compacting_path)
+
+    def compact_async(self, file_type: str) -> threading.Thread:
+        """Starts a background compaction for a file type unless one is already running."""
+        filepath = self._path_for(file_type)
+        with self._lock:
+            running = self._compactions.get(filepath)
+            if running is not None and running.is_alive():
+                return running
+            thread = threading.Thread(target=self.compact, args=(file_type,), daemon=True)
+            self._compactions[filepath] = thread
+            thread.start()
+            return thread
+
+    @contextmanager
+    def compaction_suspended(self):
+        """
+        Defers compaction while a large write (e.g. a bulk import) runs.
+
+        Otherwise every batch past `compact_threshold` would rewrite the
+        whole snapshot; on exit each journal that grew past the threshold
+        is compacted once.
+        """
+        with self._lock:
+            self._compaction_suspended += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._compaction_suspended -= 1
+                resume = not self._compaction_suspended
+                counts = dict(self._journal_counts)
+            if resume:
+                for file_type in ('pkm', 'task', 'schedule', 'link'):
+                    if counts.get(self._path_for(file_type), 0) >= self.compact_threshold:
+                        self.compact_async(file_type)
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        """Blocks until all background compactions have finished."""
+        for thread in list(self._compactions.values()):
+            thread.join(timeout)
+
+    # --- Public API ---
+
+    def iter_data(self, model_class: Type[T], file_type: str) -> Iterator[T]:
+        """Yields model objects one at a time without materializing the whole file."""
+        filepath = self._path_for(file_type)
+        from_dict = self._from_dict(model_class, file_type)
+        for d in self._iter_records(filepath):
+            yield from_dict(d)
 
     def load_data(self, model_class: Type[T], file_type: str) -> List[T]:
         """Loads data from a specified file path and converts to model objects."""
-        filepath = self.pkm_path if file_type == 'pkm' else self.task_path
-        raw_data = self._load_file(filepath)
-        # Use the class method 'from_dict' for deserialization
-        return [model_class.from_dict(d) for d in raw_data]
+        with metrics.timer("pkms_storage_seconds", op="load", file=file_type):
+            filepath = self._path_for(file_type)
+            # One consistent view of journals and snapshot, as in _iter_records
+            with self._snapshot_lock:
+                overrides = self._read_journal_overrides(filepath)
+                snapshot = read_snapshot(filepath) if self.binary_snapshots else None
+                if snapshot is not None:
+                    metrics.inc("pkms_storage_read_bytes_total", os.path.getsize(filepath + BINARY_SUFFIX),
+                                file=os.path.basename(filepath) + BINARY_SUFFIX)
+            if snapshot is None:
+                # Use the class method 'from_dict' for deserialization
+                return list(self.iter_data(model_class, file_type))
+
+            from_dict = self._from_dict(model_class, file_type)
+            objects = build_objects(model_class, *self._resolve_columns(*snapshot, file_type))
+            if not overrides:
+                return objects
+            merged = []
+            for obj in objects:
+                if obj.id in overrides:
+                    record = overrides.pop(obj.id)
+                    if record is None:
+                        continue
+                    obj = from_dict(record)
+                merged.append(obj)
+            merged.extend(from_dict(r) for r in overrides.values() if r is not None)
+            return merged
 
     def save_data(self, data: List[Any], file_type: str):
-        """Saves a list of model objects to a specified file path."""
-        filepath = self.pkm_path if file_type == 'pkm' else self.task_path
+        """Saves a full list of model objects as a new snapshot, clearing the journal."""
+        filepath = self._path_for(file_type)
         # Use the instance method 'to_dict' for serialization
-        raw_data = [d.to_dict() for d in data]
-        self._save_file(filepath, raw_data)
+        raw_data = (self._to_dict(d, file_type) for d in data)
+        with self._snapshot_lock, metrics.timer("pkms_storage_seconds", op="save", file=file_type):
+            with self._lock:
+                self._save_file(filepath, raw_data)
+                for journal_path in (filepath + JOURNAL_SUFFIX, filepath + COMPACTING_SUFFIX):
+                    if os.path.exists(journal_path):
+                        os.remove(journal_path)
+                self._journal_counts[filepath] = 0
         print(f"\n--- Data saved successfully to {filepath} ---")
@@ -0,0 +1,238 @@
+"""
+Near-duplicate detection for knowledge entries (MinHash + LSH).
+
+Each entry's title and content are cut into overlapping word shingles and
+reduced to a MinHash signature. Entries with fewer than MIN_SHINGLES
+shingles (a line or two) are too short to judge and never count as
+duplicates. Signatures are split into bands and entries whose
+band hashes collide become candidates, so finding duplicates touches each
+entry a constant number of times instead of comparing every pair.
+Candidates are confirmed when their estimated Jaccard similarity reaches
+the threshold and grouped into clusters.
+
+    python -m src.dedup                  # list duplicate clusters
+    python -m src.dedup --merge          # merge each cluster into one entry
+
+Merging keeps the oldest entry of a cluster, gives it the longest body and
+every tag, points tasks and links to the other entries at it, and deletes
+the rest.
+"""
+import argparse
+import os
+import sys
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models import KnowledgeEntry, Link, Task
+from .search import SEARCH_INDEX_FILE, InvertedIndex, tokenize
+
+SHINGLE_WORDS = 3
+NUM_BINS = 128 # signature length; a power of two
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+DEFAULT_THRESHOLD = 0.8
+# Below this many shingles (about ten words) a few shared words look like a match
+MIN_SHINGLES = 8
+
+_BIN_SHIFT = 32 - (NUM_BINS.bit_length() - 1)
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_EMPTY = 1 << 32
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    """Hashes of every run of `size` consecutive words (the whole text if shorter)."""
+    words = tokenize(text)
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+def minhash(hashes: Iterable[int]) -> Tuple[int, ...]:
+    """
+    MinHash signature of a set of 32-bit shingle hashes.
+
+    Uses one-permutation hashing: each (scrambled) hash falls into one of
+    NUM_BINS bins by its top bits and the bin keeps its smallest remainder,
+    so a signature costs one pass over the shingles rather than one per
+    bin. Empty bins borrow from the next filled bin, offset by the distance,
+    so sparse signatures still compare position by position.
+    """
+    signature = [_EMPTY] * NUM_BINS
+    for h in hashes:
+        h = (h * 0x9E3779B1) & 0xFFFFFFFF
+        b = h >> _BIN_SHIFT
+        value = h & _VALUE_MASK
+        if value < signature[b]:
+            signature[b] = value
+    filled = [i for i, v in enumerate(signature) if v != _EMPTY]
+    if not filled:
+        return tuple(signature)
+    for i in range(NUM_BINS):
+        if signature[i] == _EMPTY:
+            j = next((f for f in filled if f > i), filled[0])
+            distance = (j - i) % NUM_BINS
+            signature[i] = signature[j] + distance * _EMPTY
+    return tuple(signature)
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_BINS
+
+def entry_shingles(entry: KnowledgeEntry) -> set:
+    return shingles(f"{entry.title} {entry.content}")
+
+def cluster_signatures(signatures: Sequence[Sequence[int]], threshold: float = DEFAULT_THRESHOLD) -> List[List[int]]:
+    """
+    Groups signature positions whose similarity reaches `threshold`,
+    directly or through a chain of such pairs (two or more per group).
+
+    Identical signatures are joined up front, so the band buckets hold one
+    position per distinct signature; within a bucket every pair is then
+    compared. A bucket of thousands of exact copies thus costs one check
+    per copy, not one per pair.
+    """
+    parent = list(range(len(signatures)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    distinct: Dict[Tuple[int, ...], int] = {}
+    for i, signature in enumerate(signatures):
+        first = distinct.setdefault(tuple(signature), i)
+        if first != i:
+            parent[i] = first
+    representatives = list(distinct.values())
+
+    for band in range(BANDS):
+        buckets: Dict[Tuple[int, ...], List[int]] = {}
+        for i in representatives:
+            buckets.setdefault(tuple(signatures[i][band * ROWS:(band + 1) * ROWS]), []).append(i)
+        for members in buckets.values():
+            for a, i in enumerate(members):
+                for j in members[a + 1:]:
+                    if find(i) != find(j) and similarity(signatures[i], signatures[j]) >= threshold:
+                        parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(signatures)):
+        groups.setdefault(find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+def find_duplicates(entries: Iterable[KnowledgeEntry], threshold: float = DEFAULT_THRESHOLD,
+                    min_shingles: int = MIN_SHINGLES) -> List[List[KnowledgeEntry]]:
+    """
+    Returns clusters of near-duplicate entries (two or more each).
+
+    Clusters and their members are in input order. Similarity is
+    transitive here: A~B and B~C puts A, B and C in one cluster. Entries
+    with fewer than `min_shingles` shingles are left out.
+    """
+    kept, signatures = [], []
+    for entry in entries:
+        hashes = entry_shingles(entry)
+        if len(hashes) >= min_shingles:
+            kept.append(entry)
+            signatures.append(minhash(hashes))
+    return [[kept[i] for i in group] for group in cluster_signatures(signatures, threshold)]
+
+def merge_cluster(cluster: List[KnowledgeEntry]) -> Tuple[KnowledgeEntry, List[KnowledgeEntry]]:
+    """
+    Folds a cluster into its oldest entry; returns (kept, removed).
+
+    The kept entry takes the longest body and the union of all tags. If its
+    body changes, its summary is cleared so the agent cycle redoes it.
+    """
+    kept = min(cluster, key=lambda e: e.created_at or "")
+    removed = [e for e in cluster if e is not kept]
+    longest = max(cluster, key=lambda e: len(e.content))
+    if longest is not kept and len(longest.content) > len(kept.content):
+        kept.content = longest.content
+        kept.summary = None
+        kept.is_summarized = False
+    for entry in removed:
+        kept.tags.extend(t for t in entry.tags if t not in kept.tags)
+    if not kept.is_summarized:
+        summarized = next((e for e in removed if e.is_summarized and e.content == kept.content
+                           and e.title == kept.title), None)
+        if summarized is not None:
+            kept.summary, kept.is_summarized = summarized.summary, True
+    return kept, removed
+
+def merge_duplicates(data_manager, threshold: float = DEFAULT_THRESHOLD) -> Tuple[int, int, int]:
+    """
+    Merges every duplicate cluster in the store.
+
+    Returns (clusters merged, entries removed, tasks relinked). The
+    persisted search index, if any, is updated to match.
+    """
+    knowledge = data_manager.load_data(KnowledgeEntry, 'pkm')
+    clusters = find_duplicates(knowledge, threshold)
+    if not clusters:
+        return 0, 0, 0
+
+    kept_entries, replaced_by = [], {}
+    for cluster in clusters:
+        kept, removed = merge_cluster(cluster)
+        kept_entries.append(kept)
+        for entry in removed:
+            replaced_by[entry.id] = kept.id
+    relinked = [t for t in data_manager.load_data(Task, 'task') if t.knowledge_link_id in replaced_by]
+    for task in relinked:
+        task.knowledge_link_id = replaced_by[task.knowledge_link_id]
+    # Links to or from a removed copy move to the kept entry
+    moved = [l for l in data_manager.load_data(Link, 'link')
+             if l.source_id in replaced_by or l.target_id in replaced_by]
+    repointed = {}
+    for link in moved:
+        source = replaced_by.get(link.source_id, link.source_id)
+        target = replaced_by.get(link.target_id, link.target_id)
+        if source != target:
+            new = Link(source, target, created_at=link.created_at)
+            repointed[new.id] = new
+
+    data_manager.append_records(kept_entries, 'pkm')
+    data_manager.delete_records(list(replaced_by), 'pkm', durable=True)
+    data_manager.append_records(relinked, 'task', durable=True)
+    if moved:
+        data_manager.delete_records([l.id for l in moved], 'link')
+        data_manager.append_records(list(repointed.values()), 'link', durable=True)
+
+    index_path = os.path.join(data_manager.data_dir, SEARCH_INDEX_FILE)
+    if os.path.exists(index_path):
+        index = InvertedIndex.load(index_path)
+        index.sync(e for e in knowledge if e.id not in replaced_by)
+        for entry in kept_entries:
+            index.add(entry)
+        index.save(index_path)
+    return len(clusters), len(replaced_by), len(relinked)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Find (and optionally merge) near-duplicate knowledge entries.")
+    parser.add_argument("--data-dir", default=".data")
+    parser.add_argument("--storage", choices=("json", "sqlite"), help="Defaults to $PKMS_STORAGE, else json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity of word shingles (0-1)")
+    parser.add_argument("--merge", action="store_true", help="Merge each cluster into its oldest entry")
+    args = parser.parse_args(argv)
+
+    from .__main__ import make_data_manager
+    data_manager = make_data_manager(args.data_dir, args.storage)
+
+    if args.merge:
+        clusters, removed, relinked = merge_duplicates(data_manager, args.threshold)
+        if not data_manager.supports_queries:
+            data_manager.wait_for_compaction()
+        print(f"Merged {clusters} clusters: removed {removed} entries, relinked {relinked} tasks.")
+        return 0
+
+    clusters = find_duplicates(data_manager.load_data(KnowledgeEntry, 'pkm'), args.threshold)
+    for n, cluster in enumerate(clusters, 1):
+        print(f"\nCluster {n} ({len(cluster)} entries):")
+        for entry in cluster:
+            print(f"  {entry.id[:8]}  {entry.created_at[:10]}  {entry.title}")
+    print(f"\n{len(clusters)} clusters, {sum(len(c) - 1 for c in clusters)} removable entries.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
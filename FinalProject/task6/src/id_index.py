@@ -0,0 +1,69 @@
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Generic, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+class AmbiguousPrefixError(LookupError):
+    """Raised when an ID prefix matches more than one record."""
+
+    def __init__(self, prefix: str, matches: List[str]):
+        self.prefix = prefix
+        self.matches = matches
+        super().__init__(f"ID prefix '{prefix}' matches {len(matches)} records")
+
+class IDIndex(Generic[T]):
+    """
+    Exact and prefix lookups for records with a string `id`.
+
+    A dict answers exact IDs in O(1) and a sorted list of IDs answers the
+    short prefixes the CLI shows with bisect, in O(log n + matches).
+    """
+
+    def __init__(self, records: Iterable[T] = ()):
+        self.by_id: Dict[str, T] = {r.id: r for r in records}
+        self.sorted_ids: List[str] = sorted(self.by_id)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self.by_id
+
+    def add(self, record: T):
+        if record.id not in self.by_id:
+            insort(self.sorted_ids, record.id)
+        self.by_id[record.id] = record
+
+    def remove(self, record_id: str):
+        if self.by_id.pop(record_id, None) is not None:
+            i = bisect_left(self.sorted_ids, record_id)
+            del self.sorted_ids[i]
+
+    def get(self, record_id: str) -> Optional[T]:
+        return self.by_id.get(record_id)
+
+    def matches(self, prefix: str) -> List[T]:
+        """Returns every record whose ID starts with `prefix`, in ID order."""
+        i = bisect_left(self.sorted_ids, prefix)
+        found = []
+        while i < len(self.sorted_ids) and self.sorted_ids[i].startswith(prefix):
+            found.append(self.by_id[self.sorted_ids[i]])
+            i += 1
+        return found
+
+    def resolve(self, prefix: str, predicate: Optional[Callable[[T], bool]] = None) -> Optional[T]:
+        """
+        Returns the one record matching a full ID or ID prefix, or None.
+
+        An exact ID always wins. Raises AmbiguousPrefixError if the prefix
+        matches several records that pass `predicate`.
+        """
+        if not prefix:
+            return None
+        exact = self.by_id.get(prefix)
+        if exact is not None:
+            return exact if predicate is None or predicate(exact) else None
+        found = [r for r in self.matches(prefix) if predicate is None or predicate(r)]
+        if len(found) > 1:
+            raise AmbiguousPrefixError(prefix, [r.id for r in found])
+        return found[0] if found else None
@@ -0,0 +1,127 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+from .models import Link, Task
+
+class LinkGraph:
+    """
+    Forward and reverse adjacency over record IDs (notes and tasks).
+
+    Edges come from Link records and from each task's primary note
+    (Task.knowledge_link_id). Both directions are kept up to date as links
+    and tasks change, so "what does this link to" and "what links here" cost
+    O(degree) instead of a scan over every task or note.
+
+    An edge can be contributed by a Link and by a task's primary note at
+    the same time; it is kept in an ID -> {neighbor ID: count} map and
+    disappears only when its last source is removed.
+    """
+
+    def __init__(self, links: Iterable[Link] = (), tasks: Iterable[Task] = ()):
+        self.forward: Dict[str, Dict[str, int]] = {}
+        self.reverse: Dict[str, Dict[str, int]] = {}
+        self._primary: Dict[str, str] = {} # task ID -> its knowledge_link_id
+        self._links: Set[str] = set() # IDs of the Link records filed
+        for task in tasks:
+            self.update_task(task)
+        for link in links:
+            self.add_link(link)
+
+    def __len__(self) -> int:
+        """Number of distinct edges."""
+        return sum(len(targets) for targets in self.forward.values())
+
+    def add(self, source_id: str, target_id: str):
+        targets = self.forward.setdefault(source_id, {})
+        targets[target_id] = targets.get(target_id, 0) + 1
+        sources = self.reverse.setdefault(target_id, {})
+        sources[source_id] = sources.get(source_id, 0) + 1
+
+    def remove(self, source_id: str, target_id: str):
+        targets = self.forward.get(source_id)
+        if not targets or target_id not in targets:
+            return
+        for adjacency, a, b in ((self.forward, source_id, target_id), (self.reverse, target_id, source_id)):
+            neighbors = adjacency[a]
+            neighbors[b] -= 1
+            if not neighbors[b]:
+                del neighbors[b]
+                if not neighbors:
+                    del adjacency[a]
+
+    def add_link(self, link: Link):
+        """Files a Link record; filing the same link again changes nothing."""
+        if link.id not in self._links:
+            self._links.add(link.id)
+            self.add(link.source_id, link.target_id)
+
+    def remove_link(self, link: Link):
+        if link.id in self._links:
+            self._links.remove(link.id)
+            self.remove(link.source_id, link.target_id)
+
+    def update_task(self, task: Task):
+        """Re-files a new or changed task's primary note link."""
+        old = self._primary.pop(task.id, None)
+        if old is not None:
+            self.remove(task.id, old)
+        if task.knowledge_link_id:
+            self._primary[task.id] = task.knowledge_link_id
+            self.add(task.id, task.knowledge_link_id)
+
+    def link_ids(self, record_id: str) -> List[str]:
+        """IDs of the Link records to or from a record (not its primary note link)."""
+        candidates = [Link.make_id(record_id, t) for t in self.targets(record_id)]
+        candidates += [Link.make_id(s, record_id) for s in self.sources(record_id)]
+        return [link_id for link_id in candidates if link_id in self._links]
+
+    def remove_node(self, record_id: str):
+        """Drops every edge touching a record."""
+        self._primary.pop(record_id, None)
+        self._links.difference_update(self.link_ids(record_id))
+        for target_id, count in list(self.forward.get(record_id, {}).items()):
+            for _ in range(count):
+                self.remove(record_id, target_id)
+        for source_id, count in list(self.reverse.get(record_id, {}).items()):
+            for _ in range(count):
+                self.remove(source_id, record_id)
+            if self._primary.get(source_id) == record_id:
+                del self._primary[source_id]
+
+    def targets(self, record_id: str) -> List[str]:
+        """IDs this record links to, oldest link first."""
+        return list(self.forward.get(record_id, ()))
+
+    def sources(self, record_id: str) -> List[str]:
+        """IDs that link to this record, oldest link first."""
+        return list(self.reverse.get(record_id, ()))
+
+    def neighbors(self, record_id: str) -> List[str]:
+        """Records linked in either direction."""
+        seen = dict.fromkeys(self.targets(record_id))
+        seen.update(dict.fromkeys(self.sources(record_id)))
+        return list(seen)
+
+    def neighborhood(self, record_id: str, hops: int = 2, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Records within `hops` links of `record_id` in either direction,
+        mapped to their distance, nearest first (the start is excluded).
+
+        A breadth-first walk over the adjacency maps: it touches only the
+        edges of the records it reaches, and stops early at `limit` records.
+        """
+        distances = {record_id: 0}
+        queue = deque([record_id])
+        while queue:
+            current = queue.popleft()
+            if distances[current] == hops:
+                continue
+            for neighbor in self.neighbors(current):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[current] + 1
+                    if limit is not None and len(distances) > limit:
+                        del distances[record_id]
+                        return distances
+                    queue.append(neighbor)
+        del distances[record_id]
+        return distances
@@ -1,19 +1,210 @@
+import json
 import os
-from typing import List
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
 from .models import Task, KnowledgeEntry
+from .llm_cache import LLMCache
+from .metrics import metrics
 
 # Check for API key (though we use a mock, this is good practice)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Optional OpenAI-compatible endpoint, e.g. http://localhost:8000/v1
+LLM_BASE_URL = os.environ.get("PKMS_LLM_URL")
+# Concurrency knobs for batched agent calls
+LLM_MAX_IN_FLIGHT = int(os.environ.get("PKMS_LLM_CONCURRENCY", "1"))
+LLM_REQUESTS_PER_SECOND = float(os.environ.get("PKMS_LLM_RPS", "0")) or None
+
+PRIORITIES = ("low", "medium", "high")
+
+SYSTEM_PROMPTS = {
+    "summarize": "You are a helpful knowledge summarization agent.",
+    "prioritize": "You are a task prioritization agent. Respond ONLY with 'low', 'medium', or 'high'.",
+}
+
+R = TypeVar('R')
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter (`rate` tokens per second, bursts up to `capacity`)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class CycleBudget:
+    """
+    Time and model-call allowance for one agent cycle (None means unlimited).
+
+    The cycle asks for an allowance before each batch, sized so the batch
+    can't exceed `max_calls`. Within a batch every call is also checked
+    first (`reserve`), so a slow batch stops at `max_seconds` instead of
+    running to its end; the items it skips are left for the next cycle.
+    """
+
+    def __init__(self, agent: 'LLMAgent', max_seconds: Optional[float] = None,
+                 max_calls: Optional[int] = None):
+        self.agent = agent
+        self.max_seconds = max_seconds
+        self.max_calls = max_calls
+        self.started = time.monotonic()
+        self.calls_at_start = agent.calls
+        self._in_flight = 0 # reserved calls that haven't finished
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return self.agent.calls - self.calls_at_start
+
+    def allowance(self, wanted: int) -> int:
+        """How many of `wanted` items the next batch may process; 0 once the budget is spent."""
+        if self.max_seconds is not None and time.monotonic() - self.started >= self.max_seconds:
+            return 0
+        if self.max_calls is not None:
+            wanted = min(wanted, self.max_calls - self.calls)
+        return max(wanted, 0)
+
+    def reserve(self) -> bool:
+        """Claims one model call before it is made; False once time or calls are used up."""
+        with self._lock:
+            if self.max_seconds is not None and time.monotonic() - self.started >= self.max_seconds:
+                return False
+            if self.max_calls is not None and self.calls + self._in_flight >= self.max_calls:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        """Ends a reservation; a call that reached the model is counted in `calls` by then."""
+        with self._lock:
+            self._in_flight -= 1
 
 class LLMAgent:
     """Handles interaction with a Language Model for PKMS tasks."""
 
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = LLM_BASE_URL, model: str = "gpt-4o-mini",
+                 max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 requests_per_second: Optional[float] = LLM_REQUESTS_PER_SECOND,
+                 timeout: float = 60.0, cache: Optional[LLMCache] = None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.cache = cache
+        self.model = model
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self.timeout = timeout
+        # Requests that reached the model (cache hits are free and not counted)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
         # In a real app, initialize the OpenAI client here
-        if not OPENAI_API_KEY:
+        if not OPENAI_API_KEY and not self.base_url:
             print("--- WARNING: OPENAI_API_KEY not found. Using Mock LLM. ---")
         # self.client = OpenAI() # Real initialization
 
+    @property
+    def model_id(self) -> str:
+        """Identifies which model produced a response (part of the cache key)."""
+        return f"{self.base_url}|{self.model}" if self.base_url else "mock"
+
+    def _call(self, prompt: str, task: str) -> str:
+        """
+        Sends a prompt to the configured endpoint, or to the mock when there is none.
+
+        Responses are served from the cache when the same model has already
+        answered the same prompt; failures raise and are never cached.
+        """
+        start = time.perf_counter()
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.model_id, task, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.observe("pkms_llm_call_seconds", time.perf_counter() - start, task=task, cache="hit")
+                metrics.inc("pkms_llm_calls_total", task=task, cache="hit")
+                return cached
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        try:
+            if self.base_url:
+                response = self._http_llm_call(prompt, task)
+            else:
+                response = self._mock_llm_call(prompt, task)
+        except Exception:
+            metrics.inc("pkms_llm_errors_total", task=task)
+            raise
+        finally:
+            metrics.observe("pkms_llm_call_seconds", time.perf_counter() - start, task=task, cache="miss")
+        metrics.inc("pkms_llm_calls_total", task=task, cache="miss")
+        with self._calls_lock:
+            self.calls += 1
+
+        if key is not None:
+            self.cache.put(key, response)
+        return response
+
+    def _http_llm_call(self, prompt: str, task: str) -> str:
+        """Calls an OpenAI-compatible /chat/completions endpoint using only the standard library."""
+        body = json.dumps({
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPTS[task]},
+                {"role": "user", "content": prompt},
+            ],
+        }).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if OPENAI_API_KEY:
+            headers["Authorization"] = f"Bearer {OPENAI_API_KEY}"
+        request = urllib.request.Request(f"{self.base_url}/chat/completions", data=body, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.load(response)
+        # Raises KeyError/IndexError/TypeError on a body of the wrong shape
+        content = data["choices"][0]["message"]["content"]
+        if not isinstance(content, str):
+            raise ValueError(f"response content is {type(content).__name__}, not text")
+        return content.strip()
+
+    def _map(self, fn: Callable[..., Optional[R]], args: Sequence[Tuple],
+             budget: Optional[CycleBudget] = None) -> List[Optional[R]]:
+        """
+        Applies `fn` to each argument tuple with at most `max_in_flight` calls running.
+
+        Results come back in input order regardless of completion order.
+        With a `budget`, each call is reserved first and skipped (None) if
+        the budget is spent.
+        """
+        def run(a: Tuple) -> Optional[R]:
+            if budget is None:
+                return fn(*a)
+            if not budget.reserve():
+                return None
+            try:
+                return fn(*a)
+            finally:
+                budget.release()
+
+        if self.max_in_flight == 1 or len(args) <= 1:
+            return [run(a) for a in args]
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            return list(executor.map(run, args))
+
     def _mock_llm_call(self, prompt: str, task: str) -> str:
         """Mocks the LLM API call for portability."""
         if task == "summarize":
@@ -28,8 +219,8 @@ class LLMAgent:
             return "low"
         return "mock_error"
 
-    def summarize_entry(self, entry: KnowledgeEntry) -> str:
-        """Generates a summary for a knowledge entry using the LLM."""
+    def summarize_entry(self, entry: KnowledgeEntry) -> Optional[str]:
+        """Generates a summary for a knowledge entry using the LLM; None if the call failed."""
         
         prompt = f"Please provide a 50-word summary of the following knowledge entry:\nTitle: {entry.title}\nContent: {entry.content}"
         
@@ -48,12 +239,22 @@ class LLMAgent:
         #         print(f"OpenAI Error during summarization: {e}")
         #         return f"Error: Could not summarize (LLM failure)."
         
+        if self.base_url:
+            try:
+                return self._call(prompt, task="summarize")
+            except (urllib.error.URLError, OSError, KeyError, IndexError, TypeError, ValueError) as e:
+                print(f"LLM Error during summarization: {e}")
+                return None
+
         # --- Mock LLM Call (Default) ---
-        return self._mock_llm_call(prompt, task="summarize")
+        return self._call(prompt, task="summarize")
 
 
-    def prioritize_task(self, task: Task, linked_content: str) -> str:
-        """Determines task priority (low/medium/high) using the LLM."""
+    def prioritize_task(self, task: Task, linked_content: str) -> Optional[str]:
+        """
+        Determines task priority (low/medium/high) using the LLM; None if the
+        call failed or the answer wasn't one of the three.
+        """
 
         prompt = (
             f"Analyze the following task and context to assign a priority level (low, medium, or high). "
@@ -79,5 +280,32 @@ class LLMAgent:
         #         print(f"OpenAI Error during prioritization: {e}")
         #         return "medium" # Default fallback
         
+        if self.base_url:
+            try:
+                priority = self._call(prompt, task="prioritize").strip().lower()
+            except (urllib.error.URLError, OSError, KeyError, IndexError, TypeError, ValueError) as e:
+                print(f"LLM Error during prioritization: {e}")
+                return None
+            if priority not in PRIORITIES:
+                print(f"LLM Error during prioritization: unexpected answer {priority[:40]!r}")
+                return None
+            return priority
+
         # --- Mock LLM Call (Default) ---
-        return self._mock_llm_call(prompt, task="prioritize")
+        return self._call(prompt, task="prioritize")
+
+    # --- Batched calls ---
+
+    def summarize_entries(self, entries: Sequence[KnowledgeEntry],
+                          budget: Optional[CycleBudget] = None) -> List[Optional[str]]:
+        """
+        Summarizes many entries concurrently; summaries are returned in input
+        order, None for entries that failed or that the budget skipped.
+        """
+        return self._map(self.summarize_entry, [(e,) for e in entries], budget)
+
+    def prioritize_tasks(self, items: Sequence[Tuple[Task, str]],
+                         budget: Optional[CycleBudget] = None) -> List[Optional[str]]:
+        """Prioritizes many (task, linked_content) pairs concurrently, in input order (None as above)."""
+        return self._map(self.prioritize_task, list(items), budget)
+
@@ -0,0 +1,183 @@
+"""
+Process-wide counters and latency summaries.
+
+Instrumented code calls `metrics.inc(...)`, `metrics.observe(...)` or
+wraps a block in `with metrics.timer(...)`. The registry can be printed
+(the CLI's Stats option) or dumped as JSON or Prometheus text format:
+
+    metrics.dump(".data/metrics.json")
+    metrics.dump(".data/metrics.prom")
+"""
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Latencies are bucketed on a log scale: 8 buckets per doubling from 1 µs,
+# so a reported percentile is within ~9% of the true value.
+BUCKETS_PER_DOUBLING = 8
+SMALLEST = 1e-6
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Histogram:
+    """Count, sum and log-bucketed distribution of observed values (seconds)."""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        bucket = 0 if value <= SMALLEST else int(math.log2(value / SMALLEST) * BUCKETS_PER_DOUBLING) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile: the geometric middle of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                if bucket == 0:
+                    return SMALLEST
+                middle = SMALLEST * 2 ** ((bucket - 0.5) / BUCKETS_PER_DOUBLING)
+                return min(middle, self.max)
+        return self.max
+
+class Metrics:
+    """Thread-safe registry of named counters and latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observes how long the block took, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # --- Export ---
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Plain-data copy of every metric, as written by dump(... .json)."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = []
+            for (name, labels), h in sorted(self.histograms.items()):
+                histograms.append({
+                    'name': name, 'labels': dict(labels), 'count': h.count,
+                    'sum': h.total, 'max': h.max,
+                    **{f"p{int(q * 100)}": h.quantile(q) for q in QUANTILES},
+                })
+        return {'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition: counters as counters, latencies as summaries."""
+        def fmt(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        snap = self.snapshot()
+        lines = []
+        typed = set()
+        for c in snap['counters']:
+            if c['name'] not in typed:
+                lines.append(f"# TYPE {c['name']} counter")
+                typed.add(c['name'])
+            lines.append(f"{c['name']}{fmt(tuple(c['labels'].items()))} {c['value']}")
+        for h in snap['histograms']:
+            labels = tuple(h['labels'].items())
+            if h['name'] not in typed:
+                lines.append(f"# TYPE {h['name']} summary")
+                typed.add(h['name'])
+            for q in QUANTILES:
+                lines.append(f"{h['name']}{fmt(labels, ('quantile', str(q)))} {h[f'p{int(q * 100)}']:.6g}")
+            lines.append(f"{h['name']}_sum{fmt(labels)} {h['sum']:.6g}")
+            lines.append(f"{h['name']}_count{fmt(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Writes JSON (for a .json path) or Prometheus text (anything else), atomically."""
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=4)
+        else:
+            text = self.to_prometheus()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def report(self) -> str:
+        """Human-readable table for the CLI."""
+        snap = self.snapshot()
+        lines = [f"{'operation':56} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}"]
+        for h in snap['histograms']:
+            label = ",".join(f"{k}={v}" for k, v in h['labels'].items())
+            name = f"{h['name']}{{{label}}}" if label else h['name']
+            lines.append(f"{name[:56]:56} {h['count']:>7} {h['p50'] * 1000:>9.2f} "
+                         f"{h['p95'] * 1000:>9.2f} {h['p99'] * 1000:>9.2f} {h['sum']:>9.3f}")
+        if snap['counters']:
+            lines.append("")
+            for c in snap['counters']:
+                label = ",".join(f"{k}={v}" for k, v in c['labels'].items())
+                name = f"{c['name']}{{{label}}}" if label else c['name']
+                lines.append(f"{name[:72]:72} {c['value']:>14,.0f}")
+        return "\n".join(lines)
+
+# The registry shared by the whole process
+metrics = Metrics()
+
+def timed(name: str, **labels):
+    """Decorator that observes each call's duration in the shared registry."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
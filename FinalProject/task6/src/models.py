@@ -1,32 +1,92 @@
+import sys
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
+
+from .content_store import ContentRef, ContentStore, is_stored_ref
+
+# Models use __slots__ instead of a per-instance __dict__, and repeated
+# strings (status, priority, tags, weekdays) are interned so a million
+# records share one copy of each value. Large knowledge bodies are kept
+# out of line in a ContentStore (see content_store.py).
+
+def _intern_tags(tags: Optional[List[str]]) -> List[str]:
+    return [sys.intern(t) for t in tags] if tags else []
 
 class KnowledgeEntry:
     """Represents a piece of PKMS knowledge."""
-    def __init__(self, title: str, content: str, tags: Optional[List[str]] = None,
+    __slots__ = ('id', 'title', '_content', 'tags', 'created_at', 'summary', 'is_summarized')
+
+    def __init__(self, title: str, content: Union[str, ContentRef], tags: Optional[List[str]] = None,
                  id: Optional[str] = None, created_at: Optional[str] = None,
                  summary: Optional[str] = None, is_summarized: bool = False):
-        
+
         self.id = id if id is not None else str(uuid.uuid4())
         self.title = title
         self.content = content
-        self.tags = tags if tags is not None else []
+        self.tags = _intern_tags(tags)
         self.created_at = created_at if created_at is not None else datetime.now().isoformat()
         self.summary = summary
         self.is_summarized = is_summarized
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Converts the object to a dictionary for JSON serialization."""
-        return self.__dict__
+    @property
+    def content(self) -> str:
+        """The entry body, read from the content store if it is kept there."""
+        value: Union[str, ContentRef] = self._content
+        if isinstance(value, ContentRef):
+            return value.store.get(value)
+        return value
+
+    @content.setter
+    def content(self, value: Union[str, ContentRef]):
+        self._content = value
+
+    def preview(self, chars: int = 100) -> str:
+        """The first `chars` characters of the body, without reading a stored one in full."""
+        value: Union[str, ContentRef] = self._content
+        if isinstance(value, ContentRef):
+            return value.store.preview(value, chars)
+        return value[:chars]
+
+    def to_dict(self, content_store: Optional[ContentStore] = None) -> Dict[str, Any]:
+        """
+        Converts the object to a dictionary for JSON serialization.
+
+        With a `content_store`, a large body is stored as its [offset,
+        length] in that store, and the entry keeps only the reference.
+        """
+        if content_store is None:
+            content = self.content
+        else:
+            content = content_store.stored(self._content)
+            if is_stored_ref(content):
+                self._content = content_store.ref(content)
+        return {
+            'id': self.id,
+            'title': self.title,
+            'content': content,
+            'tags': self.tags,
+            'created_at': self.created_at,
+            'summary': self.summary,
+            'is_summarized': self.is_summarized,
+        }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'KnowledgeEntry':
-        """Creates an object from a dictionary (JSON deserialization)."""
+    def from_dict(cls, data: Dict[str, Any], content_store: Optional[ContentStore] = None) -> 'KnowledgeEntry':
+        """
+        Creates an object from a dictionary (JSON deserialization).
+
+        A stored [offset, length] body becomes a reference into `content_store`.
+        """
+        content = data['content']
+        if is_stored_ref(content):
+            if content_store is None:
+                raise ValueError(f"entry {data.get('id')} keeps its body in a content store")
+            content = content_store.ref(content)
         return cls(
             id=data.get('id'),
             title=data['title'],
-            content=data['content'],
+            content=content,
             tags=data.get('tags'),
             created_at=data.get('created_at'),
             summary=data.get('summary'),
@@ -35,11 +95,14 @@ class KnowledgeEntry:
 
 class Task:
     """Represents a personal task."""
+    __slots__ = ('id', 'title', 'description', 'due_date', '_status', '_priority',
+                 'knowledge_link_id', 'created_at', 'is_prioritized')
+
     def __init__(self, title: str, description: str, due_date: str,
                  knowledge_link_id: Optional[str] = None, id: Optional[str] = None,
                  created_at: Optional[str] = None, status: str = "pending",
                  priority: str = "medium", is_prioritized: bool = False):
-        
+
         self.id = id if id is not None else str(uuid.uuid4())
         self.title = title
         self.description = description
@@ -50,9 +113,35 @@ class Task:
         self.created_at = created_at if created_at is not None else datetime.now().isoformat()
         self.is_prioritized = is_prioritized
 
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        self._status = sys.intern(value)
+
+    @property
+    def priority(self) -> str:
+        return self._priority
+
+    @priority.setter
+    def priority(self, value: str):
+        self._priority = sys.intern(value)
+
     def to_dict(self) -> Dict[str, Any]:
         """Converts the object to a dictionary for JSON serialization."""
-        return self.__dict__
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'due_date': self.due_date,
+            'status': self.status,
+            'priority': self.priority,
+            'knowledge_link_id': self.knowledge_link_id,
+            'created_at': self.created_at,
+            'is_prioritized': self.is_prioritized,
+        }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Task':
@@ -68,3 +157,82 @@ class Task:
             priority=data.get('priority', 'medium'),
             is_prioritized=data.get('is_prioritized', False)
         )
+
+class Schedule:
+    """Represents a recurring weekly work schedule block."""
+    __slots__ = ('id', 'title', 'day_of_week', 'start_time', 'end_time', 'location', 'created_at')
+
+    def __init__(self, title: str, day_of_week: str, start_time: str, end_time: str,
+                 location: Optional[str] = None, id: Optional[str] = None,
+                 created_at: Optional[str] = None):
+
+        self.id = id if id is not None else str(uuid.uuid4())
+        self.title = title
+        self.day_of_week = sys.intern(day_of_week)
+        self.start_time = start_time # HH:MM string
+        self.end_time = end_time # HH:MM string
+        self.location = location
+        self.created_at = created_at if created_at is not None else datetime.now().isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the object to a dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'day_of_week': self.day_of_week,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'location': self.location,
+            'created_at': self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Schedule':
+        """Creates an object from a dictionary (JSON deserialization)."""
+        return cls(
+            id=data.get('id'),
+            title=data['title'],
+            day_of_week=data['day_of_week'],
+            start_time=data['start_time'],
+            end_time=data['end_time'],
+            location=data.get('location'),
+            created_at=data.get('created_at')
+        )
+
+class Link:
+    """
+    A directed link between two records (note or task), by ID.
+
+    Complements Task.knowledge_link_id, which stays the task's primary note:
+    links can join any two records and a record can have any number of them.
+    The ID is derived from the endpoints, so linking twice is idempotent.
+    """
+    __slots__ = ('id', 'source_id', 'target_id', 'created_at')
+
+    def __init__(self, source_id: str, target_id: str, created_at: Optional[str] = None):
+        self.id = Link.make_id(source_id, target_id)
+        self.source_id = source_id
+        self.target_id = target_id
+        self.created_at = created_at if created_at is not None else datetime.now().isoformat()
+
+    @staticmethod
+    def make_id(source_id: str, target_id: str) -> str:
+        return f"{source_id}>{target_id}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the object to a dictionary for JSON serialization."""
+        return {
+            'id': self.id,
+            'source_id': self.source_id,
+            'target_id': self.target_id,
+            'created_at': self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Link':
+        """Creates an object from a dictionary (JSON deserialization)."""
+        return cls(
+            source_id=data['source_id'],
+            target_id=data['target_id'],
+            created_at=data.get('created_at')
+        )
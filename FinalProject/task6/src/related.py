@@ -0,0 +1,94 @@
+"""
+"Related knowledge" suggestions: TF-IDF similarity between free text (a
+new task's title and description) and the knowledge entries.
+
+The term-document matrix is the search index itself: each InvertedIndex
+posting list is a sparse column of it, so the matrix grows with every
+note the index takes in and needs no separate build. Ranking is one
+sparse matrix-vector product over the query's columns, using NumPy when
+it is installed and a plain dict accumulation otherwise.
+"""
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError: # optional; the pure-Python path gives the same ranking
+    np = None
+
+from .models import KnowledgeEntry
+from .search import FIELDS, InvertedIndex, tokenize
+
+# Fields that describe what a note is about (AI summaries are left out)
+RELATED_FIELDS = ('title', 'content', 'tags')
+_SHIFTS = [8 * FIELDS.index(field) for field in RELATED_FIELDS]
+
+def _idf(index: InvertedIndex, term: str) -> float:
+    # Removed entries still count towards df until the index is next saved
+    return math.log(1 + len(index.doc_ids) / len(index.postings[term]))
+
+def _query_weights(index: InvertedIndex, text: str) -> Dict[str, float]:
+    """Sublinear tf * idf for each query term the index knows."""
+    return {term: (1 + math.log(count)) * _idf(index, term)
+            for term, count in Counter(tokenize(text)).items() if term in index.postings}
+
+def related_entries(index: InvertedIndex, text: str, k: int = 5) -> List[Tuple[float, KnowledgeEntry]]:
+    """
+    Returns up to `k` (score, entry) pairs most similar to `text`, best first.
+
+    A document's weight for a term is (1 + log tf) * idf, with tf summed over
+    RELATED_FIELDS, and scores are divided by the square root of the
+    document's length in those fields so long notes don't win on volume.
+    """
+    query = _query_weights(index, text)
+    if not query or k <= 0:
+        return []
+    if np is not None:
+        ranked = _top_numpy(index, query, k)
+    else:
+        ranked = _top_python(index, query, k)
+    return [(score, index.entries[doc]) for score, doc in ranked if doc in index.entries][:k]
+
+def _doc_length(index: InvertedIndex, doc: int) -> int:
+    return sum(index.field_lengths[FIELDS.index(field)][doc] for field in RELATED_FIELDS) or 1
+
+def _top_python(index: InvertedIndex, query: Dict[str, float], k: int) -> List[Tuple[float, int]]:
+    scores: Dict[int, float] = {}
+    for term, q in query.items():
+        weight = q * _idf(index, term)
+        for doc, packed in zip(index.postings[term], index.frequencies[term]):
+            tf = sum((packed >> shift) & 0xFF for shift in _SHIFTS)
+            if tf and index.doc_ids[doc] is not None:
+                scores[doc] = scores.get(doc, 0.0) + weight * (1 + math.log(tf))
+    best = heapq.nlargest(k, ((score / math.sqrt(_doc_length(index, doc)), -doc)
+                              for doc, score in scores.items()))
+    return [(score, -neg_doc) for score, neg_doc in best]
+
+def _top_numpy(index: InvertedIndex, query: Dict[str, float], k: int) -> List[Tuple[float, int]]:
+    docs, weights = [], []
+    for term, q in query.items():
+        # Zero-copy views of the posting arrays
+        column = np.frombuffer(index.postings[term], dtype=np.uint32)
+        packed = np.frombuffer(index.frequencies[term], dtype=np.uint32)
+        tf = sum((packed >> shift) & 0xFF for shift in _SHIFTS).astype(np.float64)
+        mask = tf > 0
+        docs.append(column[mask])
+        weights.append(q * _idf(index, term) * (1 + np.log(tf[mask])))
+    docs = np.concatenate(docs)
+    touched, inverse = np.unique(docs, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(weights))
+    lengths = sum(np.frombuffer(index.field_lengths[FIELDS.index(field)], dtype=np.uint32)[touched]
+                  for field in RELATED_FIELDS).astype(np.float64)
+    scores /= np.sqrt(np.maximum(lengths, 1))
+    # Stable sort on -score keeps earlier entries first on ties
+    order = np.argsort(-scores, kind='stable')
+    best = []
+    for i in order:
+        doc = int(touched[i])
+        if index.doc_ids[doc] is not None:
+            best.append((float(scores[i]), doc))
+            if len(best) == k:
+                break
+    return best
@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Schedule
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+def weekday_number(day: str) -> int:
+    """Maps 'Monday', 'monday' or 'Mon' to 0..6; raises ValueError otherwise."""
+    key = day.strip().lower()
+    for i, name in enumerate(WEEKDAYS):
+        if key == name.lower() or (len(key) >= 3 and name.lower().startswith(key)):
+            return i
+    raise ValueError(f"'{day}' is not a day of the week")
+
+def parse_time(value: str) -> int:
+    """Parses 'HH:MM' into minutes after midnight; raises ValueError otherwise."""
+    hours, sep, minutes = value.strip().partition(":")
+    if not sep or not hours.isdigit() or not minutes.isdigit() or len(minutes) != 2:
+        raise ValueError(f"'{value}' is not a HH:MM time")
+    h, m = int(hours), int(minutes)
+    if h > 23 or m > 59:
+        raise ValueError(f"'{value}' is not a HH:MM time")
+    return h * 60 + m
+
+def week_intervals(schedule: Schedule) -> List[Tuple[int, int]]:
+    """
+    Returns the half-open [start, end) minutes-of-week a block occupies.
+
+    An end time at or before the start time runs past midnight into the
+    next day; a Sunday-night block is split where the week wraps.
+    """
+    day_start = weekday_number(schedule.day_of_week) * MINUTES_PER_DAY
+    start = day_start + parse_time(schedule.start_time)
+    end = day_start + parse_time(schedule.end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    if end > MINUTES_PER_WEEK:
+        return [(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)]
+    return [(start, end)]
+
+Interval = Tuple[int, int, Schedule]
+
+class _Node:
+    """Centered interval tree node: the intervals containing `center`, sorted two ways."""
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, intervals: List[Interval]):
+        starts = sorted(s for s, _, _ in intervals)
+        self.center = starts[len(starts) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            s, e, _ = interval
+            if e <= self.center:
+                left.append(interval)
+            elif s > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = _Node(left) if left else None
+        self.right = _Node(right) if right else None
+
+class ScheduleIndex:
+    """
+    Recurring weekly blocks indexed by day and time.
+
+    Blocks are intervals on a Monday-00:00-based week of minutes held in a
+    centered interval tree, so overlap and "what's on at T" queries cost
+    O(log n + k). The tree is rebuilt lazily after blocks change, which
+    suits a schedule that is read far more often than edited.
+    """
+
+    def __init__(self, schedules: Iterable[Schedule] = ()):
+        self.blocks: Dict[str, Schedule] = {}
+        self.invalid: Dict[str, Schedule] = {} # loaded blocks with an unreadable day or time
+        self._root: Optional[_Node] = None
+        self._stale = False
+        for schedule in schedules:
+            try:
+                self.add(schedule)
+            except ValueError:
+                self.invalid[schedule.id] = schedule
+
+    def __len__(self) -> int:
+        return len(self.blocks) + len(self.invalid)
+
+    def add(self, schedule: Schedule):
+        """Indexes a block; raises ValueError if its day or times can't be parsed."""
+        week_intervals(schedule)
+        self.remove(schedule.id)
+        self.blocks[schedule.id] = schedule
+        self._stale = True
+
+    def remove(self, schedule_id: str):
+        self.invalid.pop(schedule_id, None)
+        if self.blocks.pop(schedule_id, None) is not None:
+            self._stale = True
+
+    def _tree(self) -> Optional[_Node]:
+        if self._stale:
+            intervals = [(s, e, b) for b in self.blocks.values() for s, e in week_intervals(b)]
+            self._root = _Node(intervals) if intervals else None
+            self._stale = False
+        return self._root
+
+    def _overlapping(self, start: int, end: int) -> List[Schedule]:
+        """Blocks overlapping the half-open week-minute range [start, end)."""
+        found: Dict[str, Schedule] = {}
+        stack = [self._tree()]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end <= node.center:
+                # Node intervals all reach past the center, so only their start matters
+                for s, _, block in node.by_start:
+                    if s >= end:
+                        break
+                    found[block.id] = block
+                stack.append(node.left)
+            elif start > node.center:
+                for _, e, block in node.by_end:
+                    if e <= start:
+                        break
+                    found[block.id] = block
+                stack.append(node.right)
+            else:
+                for _, _, block in node.by_start:
+                    found[block.id] = block
+                stack.append(node.left)
+                stack.append(node.right)
+        return self._in_week_order(found.values())
+
+    def conflicts(self, schedule: Schedule) -> List[Schedule]:
+        """Returns the indexed blocks that overlap `schedule` (other than itself)."""
+        found: Dict[str, Schedule] = {}
+        for start, end in week_intervals(schedule):
+            for block in self._overlapping(start, end):
+                if block.id != schedule.id:
+                    found[block.id] = block
+        return self._in_week_order(found.values())
+
+    def at(self, day: str, time: str) -> List[Schedule]:
+        """Returns the blocks in progress on `day` at `time` ('HH:MM')."""
+        minute = weekday_number(day) * MINUTES_PER_DAY + parse_time(time)
+        return self._overlapping(minute, minute + 1)
+
+    def at_datetime(self, when: datetime) -> List[Schedule]:
+        """Returns the blocks in progress at a moment in time."""
+        return self.at(WEEKDAYS[when.weekday()], when.strftime("%H:%M"))
+
+    @staticmethod
+    def _in_week_order(blocks: Iterable[Schedule]) -> List[Schedule]:
+        return sorted(blocks, key=lambda b: week_intervals(b)[0][0])
+
+    def ordered(self) -> List[Schedule]:
+        """All blocks Monday to Sunday by start time, then any unreadable ones."""
+        return self._in_week_order(self.blocks.values()) + list(self.invalid.values())
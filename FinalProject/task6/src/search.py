@@ -0,0 +1,310 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable, List, Dict, Optional, Sequence, Tuple
+
+from .models import KnowledgeEntry
+
+TOKEN_RE = re.compile(r"\w+")
+# Persisted next to knowledge.json in the data directory
+SEARCH_INDEX_FILE = "knowledge.index.json"
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase word tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+def _find(postings: Sequence[int], doc: int) -> int:
+    """Returns the position of `doc` in a sorted posting list, or -1."""
+    i = bisect_left(postings, doc)
+    return i if i < len(postings) and postings[i] == doc else -1
+
+# Indexed fields. Each posting stores one term-frequency byte per field,
+# packed into a single unsigned int in this order.
+FIELDS = ('title', 'content', 'tags', 'summary')
+FIELD_MASKS = {field: 0xFF << (8 * i) for i, field in enumerate(FIELDS)}
+# Plain keyword search ignores AI summaries; ranked search scores them too
+KEYWORD_FIELDS = FIELD_MASKS['title'] | FIELD_MASKS['content'] | FIELD_MASKS['tags']
+ALL_FIELDS = KEYWORD_FIELDS | FIELD_MASKS['summary']
+
+def _field_texts(entry: KnowledgeEntry) -> Tuple[str, str, str, str]:
+    return (entry.title, entry.content, ' '.join(entry.tags), entry.summary or "")
+
+def _fingerprint(texts: Tuple[str, ...]) -> int:
+    """64-bit hash of an entry's indexed text, to tell whether a persisted doc is out of date."""
+    digest = hashlib.blake2b("\x1f".join(texts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+class InvertedIndex:
+    """
+    Term -> posting list index over knowledge entry title, content, tags and summary.
+
+    Entries are numbered in the order they are added and each posting list
+    is a sorted array of those numbers, with a parallel array of packed
+    per-field term frequencies. A query word matches every indexed term it
+    is a prefix of ("pyth" finds "python"), and multi-word queries
+    intersect the per-word posting lists, smallest first.
+    """
+
+    VERSION = 3
+
+    def __init__(self):
+        self.doc_ids: List[Optional[str]] = [] # doc number -> entry ID (None once removed)
+        self.doc_numbers: Dict[str, int] = {}
+        self.postings: Dict[str, array] = {}
+        self.frequencies: Dict[str, array] = {} # parallel to postings, packed per field
+        self.field_lengths: List[array] = [array('I') for _ in FIELDS] # per field, by doc number
+        self.field_totals: List[int] = [0] * len(FIELDS) # token totals over live docs
+        self.fingerprints = array('Q') # by doc number, see _fingerprint
+        self.terms: List[str] = [] # sorted vocabulary for prefix lookups
+        self.entries: Dict[int, KnowledgeEntry] = {}
+        self.modified = False # changed since it was loaded or saved
+
+    def __len__(self) -> int:
+        return len(self.doc_numbers)
+
+    def add(self, entry: KnowledgeEntry):
+        """Indexes an entry, replacing any earlier version with the same ID."""
+        if entry.id in self.doc_numbers:
+            self.remove(entry.id)
+        doc = len(self.doc_ids)
+        self.modified = True
+        self.doc_ids.append(entry.id)
+        self.doc_numbers[entry.id] = doc
+        self.entries[doc] = entry
+
+        texts = _field_texts(entry)
+        self.fingerprints.append(_fingerprint(texts))
+        packed: Dict[str, int] = {}
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.field_lengths[i].append(len(tokens))
+            self.field_totals[i] += len(tokens)
+            shift = 8 * i
+            for term, count in Counter(tokens).items():
+                packed[term] = packed.get(term, 0) | (min(count, 255) << shift)
+
+        for term, tf in packed.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array('I')
+                self.frequencies[term] = array('I')
+                insort(self.terms, term)
+            postings.append(doc)
+            self.frequencies[term].append(tf)
+
+    def remove(self, entry_id: str):
+        """Drops an entry. Its postings stay behind and are skipped at query time."""
+        doc = self.doc_numbers.pop(entry_id, None)
+        if doc is not None:
+            self.modified = True
+            self.doc_ids[doc] = None
+            self.entries.pop(doc, None)
+            for i, lengths in enumerate(self.field_lengths):
+                self.field_totals[i] -= lengths[doc]
+
+    def sync(self, entries: Iterable[KnowledgeEntry]) -> int:
+        """
+        Attaches loaded entries to a persisted index, indexing only unseen IDs
+        and entries whose text changed since they were indexed.
+
+        Entries missing from `entries` are removed. Returns how many entries
+        had to be tokenized.
+        """
+        added = 0
+        seen = set()
+        for entry in entries:
+            seen.add(entry.id)
+            doc = self.doc_numbers.get(entry.id)
+            if doc is None or self.fingerprints[doc] != _fingerprint(_field_texts(entry)):
+                self.add(entry)
+                added += 1
+            else:
+                self.entries[doc] = entry
+        for entry_id in [i for i in self.doc_numbers if i not in seen]:
+            self.remove(entry_id)
+        return added
+
+    def matching_terms(self, word: str) -> List[str]:
+        """Returns every indexed term starting with `word`."""
+        i = bisect_left(self.terms, word)
+        matches = []
+        while i < len(self.terms) and self.terms[i].startswith(word):
+            matches.append(self.terms[i])
+            i += 1
+        return matches
+
+    def _has_word(self, terms: List[str], doc: int, field_mask: int) -> bool:
+        for term in terms:
+            pos = _find(self.postings[term], doc)
+            if pos >= 0 and self.frequencies[term][pos] & field_mask:
+                return True
+        return False
+
+    def search_docs(self, query: str, field_mask: int = KEYWORD_FIELDS) -> List[int]:
+        """Returns doc numbers matching every query word in the masked fields, in insertion order."""
+        words = set(tokenize(query))
+        if not words:
+            return []
+        term_groups = sorted(
+            (self.matching_terms(w) for w in words),
+            key=lambda terms: sum(len(self.postings[t]) for t in terms),
+        )
+        first = set()
+        for term in term_groups[0]:
+            for doc, tf in zip(self.postings[term], self.frequencies[term]):
+                if tf & field_mask and self.doc_ids[doc] is not None:
+                    first.add(doc)
+        docs = sorted(first)
+        for terms in term_groups[1:]:
+            if not docs:
+                break
+            docs = [d for d in docs if self._has_word(terms, d, field_mask)]
+        return docs
+
+    def search(self, query: str) -> List[KnowledgeEntry]:
+        """Returns the entries matching every query word."""
+        return [self.entries[d] for d in self.search_docs(query) if d in self.entries]
+
+    # --- Persistence ---
+
+    def save(self, path: str):
+        """
+        Writes the index to disk (atomically replacing any previous file).
+
+        Removed entries are dropped and the rest renumbered in the written
+        copy; the in-memory index is left as is.
+        """
+        renumber = {}
+        doc_ids = []
+        for doc, entry_id in enumerate(self.doc_ids):
+            if entry_id is not None:
+                renumber[doc] = len(doc_ids)
+                doc_ids.append(entry_id)
+
+        postings, frequencies = {}, {}
+        for term, docs in self.postings.items():
+            kept = [(renumber[d], tf) for d, tf in zip(docs, self.frequencies[term]) if d in renumber]
+            if kept:
+                postings[term] = [d for d, _ in kept]
+                frequencies[term] = [tf for _, tf in kept]
+
+        data = {
+            'version': self.VERSION,
+            'doc_ids': doc_ids,
+            'field_lengths': [[lengths[d] for d in renumber] for lengths in self.field_lengths],
+            'fingerprints': [self.fingerprints[d] for d in renumber],
+            'postings': postings,
+            'frequencies': frequencies,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self.modified = False
+
+    @classmethod
+    def load(cls, path: str) -> 'InvertedIndex':
+        """Reads an index from disk, or returns an empty one if it is missing, outdated or unreadable."""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Could not decode search index {path}. Rebuilding it.")
+            return index
+        if data.get('version') != cls.VERSION:
+            return index
+        index.doc_ids = data['doc_ids']
+        index.doc_numbers = {entry_id: doc for doc, entry_id in enumerate(index.doc_ids)}
+        index.postings = {term: array('I', docs) for term, docs in data['postings'].items()}
+        index.frequencies = {term: array('I', tfs) for term, tfs in data['frequencies'].items()}
+        index.field_lengths = [array('I', lengths) for lengths in data['field_lengths']]
+        index.field_totals = [sum(lengths) for lengths in index.field_lengths]
+        index.fingerprints = array('Q', data['fingerprints'])
+        index.terms = sorted(index.postings)
+        return index
+
+# --- Ranked search ---
+
+# Relative importance of a term hit in each field
+DEFAULT_FIELD_WEIGHTS = {'title': 3.0, 'content': 1.0, 'tags': 2.0, 'summary': 1.5}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def term_stats(index: InvertedIndex, query: str) -> Tuple[int, List[int], Dict[str, int]]:
+    """
+    Corpus statistics BM25 needs for `query`: live document count, token
+    totals per field, and the document frequency of each matching term.
+
+    Statistics from several indexes over disjoint entries can be summed
+    (see sharded_search.py) to score each of them as if it were one index.
+    """
+    dfs = {}
+    for word in set(tokenize(query)):
+        for term in index.matching_terms(word):
+            dfs[term] = sum(1 for d in index.postings[term] if index.doc_ids[d] is not None)
+    return len(index), list(index.field_totals), dfs
+
+def top_docs(index: InvertedIndex, query: str, k: int, field_weights: Dict[str, float],
+             stats: Tuple[int, List[int], Dict[str, int]]) -> List[Tuple[float, int]]:
+    """Returns the best `k` (score, doc number) pairs matching `query`, best first."""
+    candidates = set(index.search_docs(query, field_mask=ALL_FIELDS))
+    if not candidates or k <= 0:
+        return []
+
+    n_docs, field_totals, dfs = stats
+    avg_lengths = [(total / n_docs) or 1.0 for total in field_totals]
+    scores: Dict[int, float] = dict.fromkeys(candidates, 0.0)
+
+    terms = set()
+    for word in set(tokenize(query)):
+        terms.update(index.matching_terms(word))
+    for term in terms:
+        postings = index.postings[term]
+        df = dfs.get(term, 0)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for doc, packed in zip(postings, index.frequencies[term]):
+            if doc not in candidates:
+                continue
+            weighted_tf = 0.0
+            for i, field in enumerate(FIELDS):
+                tf = (packed >> (8 * i)) & 0xFF
+                if tf:
+                    norm = 1 - BM25_B + BM25_B * index.field_lengths[i][doc] / avg_lengths[i]
+                    weighted_tf += field_weights.get(field, 0.0) * tf / norm
+            scores[doc] += idf * weighted_tf / (BM25_K1 + weighted_tf)
+
+    # Min-heap of the best k; ties favour earlier entries
+    heap: List[Tuple[float, int]] = []
+    for doc, score in scores.items():
+        item = (score, -doc)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+    return [(score, -neg_doc) for score, neg_doc in sorted(heap, reverse=True)]
+
+def ranked_search(index: InvertedIndex, query: str, limit: int = 10, offset: int = 0,
+                  field_weights: Optional[Dict[str, float]] = None) -> List[Tuple[float, KnowledgeEntry]]:
+    """
+    Returns one page of (score, entry) pairs for entries matching every query word.
+
+    Matches are scored with BM25F: each field's term frequency is normalized
+    by that field's average length and weighted by `field_weights` before
+    saturation. Only the best `offset + limit` scores are kept in a bounded
+    heap, so fetching a page never sorts the full match set.
+    """
+    weights = field_weights or DEFAULT_FIELD_WEIGHTS
+    k = offset + limit
+    if k <= 0:
+        return []
+    page = top_docs(index, query, k, weights, term_stats(index, query))[offset:offset + limit]
+    return [(score, index.entries[doc]) for score, doc in page if doc in index.entries]
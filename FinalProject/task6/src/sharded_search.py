@@ -0,0 +1,147 @@
+"""
+Knowledge search spread over several worker processes.
+
+The corpus is split into shards, each held by a long-lived worker process
+with its own InvertedIndex. A new query first goes to every shard for
+match counts and BM25 statistics, which the parent sums and keeps for
+that query until the entries change. Each page is then one more round:
+every shard's best `offset + limit` matches, scored with the summed
+statistics. Scores are therefore the same as a single index over all
+entries would give, and the parent only merges the per-shard pages.
+
+Workers receive entries as plain dicts and keep only postings, not the
+entries themselves; results come back as entry IDs.
+"""
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import KnowledgeEntry
+from .search import ALL_FIELDS, DEFAULT_FIELD_WEIGHTS, InvertedIndex, term_stats, top_docs
+
+# --- Worker side ---
+# Each worker process holds one shard in these globals.
+
+_index: Optional[InvertedIndex] = None
+_positions: List[int] = [] # local doc number -> corpus position
+
+def _init_shard():
+    global _index, _positions
+    _index = InvertedIndex()
+    _positions = []
+
+def _add_records(records: List[Tuple[int, Dict]]):
+    for position, record in records:
+        # The index only reads these attributes, so skip building the model
+        _index.add(SimpleNamespace(id=record['id'], title=record['title'], content=record['content'],
+                                   tags=record.get('tags') or [], summary=record.get('summary')))
+        _index.entries.clear()
+        _positions.append(position)
+
+def _remove(entry_id: str):
+    _index.remove(entry_id)
+
+def _stats(query: str):
+    return len(_index.search_docs(query, field_mask=ALL_FIELDS)), term_stats(_index, query)
+
+def _top(query: str, k: int, field_weights: Dict[str, float], stats) -> List[Tuple[float, int, str]]:
+    return [(score, _positions[doc], _index.doc_ids[doc])
+            for score, doc in top_docs(_index, query, k, field_weights, stats)]
+
+# --- Parent side ---
+
+class ShardedSearch:
+    """
+    Parallel counterpart of InvertedIndex + ranked_search for large corpora.
+
+    Entries are dealt to `shards` workers round-robin in corpus order. An
+    updated entry is re-added at the end, as InvertedIndex.add does, so ties
+    are broken by corpus position just like the single-process search.
+    """
+
+    def __init__(self, entries: Iterable[KnowledgeEntry] = (), shards: Optional[int] = None,
+                 batch_size: int = 1000):
+        self.shards = shards or os.cpu_count() or 1
+        self.batch_size = batch_size
+        # One single-process pool per shard, so each shard's calls reach the worker holding it
+        self._pools = [ProcessPoolExecutor(max_workers=1, initializer=_init_shard)
+                       for _ in range(self.shards)]
+        self._shard_of: Dict[str, int] = {}
+        self._next_position = 0
+        # (query, summed statistics) of the last query, so its count and pages share one stats round
+        self._last_stats: Optional[Tuple[str, Tuple]] = None
+        self.add_many(entries)
+
+    def __len__(self) -> int:
+        return len(self._shard_of)
+
+    def add_many(self, entries: Iterable[KnowledgeEntry]):
+        """Indexes entries, replacing earlier versions with the same IDs."""
+        self._last_stats = None
+        batches: List[List[Tuple[int, Dict]]] = [[] for _ in self._pools]
+        futures = []
+        for entry in entries:
+            old = self._shard_of.get(entry.id)
+            if old is not None:
+                # Flush first so the removal can't overtake a pending add of the same ID
+                if batches[old]:
+                    futures.append(self._pools[old].submit(_add_records, batches[old]))
+                    batches[old] = []
+                futures.append(self._pools[old].submit(_remove, entry.id))
+            shard = self._next_position % self.shards
+            batches[shard].append((self._next_position, entry.to_dict()))
+            self._shard_of[entry.id] = shard
+            self._next_position += 1
+            if len(batches[shard]) >= self.batch_size:
+                futures.append(self._pools[shard].submit(_add_records, batches[shard]))
+                batches[shard] = []
+        for shard, batch in enumerate(batches):
+            if batch:
+                futures.append(self._pools[shard].submit(_add_records, batch))
+        for future in wait(futures).done:
+            future.result() # re-raise worker errors
+
+    def add(self, entry: KnowledgeEntry):
+        self.add_many([entry])
+
+    def _gather(self, fn, *args) -> List:
+        futures = [pool.submit(fn, *args) for pool in self._pools]
+        return [f.result() for f in futures]
+
+    def _summed_stats(self, query: str) -> Tuple[int, Tuple[int, List[int], Dict[str, int]]]:
+        if self._last_stats is not None and self._last_stats[0] == query:
+            return self._last_stats[1]
+        count, n_docs = 0, 0
+        field_totals: List[int] = []
+        dfs: Dict[str, int] = {}
+        for shard_count, (shard_docs, shard_totals, shard_dfs) in self._gather(_stats, query):
+            count += shard_count
+            n_docs += shard_docs
+            field_totals = [a + b for a, b in zip(field_totals, shard_totals)] if field_totals else shard_totals
+            for term, df in shard_dfs.items():
+                dfs[term] = dfs.get(term, 0) + df
+        self._last_stats = (query, (count, (n_docs, field_totals, dfs)))
+        return self._last_stats[1]
+
+    def count(self, query: str) -> int:
+        """Number of entries matching every query word (in any field, as ranked search does)."""
+        return self._summed_stats(query)[0]
+
+    def ranked(self, query: str, limit: int = 10, offset: int = 0,
+               field_weights: Optional[Dict[str, float]] = None) -> List[Tuple[float, str]]:
+        """Returns one page of (score, entry ID) pairs, like ranked_search."""
+        k = offset + limit
+        if k <= 0:
+            return []
+        count, stats = self._summed_stats(query)
+        if not count:
+            return []
+        pages = self._gather(_top, query, k, field_weights or DEFAULT_FIELD_WEIGHTS, stats)
+        best = heapq.merge(*pages, key=lambda hit: (-hit[0], hit[1]))
+        return [(score, entry_id) for score, _, entry_id in list(best)[offset:k]]
+
+    def close(self):
+        for pool in self._pools:
+            pool.shutdown(cancel_futures=True)
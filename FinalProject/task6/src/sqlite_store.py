@@ -0,0 +1,355 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import List, Type, TypeVar, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from .data_manager import DataManager, JOURNAL_SUFFIX, COMPACTING_SUFFIX
+from .content_store import CONTENT_FILE, ContentStore, is_stored_ref
+from .id_index import AmbiguousPrefixError
+from .task_index import PRIORITY_RANK
+from .metrics import metrics
+
+T = TypeVar('T')
+
+# file_type -> (table name, columns). Columns mirror the model's to_dict keys,
+# plus content_ref for knowledge bodies kept in the content store.
+TABLES: Dict[str, Tuple[str, List[str]]] = {
+    'pkm': ('knowledge', ['id', 'title', 'content', 'tags', 'created_at', 'summary', 'is_summarized',
+                          'content_ref']),
+    'task': ('tasks', ['id', 'title', 'description', 'due_date', 'status', 'priority',
+                       'knowledge_link_id', 'created_at', 'is_prioritized']),
+    'schedule': ('schedules', ['id', 'title', 'day_of_week', 'start_time', 'end_time',
+                               'location', 'created_at']),
+    'link': ('links', ['id', 'source_id', 'target_id', 'created_at']),
+}
+
+# Columns stored as JSON text or 0/1 integers rather than plain values
+JSON_COLUMNS = {'tags'}
+BOOL_COLUMNS = {'is_summarized', 'is_prioritized'}
+
+# Same ranking as task_index.task_sort_key: high < medium < low, then due
+# date with missing dates last. idx_tasks_order is built on these exact
+# expressions so SQLite can read the pending view straight off the index.
+PRIORITY_RANK_SQL = "CASE priority {} ELSE {} END".format(
+    " ".join(f"WHEN '{p}' THEN {r}" for p, r in PRIORITY_RANK.items()), len(PRIORITY_RANK))
+DUE_DATE_SQL = "COALESCE(NULLIF(due_date, ''), '9999-12-31')"
+
+# Orderings query_tasks accepts (never interpolate caller strings into SQL)
+TASK_ORDERINGS = {
+    'created': 'created_at',
+    'priority': f'{PRIORITY_RANK_SQL}, {DUE_DATE_SQL}, created_at',
+    'due_date': 'due_date',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS knowledge (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    created_at TEXT,
+    summary TEXT,
+    is_summarized INTEGER NOT NULL DEFAULT 0,
+    content_ref TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_date TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority TEXT NOT NULL DEFAULT 'medium',
+    knowledge_link_id TEXT,
+    created_at TEXT,
+    is_prioritized INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS schedules (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    day_of_week TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    location TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS links (
+    id TEXT PRIMARY KEY,
+    source_id TEXT NOT NULL,
+    target_id TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_links_source_id ON links (source_id);
+CREATE INDEX IF NOT EXISTS idx_links_target_id ON links (target_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, is_prioritized);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks (due_date);
+CREATE INDEX IF NOT EXISTS idx_tasks_knowledge_link_id ON tasks (knowledge_link_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at);
+CREATE INDEX IF NOT EXISTS idx_knowledge_created_at ON knowledge (created_at);
+CREATE INDEX IF NOT EXISTS idx_knowledge_is_summarized ON knowledge (is_summarized);
+CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks (status, {rank}, {due}, created_at);
+""".format(rank=PRIORITY_RANK_SQL, due=DUE_DATE_SQL)
+
+class SQLiteDataManager:
+    """
+    Storage backend that persists models to a local SQLite file.
+
+    Exposes the same load_data/save_data/append_record API as the JSON
+    DataManager, plus indexed queries (`query_tasks`, `find_task`,
+    `get_record`) so PKMSTaskManager can filter tasks in SQL instead of
+    scanning Python lists.
+
+    Large knowledge bodies go to the same content.dat as with the JSON
+    files: the row's content is empty and content_ref holds the body's
+    [offset, length] there.
+    """
+
+    supports_queries = True
+
+    def __init__(self, data_dir: str = ".data", db_name: str = "pkms.db"):
+        self.data_dir = data_dir
+        os.makedirs(data_dir, exist_ok=True)
+        self.db_path = os.path.join(self.data_dir, db_name)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        knowledge_columns = {r['name'] for r in self.conn.execute("PRAGMA table_info(knowledge)")}
+        if 'content_ref' not in knowledge_columns: # a database from before the content store
+            self.conn.execute("ALTER TABLE knowledge ADD COLUMN content_ref TEXT")
+        self.content_store = ContentStore(os.path.join(self.data_dir, CONTENT_FILE))
+
+    def close(self):
+        self.conn.close()
+        self.content_store.close()
+
+    # --- Row conversion ---
+
+    def _to_row(self, data: Dict[str, Any], columns: List[str]) -> Tuple[Any, ...]:
+        row = []
+        for col in columns:
+            value = data.get(col)
+            if col == 'content' and is_stored_ref(value):
+                value = ""
+            elif col == 'content_ref':
+                content = data.get('content')
+                value = json.dumps(content) if is_stored_ref(content) else None
+            elif col in JSON_COLUMNS:
+                value = json.dumps(value if value is not None else [])
+            elif col in BOOL_COLUMNS:
+                value = 1 if value else 0
+            row.append(value)
+        return tuple(row)
+
+    def _from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        for col in JSON_COLUMNS & data.keys():
+            data[col] = json.loads(data[col])
+        for col in BOOL_COLUMNS & data.keys():
+            data[col] = bool(data[col])
+        if 'content_ref' in data:
+            content_ref = data.pop('content_ref')
+            if content_ref is not None:
+                data['content'] = json.loads(content_ref)
+        return data
+
+    def _to_dict(self, obj: Any, file_type: str) -> Dict[str, Any]:
+        """obj.to_dict(), with knowledge bodies stored in the content store."""
+        return obj.to_dict(self.content_store) if file_type == 'pkm' else obj.to_dict()
+
+    def _from_dict(self, model_class: Type[T], file_type: str, data: Dict[str, Any]) -> T:
+        """model_class.from_dict, resolving knowledge bodies against the content store."""
+        if file_type == 'pkm':
+            return model_class.from_dict(data, content_store=self.content_store)
+        return model_class.from_dict(data)
+
+    def upsert_raw(self, rows: Iterable[Dict[str, Any]], file_type: str) -> int:
+        """
+        Inserts or updates raw record dictionaries in one transaction.
+
+        Updates happen in place (ON CONFLICT DO UPDATE rather than INSERT OR
+        REPLACE), so a record keeps its rowid and with it its load order.
+        """
+        table, columns = TABLES[file_type]
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != 'id')
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+               f"ON CONFLICT(id) DO UPDATE SET {updates}")
+        values = [self._to_row(d, columns) for d in rows]
+        with self._lock, self.conn:
+            self.conn.executemany(sql, values)
+        return len(values)
+
+    def delete_raw(self, ids: Iterable[str], file_type: str):
+        """Deletes records by ID in one transaction."""
+        table, _ = TABLES[file_type]
+        with self._lock, self.conn:
+            self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in ids])
+
+    # --- DataManager-compatible API ---
+
+    def iter_data(self, model_class: Type[T], file_type: str, batch_size: int = 1000) -> Iterator[T]:
+        """Yields model objects in insertion order, fetching `batch_size` rows at a time."""
+        table, _ = TABLES[file_type]
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT rowid AS _rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1]['_rowid']
+            for row in rows:
+                data = self._from_row(row)
+                del data['_rowid']
+                yield self._from_dict(model_class, file_type, data)
+
+    def load_data(self, model_class: Type[T], file_type: str) -> List[T]:
+        """Loads every record of a file type as model objects."""
+        table, _ = TABLES[file_type]
+        with metrics.timer("pkms_storage_seconds", op="load", file=file_type):
+            with self._lock:
+                rows = self.conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+            return [self._from_dict(model_class, file_type, self._from_row(r)) for r in rows]
+
+    def save_data(self, data: List[Any], file_type: str):
+        """Upserts a list of model objects."""
+        with metrics.timer("pkms_storage_seconds", op="save", file=file_type):
+            self.upsert_raw((self._to_dict(d, file_type) for d in data), file_type)
+        print(f"\n--- Data saved successfully to {self.db_path} ---")
+
+    def append_records(self, data: Iterable[Any], file_type: str, durable: bool = False):
+        """Upserts added or updated model objects (each call is one committed transaction)."""
+        with metrics.timer("pkms_storage_seconds", op="append", file=file_type):
+            rows = [self._to_dict(d, file_type) for d in data]
+            if durable:
+                self.content_store.sync()
+            self.upsert_raw(rows, file_type)
+
+    def append_record(self, obj: Any, file_type: str):
+        """Upserts a single added or updated model object."""
+        self.append_records([obj], file_type)
+
+    def delete_records(self, ids: Iterable[str], file_type: str, durable: bool = False):
+        """Deletes records by ID (one committed transaction)."""
+        with metrics.timer("pkms_storage_seconds", op="delete", file=file_type):
+            self.delete_raw(ids, file_type)
+
+    # --- Indexed queries ---
+
+    def count(self, file_type: str) -> int:
+        table, _ = TABLES[file_type]
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def get_record(self, model_class: Type[T], file_type: str, record_id: str) -> Optional[T]:
+        """Fetches one record by exact ID via the primary key."""
+        table, _ = TABLES[file_type]
+        with self._lock:
+            row = self.conn.execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,)).fetchone()
+        return self._from_dict(model_class, file_type, self._from_row(row)) if row else None
+
+    def query_tasks(self, model_class: Type[T], status: Optional[str] = None,
+                    is_prioritized: Optional[bool] = None, knowledge_link_id: Optional[str] = None,
+                    order_by: str = 'created', limit: Optional[int] = None) -> List[T]:
+        """Returns tasks matching the given filters using the task indexes."""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if is_prioritized is not None:
+            clauses.append("is_prioritized = ?")
+            params.append(1 if is_prioritized else 0)
+        if knowledge_link_id is not None:
+            clauses.append("knowledge_link_id = ?")
+            params.append(knowledge_link_id)
+
+        sql = "SELECT * FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {TASK_ORDERINGS[order_by]}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with metrics.timer("pkms_storage_seconds", op="query", file='task'):
+            with self._lock:
+                rows = self.conn.execute(sql, params).fetchall()
+            return [model_class.from_dict(self._from_row(r)) for r in rows]
+
+    def find_task(self, model_class: Type[T], id_prefix: str, status: Optional[str] = None) -> Optional[T]:
+        """
+        Finds the task with a full ID or unique ID prefix, as a primary-key range scan.
+
+        Raises AmbiguousPrefixError when the prefix matches several tasks.
+        """
+        if not id_prefix:
+            return None
+        sql = "SELECT * FROM tasks WHERE id >= ? AND id < ?"
+        params: List[Any] = [id_prefix, id_prefix + "\uffff"]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        with self._lock:
+            rows = self.conn.execute(sql + " ORDER BY id LIMIT 2", params).fetchall()
+        if len(rows) > 1 and rows[0]['id'] != id_prefix:
+            raise AmbiguousPrefixError(id_prefix, [r['id'] for r in rows])
+        return model_class.from_dict(self._from_row(rows[0])) if rows else None
+
+# --- Migration from JSON ---
+
+def _iter_json_records(data_manager: DataManager, file_type: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields ('put', record) / ('delete', {'id': ...}) operations for a JSON data file."""
+    filepath = data_manager._path_for(file_type)
+    for record in data_manager._iter_file(filepath):
+        yield 'put', record
+    for journal_path in (filepath + COMPACTING_SUFFIX, filepath + JOURNAL_SUFFIX):
+        for op in data_manager._read_journal(journal_path):
+            if op.get('op') == 'put':
+                yield 'put', op['record']
+            elif op.get('op') == 'delete':
+                yield 'delete', {'id': op['id']}
+
+def migrate_json_to_sqlite(data_dir: str = ".data", batch_size: int = 1000,
+                           file_types: Iterable[str] = ('pkm', 'task', 'schedule', 'link')) -> Dict[str, int]:
+    """
+    One-shot migration of the JSON snapshot + journal files into pkms.db.
+
+    Records are written in batches of `batch_size`, one transaction each, and
+    journal operations are applied in order, so only one batch is held in
+    memory on the SQLite side. Returns the number of operations applied per
+    file type.
+    """
+    source = DataManager(data_dir=data_dir)
+    target = SQLiteDataManager(data_dir=data_dir)
+    applied: Dict[str, int] = {}
+    try:
+        for file_type in file_types:
+            count = 0
+            batch: List[Dict[str, Any]] = []
+            for op, record in _iter_json_records(source, file_type):
+                if op == 'delete':
+                    target.upsert_raw(batch, file_type)
+                    batch = []
+                    target.delete_raw([record['id']], file_type)
+                else:
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        target.upsert_raw(batch, file_type)
+                        batch = []
+                count += 1
+            target.upsert_raw(batch, file_type)
+            applied[file_type] = count
+            print(f"Migrated {count} {file_type} records into {target.db_path}")
+    finally:
+        target.close()
+    return applied
+
+if __name__ == "__main__":
+    migrate_json_to_sqlite(sys.argv[1] if len(sys.argv) > 1 else ".data")
@@ -0,0 +1,59 @@
+"""
+Startup timing report for `task6 --startup-report`.
+
+Shows where the time before the menu goes: module imports (measured in a
+fresh interpreter with `-X importtime`), constructing the manager, and
+what each lazily loaded collection costs on first access.
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+def import_breakdown(module: str, top: int = 10) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+
+    Returns the total import time in seconds and the `top` slowest modules it
+    imports directly, as (cumulative seconds, name), slowest first.
+    """
+    package_depth = module.count(".")
+    root = os.path.abspath(__file__)
+    for _ in range(package_depth + 1):
+        root = os.path.dirname(root)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=root, capture_output=True, text=True)
+    total, children, pending = 0.0, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        seconds = int(cumulative) / 1e6
+        # A module's own imports are listed (one level deeper) just before it
+        if depth == 1:
+            pending.append((seconds, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = seconds, pending
+            pending = []
+    return total, sorted(children, reverse=True)[:top]
+
+def print_startup_report(manager, init_seconds: float, module: str):
+    """Prints import, construction and per-collection first-load times."""
+    total, slowest = import_breakdown(module)
+    print("\n--- STARTUP REPORT ---")
+    print(f"Imports:       {total * 1000:8.1f} ms  ({module}, fresh interpreter)")
+    for seconds, name in slowest:
+        print(f"    {seconds * 1000:8.1f} ms  {name}")
+    print(f"Manager init:  {init_seconds * 1000:8.1f} ms")
+    print(f"Menu ready:    {(total + init_seconds) * 1000:8.1f} ms")
+
+    print("\nFirst access (deferred until a menu option needs it):")
+    for name in ("knowledge", "tasks", "schedules", "search_index", "llm_agent"):
+        start = time.perf_counter()
+        value = getattr(manager, name)
+        elapsed = manager.load_times.get(name, time.perf_counter() - start)
+        size = f"{len(value)} records" if hasattr(value, "__len__") else ""
+        print(f"    {elapsed * 1000:8.1f} ms  {name.ljust(13)} {size}")
@@ -0,0 +1,110 @@
+import sys
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .models import Task
+
+# Lower rank sorts first; unknown priorities go after "low"
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+NO_DUE_DATE = sys.maxsize
+
+def priority_rank(priority: str) -> int:
+    return PRIORITY_RANK.get(priority, len(PRIORITY_RANK))
+
+def due_ordinal(due_date: str) -> int:
+    """Day number of a YYYY-MM-DD date; missing or unreadable dates sort last."""
+    try:
+        return datetime.strptime(due_date, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return NO_DUE_DATE
+
+def task_sort_key(task: Task) -> Tuple[int, int, str, str]:
+    """Most urgent first: priority rank, then due date, then creation time."""
+    return (priority_rank(task.priority), due_ordinal(task.due_date), task.created_at or "", task.id)
+
+class TaskOrderIndex:
+    """
+    Tasks with one status (pending by default) kept in priority/due-date order.
+
+    Keys live in a list of sorted buckets of at most 2 * LOAD keys, with the
+    last key of each bucket in `_maxes`, so an add, removal or re-prioritization
+    is a bisect over buckets plus a short insert, and the top N are read off the
+    front. Tasks with another status are not stored, so completed tasks never
+    slow the pending view down.
+    """
+
+    LOAD = 500
+
+    def __init__(self, tasks: Iterable[Task] = (), status: str = "pending"):
+        self.status = status
+        self.tasks: Dict[str, Task] = {}
+        self._keys: Dict[str, Tuple] = {} # task ID -> key it is filed under
+        self._buckets: List[List[Tuple]] = []
+        self._maxes: List[Tuple] = []
+        keys = []
+        for task in tasks:
+            if task.status == status:
+                key = task_sort_key(task)
+                self.tasks[task.id] = task
+                self._keys[task.id] = key
+                keys.append(key)
+        keys.sort()
+        self._buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Task]:
+        for bucket in self._buckets:
+            for key in bucket:
+                yield self.tasks[key[-1]]
+
+    def _insert(self, key: Tuple):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+
+    def _delete(self, key: Tuple):
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def update(self, task: Task):
+        """Files a new or changed task under its current status, priority and due date."""
+        self.remove(task.id)
+        if task.status == self.status:
+            key = task_sort_key(task)
+            self.tasks[task.id] = task
+            self._keys[task.id] = key
+            self._insert(key)
+
+    def remove(self, task_id: str):
+        key = self._keys.pop(task_id, None)
+        if key is not None:
+            del self.tasks[task_id]
+            self._delete(key)
+
+    def top(self, n: int) -> List[Task]:
+        """Returns the first `n` tasks in order."""
+        found = []
+        for bucket in self._buckets:
+            for key in bucket:
+                if len(found) == n:
+                    return found
+                found.append(self.tasks[key[-1]])
+        return found
@@ -0,0 +1,10 @@
+import pytest
+
+from src.data_manager import DataManager
+
+# --- Shared Fixtures ---
+
+@pytest.fixture
+def data_manager(tmp_path):
+    """Provides a DataManager writing into a temporary data directory."""
+    return DataManager(data_dir=str(tmp_path / '.data'))
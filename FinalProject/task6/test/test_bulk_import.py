@@ -0,0 +1,126 @@
+import json
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager, JOURNAL_SUFFIX
+from src.sqlite_store import SQLiteDataManager
+from src.bulk_import import bulk_import, main, open_source
+
+# --- Source Tests ---
+
+def test_markdown_folder_reads_front_matter_and_heading(tmp_path):
+    vault = tmp_path / 'vault'
+    (vault / 'sub').mkdir(parents=True)
+    (vault / 'a.md').write_text("---\ntags: [python, tools]\n---\n# Packaging\nUse uv.")
+    (vault / 'sub' / 'b.md').write_text("No heading here.")
+    (vault / 'skip.txt').write_text("ignored")
+
+    records = dict(open_source(str(vault)))
+    assert records['a.md'] == {'title': 'Packaging', 'content': 'Use uv.', 'tags': ['python', 'tools']}
+    assert records['sub/b.md']['title'] == 'b'
+    assert len(records) == 2
+
+def test_csv_source_splits_tags_and_flags(tmp_path):
+    path = tmp_path / 'notes.csv'
+    path.write_text('title,content,tags,is_summarized\nNote,Body,"a, b",true\n')
+    [(row, record)] = list(open_source(str(path)))
+    assert row == 2
+    assert record == {'title': 'Note', 'content': 'Body', 'tags': ['a', 'b'], 'is_summarized': True}
+
+# --- Pipeline Tests ---
+
+def test_import_batches_and_rejects_invalid_records(data_manager, tmp_path):
+    path = tmp_path / 'notes.jsonl'
+    lines = [json.dumps({'title': f'Note {i}', 'content': 'Body'}) for i in range(5)]
+    lines.insert(2, json.dumps({'content': 'no title'}))
+    lines.insert(4, '{not json')
+    path.write_text("\n".join(lines) + "\n")
+
+    batches = []
+    report = bulk_import(data_manager, 'pkm', open_source(str(path)), batch_size=2,
+                         progress=lambda r: batches.append(r.imported))
+
+    assert report.imported == 5
+    assert [loc for loc, _ in report.rejected] == [3, 5]
+    assert batches == [2, 4, 5]
+    loaded = data_manager.load_data(KnowledgeEntry, 'pkm')
+    assert [e.title for e in loaded] == [f'Note {i}' for i in range(5)]
+    assert len({e.id for e in loaded}) == 5
+
+def test_tasks_link_to_knowledge_by_title(data_manager):
+    existing = KnowledgeEntry(title="Research Plan", content="")
+    data_manager.append_record(existing, 'pkm')
+    records = [
+        (1, {'title': 'Read papers', 'due_date': '2025-02-01', 'knowledge_link_title': 'research plan'}),
+        (2, {'title': 'Dangling', 'knowledge_link_title': 'Nope'}),
+        (3, {'title': 'Bad date', 'due_date': '02/01/2025'}),
+    ]
+    report = bulk_import(data_manager, 'task', records)
+
+    assert report.imported == 1
+    assert len(report.rejected) == 2
+    [task] = data_manager.load_data(Task, 'task')
+    assert task.knowledge_link_id == existing.id
+
+def test_wrongly_typed_fields_are_rejected_not_raised(data_manager):
+    """A list or dict where a string belongs is reported as an invalid row."""
+    records = [
+        (1, {'title': 'List priority', 'priority': ['high']}),
+        (2, {'title': 'Dict status', 'status': {'done': True}}),
+        (3, {'title': 'Numeric id', 'id': 7}),
+        (4, {'title': 'Link title', 'knowledge_link_title': ['Plan']}),
+        (5, {'title': 'Fine', 'priority': 'high'}),
+    ]
+    report = bulk_import(data_manager, 'task', records)
+    assert report.imported == 1
+    assert [loc for loc, _ in report.rejected] == [1, 2, 3, 4]
+
+    notes = [(1, {'title': 'Tags', 'tags': ['ok', 3]}), (2, {'title': 'Summary', 'summary': ['x']})]
+    assert [loc for loc, _ in bulk_import(data_manager, 'pkm', notes).rejected] == [1, 2]
+
+def test_import_compacts_once_at_the_end(tmp_path, monkeypatch):
+    """Batches larger than the compaction threshold don't each rewrite the snapshot."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'), compact_threshold=3)
+    compactions = []
+    compact = dm.compact
+    monkeypatch.setattr(dm, 'compact', lambda file_type: compactions.append(file_type) or compact(file_type))
+
+    records = ((i, {'title': f'Note {i}'}) for i in range(20))
+    report = bulk_import(dm, 'pkm', records, batch_size=5)
+    dm.wait_for_compaction()
+
+    assert report.batches == 4
+    assert compactions == ['pkm']
+    assert len(dm.load_data(KnowledgeEntry, 'pkm')) == 20
+
+def test_import_into_sqlite_commits_per_batch(tmp_path):
+    store = SQLiteDataManager(data_dir=str(tmp_path / '.data'))
+    records = ((i, {'title': f'Task {i}'}) for i in range(7))
+    report = bulk_import(store, 'task', records, batch_size=3)
+    assert (report.imported, report.batches) == (7, 3)
+    assert store.count('task') == 7
+    store.close()
+
+def test_imported_large_notes_go_to_the_content_store(data_manager, tmp_path):
+    vault = tmp_path / 'vault'
+    vault.mkdir()
+    body = "A long transcript. " * 500
+    (vault / 'talk.md').write_text(f"# Talk\n{body}")
+    bulk_import(data_manager, 'pkm', open_source(str(vault)))
+
+    with open(data_manager.pkm_path + JOURNAL_SUFFIX, encoding='utf-8') as f:
+        assert isinstance(json.loads(f.readline())['record']['content'], list)
+    assert [e.content for e in data_manager.load_data(KnowledgeEntry, 'pkm')] == [body.strip()]
+
+def test_main_picks_the_backend_like_the_app(tmp_path, monkeypatch):
+    """--storage, else PKMS_STORAGE, chooses the store the same way `python -m src` does."""
+    path = tmp_path / 'tasks.csv'
+    path.write_text('title,priority\nShip,high\n')
+    data_dir = str(tmp_path / '.data')
+    monkeypatch.setenv('PKMS_STORAGE', 'sqlite')
+    assert main(['task', str(path), '--data-dir', data_dir]) == 0
+    assert main(['task', str(path), '--data-dir', data_dir, '--storage', 'json']) == 0
+
+    store = SQLiteDataManager(data_dir=data_dir)
+    assert store.count('task') == 1
+    store.close()
+    assert len(DataManager(data_dir=data_dir).load_data(Task, 'task')) == 1
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager
+from src.change_tracker import ChangeTracker, AutoSaver
+from src.__main__ import PKMSTaskManager
+
+# --- Fixtures ---
+
+class CountingDataManager(DataManager):
+    """Records every append so tests can check how much was written."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.appended = []
+
+    def append_records(self, data, file_type, durable=False):
+        data = list(data)
+        self.appended.append((file_type, len(data), durable))
+        super().append_records(data, file_type, durable)
+
+# --- Tracker Tests ---
+
+def test_flush_writes_each_dirty_record_once(data_manager):
+    tracker = ChangeTracker()
+    task = Task(title="T", description="", due_date="2025-01-01")
+    tracker.mark(task, 'task')
+    task.status = "complete"
+    tracker.mark(task, 'task')
+    tracker.mark(KnowledgeEntry(title="N", content=""), 'pkm')
+
+    assert len(tracker) == 2
+    assert tracker.flush(data_manager) == 2
+    assert not tracker.is_dirty()
+    assert tracker.flush(data_manager) == 0
+    [loaded] = data_manager.load_data(Task, 'task')
+    assert loaded.status == "complete"
+
+def test_deleted_records_are_removed_on_flush(data_manager):
+    keep, drop = (Task(title=t, description="", due_date="") for t in ("Keep", "Drop"))
+    data_manager.save_data([keep, drop], 'task')
+    tracker = ChangeTracker()
+    drop.status = "complete"
+    tracker.mark(drop, 'task')
+    tracker.mark_deleted(drop.id, 'task') # the delete replaces the unsaved edit
+
+    assert tracker.flush(data_manager) == 1
+    assert [t.title for t in data_manager.load_data(Task, 'task')] == ["Keep"]
+
+def test_failed_flush_keeps_records_dirty(data_manager):
+    tracker = ChangeTracker()
+    tracker.mark(Task(title="T", description="", due_date=""), 'task')
+    with patch.object(data_manager, 'append_records', side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            tracker.flush(data_manager)
+    assert tracker.is_dirty('task')
+
+def test_concurrent_flushes_journal_the_latest_version_last(data_manager):
+    """A flush that is slow to write can't land an older version after a newer one."""
+    first_taken = threading.Event()
+
+    class SlowDataManager(DataManager):
+        written = []
+
+        def append_records(self, data, file_type, durable=False):
+            records = [d.to_dict() for d in data] # serialized now, written below
+            if not first_taken.is_set():
+                first_taken.set()
+                time.sleep(0.2)
+            self.written.extend(records)
+
+    dm = SlowDataManager(data_dir=data_manager.data_dir)
+    tracker = ChangeTracker()
+    task = Task(title="T", description="", due_date="2025-01-01")
+    tracker.mark(task, 'task')
+    slow = threading.Thread(target=tracker.flush, args=(dm,))
+    slow.start()
+    first_taken.wait(1)
+
+    task.status = "complete"
+    tracker.mark(task, 'task')
+    tracker.flush(dm)
+    slow.join()
+    assert [r['status'] for r in dm.written] == ["pending", "complete"]
+
+def test_autosaver_flushes_after_edits_settle(data_manager):
+    tracker = ChangeTracker()
+    saver = AutoSaver(tracker, data_manager, interval=0.05)
+    saver.start()
+    for i in range(3):
+        tracker.mark(Task(title=f"T{i}", description="", due_date=""), 'task')
+
+    deadline = time.monotonic() + 2
+    while tracker.is_dirty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    saver.stop()
+
+    assert saver.flushes == 1
+    assert len(data_manager.load_data(Task, 'task')) == 3
+
+# --- Manager Tests ---
+
+def test_save_and_exit_only_writes_changes(tmp_path):
+    """Completing one task appends one record instead of rewriting every collection."""
+    dm = CountingDataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([Task(title=f"T{i}", description="", due_date="") for i in range(50)], 'task')
+    snapshot_mtime = os.stat(dm.task_path).st_mtime_ns
+
+    manager = PKMSTaskManager(data_manager=dm, autosave_interval=0.5)
+    target = manager.tasks[7]
+    with patch('builtins.input', return_value=target.id):
+        manager.complete_task()
+    assert dm.appended == [] # held back by the autosaver
+    with pytest.raises(SystemExit):
+        manager.save_and_exit()
+
+    assert dm.appended == [('task', 1, True)]
+    assert os.stat(dm.task_path).st_mtime_ns == snapshot_mtime
+    reloaded = {t.id: t for t in DataManager(data_dir=dm.data_dir).load_data(Task, 'task')}
+    assert reloaded[target.id].status == "complete"
+    assert len(reloaded) == 50
@@ -0,0 +1,138 @@
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from src.models import KnowledgeEntry, Link, Task
+from src.data_manager import DataManager
+from src.client import DaemonError, PKMSClient, main as client_main
+from src.daemon import PKMSService, make_server
+from src.__main__ import PKMSTaskManager
+
+# --- Fixtures ---
+
+@pytest.fixture
+def service(data_manager):
+    service = PKMSService(PKMSTaskManager(data_manager=data_manager, autosave_interval=60))
+    service.warm_up()
+    yield service
+    if not service.closed:
+        service.close()
+
+def call(service, op, **args):
+    response = service.handle({'op': op, 'args': args})
+    if not response['ok']:
+        raise DaemonError(response['error'])
+    return response['result']
+
+# --- Service Tests ---
+
+def test_edits_are_served_from_memory_and_saved_on_close(service, data_manager):
+    note = call(service, 'add_note', title="Budget", content="Quarterly budget review", tags=["work"])
+    task = call(service, 'add_task', title="Slides", due_date="2025-06-01", link=note['id'][:6])
+    call(service, 'add_task', title="Book room")
+    assert task['knowledge_link_id'] == note['id']
+    assert [t['title'] for t in call(service, 'tasks')] == ["Slides", "Book room"]
+    assert call(service, 'search', query="Budget")['results'][0]['id'] == note['id']
+
+    call(service, 'done', id=task['id'][:8])
+    assert [t['title'] for t in call(service, 'tasks', status="complete")] == ["Slides"]
+    assert data_manager.load_data(Task, 'task') == [] # written behind, not yet
+
+    assert service.close() == 3
+    tasks = {t.title: t for t in data_manager.load_data(Task, 'task')}
+    assert tasks["Slides"].status == "complete"
+    assert [e.title for e in data_manager.load_data(KnowledgeEntry, 'pkm')] == ["Budget"]
+    assert service.handle({'op': 'ping'})['error'] == "the daemon is shutting down"
+
+def test_delete_removes_the_task_and_its_links(service, data_manager):
+    keep = call(service, 'add_task', title="Keep")
+    drop = call(service, 'add_task', title="Drop")
+    call(service, 'link', source=drop['id'], target=keep['id'])
+    call(service, 'delete', id=drop['id'][:8])
+    assert service.manager.link_graph.sources(keep['id']) == []
+    service.close()
+
+    assert [t.title for t in data_manager.load_data(Task, 'task')] == ["Keep"]
+    assert data_manager.load_data(Link, 'link') == []
+
+def test_bad_requests_get_error_responses(service):
+    call(service, 'add_schedule', title="Standup", day="mon", start_time="09:00", end_time="09:15")
+    with pytest.raises(DaemonError, match="overlaps with Monday 09:00 - 09:15 Standup"):
+        call(service, 'add_schedule', title="Clash", day="Monday", start_time="09:10", end_time="09:30")
+    with pytest.raises(DaemonError, match="no pending task matches 'nope'"):
+        call(service, 'done', id="nope")
+    with pytest.raises(DaemonError, match="unexpected keyword"):
+        call(service, 'add_task', name="Missing title")
+    assert not service.handle({'op': 'drop_tables'})['ok']
+    assert not service.handle(["not", "an", "object"])['ok']
+    with pytest.raises(DaemonError, match="'tags' must be a list of strings"):
+        call(service, 'add_note', title="Tagged", tags="work")
+    with pytest.raises(DaemonError, match="'tags' must be a list of strings"):
+        call(service, 'add_note', title="Tagged", tags=["work", 1])
+
+# --- Socket Tests ---
+
+def test_client_round_trip_over_the_socket(service):
+    server = make_server(service, port=0, token="secret")
+    serving = threading.Thread(target=server.serve_forever)
+    serving.start()
+    try:
+        with PKMSClient(port=server.server_address[1], token="secret") as client:
+            task = client.call('add_task', title="Over the wire")
+            with pytest.raises(DaemonError):
+                client.call('done', id="missing")
+            assert client.call('tasks')[0]['id'] == task['id'] # the connection survives errors
+            client.call('shutdown')
+        serving.join(timeout=5)
+        assert not serving.is_alive()
+    finally:
+        server.server_close()
+
+def test_client_runs_in_process_without_a_daemon(tmp_path, capsys):
+    data_dir = str(tmp_path / '.data')
+    assert client_main(["--data-dir", data_dir, "add-task", "Offline", "--due", "2025-01-01"]) == 0
+    assert "Task 'Offline' added" in capsys.readouterr().out
+    assert [t.title for t in DataManager(data_dir=data_dir).load_data(Task, 'task')] == ["Offline"]
+    assert client_main(["--data-dir", data_dir, "ping"]) == 1
+
+@pytest.mark.parametrize("error", [PermissionError(13, "Permission denied"), ConnectionResetError(104, "reset"),
+                                   TimeoutError("timed out")])
+def test_client_reports_connection_errors_instead_of_running_locally(tmp_path, capsys, monkeypatch, error):
+    """Only a missing or refusing daemon falls back to in-process; other errors are shown."""
+    def fail(*args, **kwargs):
+        raise error
+    monkeypatch.setattr('src.client.PKMSClient', fail)
+    data_dir = tmp_path / '.data'
+    assert client_main(["--data-dir", str(data_dir), "add-task", "Twice?"]) == 1
+    assert capsys.readouterr().out.startswith("Error: ")
+    assert not data_dir.exists()
+
+def test_tcp_connections_need_the_token(service):
+    with pytest.raises(ValueError):
+        make_server(service, port=0)
+    server = make_server(service, port=0, token="secret")
+    serving = threading.Thread(target=server.serve_forever)
+    serving.start()
+    try:
+        for token in (None, "guess"):
+            with pytest.raises(DaemonError, match="missing or wrong token"):
+                PKMSClient(port=server.server_address[1], token=token)
+    finally:
+        server.shutdown()
+        server.server_close()
+        serving.join()
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix sockets")
+def test_unix_socket_is_created_private(service, tmp_path):
+    old_umask = os.umask(0o022)
+    try:
+        server = make_server(service, socket_path=str(tmp_path / "pkms.sock"))
+    finally:
+        os.umask(old_umask)
+    try:
+        assert stat.S_IMODE(os.stat(tmp_path / "pkms.sock").st_mode) == 0o600
+    finally:
+        server.server_close()
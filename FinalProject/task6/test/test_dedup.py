@@ -0,0 +1,111 @@
+import random
+from unittest.mock import patch
+
+from src.models import KnowledgeEntry, Link, Task
+from src.data_manager import DataManager
+from src.sqlite_store import SQLiteDataManager
+from src.dedup import BANDS, ROWS, cluster_signatures, find_duplicates, main, merge_duplicates, minhash, shingles, similarity
+from src.__main__ import PKMSTaskManager
+
+def article(seed, words=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "release", "python", "notes", "clip",
+                                "web", "page", "draft", "final", "review", "budget", "plan"]) + str(rng.randrange(50))
+                    for _ in range(words))
+
+def edited(text, changes, seed=0):
+    rng = random.Random(seed)
+    words = text.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = "edited"
+    return " ".join(words)
+
+# --- Signature Tests ---
+
+def test_signature_similarity_tracks_jaccard():
+    a, b = shingles(article(1)), shingles(edited(article(1), 10))
+    jaccard = len(a & b) / len(a | b)
+    assert abs(similarity(minhash(a), minhash(b)) - jaccard) < 0.15
+    assert similarity(minhash(a), minhash(shingles(article(2)))) < 0.1
+
+# --- Clustering Tests ---
+
+def test_near_duplicates_cluster_and_distinct_notes_do_not():
+    original = KnowledgeEntry(title="Clip", content=article(1))
+    copies = [KnowledgeEntry(title=f"Clip {i}", content=edited(article(1), 3, seed=i)) for i in range(3)]
+    others = [KnowledgeEntry(title=f"Other {i}", content=article(100 + i)) for i in range(20)]
+    clusters = find_duplicates([original] + others + copies)
+    assert [[e.title for e in c] for c in clusters] == [["Clip", "Clip 0", "Clip 1", "Clip 2"]]
+
+def test_bucket_members_are_compared_pairwise():
+    """Two similar signatures sharing a bucket only with an unrelated first member still pair up."""
+    unrelated = [0] * ROWS + list(range(1000, 1000 + (BANDS - 1) * ROWS))
+    b = [0] * ROWS + list(range((BANDS - 1) * ROWS))
+    # c differs from b in one bin of every other band: 0.88 similar, but no other bucket in common
+    c = list(b)
+    for band in range(1, BANDS):
+        c[band * ROWS] = -1
+    assert similarity(b, c) >= 0.8
+    assert cluster_signatures([unrelated, b, c]) == [[1, 2]]
+    assert cluster_signatures([b, unrelated, b, c, b]) == [[0, 2, 3, 4]]
+
+def test_short_notes_are_never_duplicates():
+    """A line or two has too few shingles to judge; identical short notes stay separate."""
+    notes = [KnowledgeEntry(title="Todo", content="Buy milk") for _ in range(3)]
+    assert find_duplicates(notes) == []
+
+def test_title_is_part_of_the_signature():
+    body = article(1, words=12)
+    a, b = (KnowledgeEntry(title=t, content=body) for t in ("Standup notes for Monday",
+                                                              "Quarterly budget review draft"))
+    assert find_duplicates([a, b], threshold=0.8) == []
+    assert len(find_duplicates([a, KnowledgeEntry(title=a.title, content=body)])) == 1
+
+# --- Merge Tests ---
+
+def test_merge_keeps_oldest_relinks_tasks_and_deletes_copies(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    old = KnowledgeEntry(title="Clip", content=article(1), tags=["web"], created_at="2025-01-01T00:00:00")
+    new = KnowledgeEntry(title="Clip again", content=article(1) + " more", tags=["later"],
+                         created_at="2025-02-01T00:00:00")
+    other = KnowledgeEntry(title="Other", content=article(2))
+    task = Task(title="Read clip", description="", due_date="", knowledge_link_id=new.id)
+    dm.save_data([old, other, new], 'pkm')
+    dm.save_data([task], 'task')
+    dm.save_data([Link(other.id, new.id)], 'link')
+
+    assert merge_duplicates(dm) == (1, 1, 1)
+    entries = dm.load_data(KnowledgeEntry, 'pkm')
+    assert [e.title for e in entries] == ["Clip", "Other"]
+    assert entries[0].content.endswith(" more") and entries[0].tags == ["web", "later"]
+    assert dm.load_data(Task, 'task')[0].knowledge_link_id == old.id
+    assert [(l.source_id, l.target_id) for l in dm.load_data(Link, 'link')] == [(other.id, old.id)]
+
+    dm.compact('pkm')
+    assert [e.id for e in dm.load_data(KnowledgeEntry, 'pkm')] == [old.id, other.id]
+
+def test_main_merges_in_the_store_the_app_uses(tmp_path, monkeypatch):
+    data_dir = str(tmp_path / '.data')
+    store = SQLiteDataManager(data_dir=data_dir)
+    store.save_data([KnowledgeEntry(title="Clip", content=article(1)) for _ in range(2)], 'pkm')
+    store.close()
+    monkeypatch.setenv('PKMS_STORAGE', 'sqlite')
+    assert main(['--data-dir', data_dir, '--merge']) == 0
+
+    store = SQLiteDataManager(data_dir=data_dir)
+    assert store.count('pkm') == 1
+    store.close()
+
+def test_agent_cycle_shares_summaries_only_between_exact_copies(tmp_path):
+    """Exact copies share one call; near-duplicates are summarized on their own."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    copies = [KnowledgeEntry(title="Clip", content=article(1)) for _ in range(2)]
+    near = [KnowledgeEntry(title=f"Clip {i}", content=edited(article(1), 2, seed=i)) for i in range(2)]
+    dm.save_data(copies + near, 'pkm')
+    manager = PKMSTaskManager(data_manager=dm)
+    with patch.object(manager.llm_agent, 'summarize_entry', wraps=manager.llm_agent.summarize_entry) as summarize:
+        manager.run_agent_cycle()
+    assert summarize.call_count == 3
+    loaded = dm.load_data(KnowledgeEntry, 'pkm')
+    assert all(e.is_summarized for e in loaded)
+    assert loaded[0].summary == loaded[1].summary
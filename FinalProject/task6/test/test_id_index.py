@@ -0,0 +1,55 @@
+import pytest
+
+from src.models import Task
+from src.id_index import IDIndex, AmbiguousPrefixError
+
+# --- Fixtures ---
+
+def make_task(task_id: str, status: str = "pending") -> Task:
+    return Task(title=task_id, description="", due_date="2025-01-01", id=task_id, status=status)
+
+@pytest.fixture
+def index():
+    return IDIndex([make_task("abc123"), make_task("abd456"), make_task("ff0000", status="complete")])
+
+# --- ID Index Tests ---
+
+def test_exact_and_unique_prefix_lookup(index):
+    assert index.get("abc123").id == "abc123"
+    assert index.resolve("abd").id == "abd456"
+    assert index.resolve("zz") is None
+
+def test_ambiguous_prefix_is_reported(index):
+    """A prefix shared by several records raises instead of picking the first."""
+    with pytest.raises(AmbiguousPrefixError) as excinfo:
+        index.resolve("ab")
+    assert excinfo.value.matches == ["abc123", "abd456"]
+
+def test_predicate_narrows_matches(index):
+    index.add(make_task("ff0011"))
+    assert index.resolve("ff", lambda t: t.status == "pending").id == "ff0011"
+
+def test_exact_id_wins_over_longer_ids():
+    index = IDIndex([make_task("abc"), make_task("abcdef")])
+    assert index.resolve("abc").id == "abc"
+
+def test_add_and_remove_keep_prefix_order(index):
+    index.add(make_task("abb000"))
+    assert [t.id for t in index.matches("ab")] == ["abb000", "abc123", "abd456"]
+    index.remove("abc123")
+    assert [t.id for t in index.matches("ab")] == ["abb000", "abd456"]
+    assert "abc123" not in index
+
+def test_complete_task_rejects_ambiguous_prefix(tmp_path, monkeypatch, capsys):
+    """The CLI reports the ambiguity and leaves both tasks pending."""
+    from src.data_manager import DataManager
+    from src.__main__ import PKMSTaskManager
+
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([make_task("abc123"), make_task("abd456")], 'task')
+    manager = PKMSTaskManager(data_manager=dm)
+
+    monkeypatch.setattr('builtins.input', lambda _: "ab")
+    manager.complete_task()
+    assert "matches 2 pending tasks" in capsys.readouterr().out
+    assert all(t.status == "pending" for t in manager.tasks)
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager
+from src.__main__ import PKMSTaskManager
+from src.startup_report import import_breakdown
+
+def test_init_defers_loading_and_llm_client(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([Task(title="T", description="", due_date="")], 'task')
+    with patch.object(dm, 'load_data', wraps=dm.load_data) as load_data:
+        manager = PKMSTaskManager(data_manager=dm)
+        assert load_data.call_count == 0
+        assert 'llm_agent' not in vars(manager)
+
+        assert len(manager.tasks) == 1
+        assert load_data.call_count == 1
+        assert set(manager.load_times) == {'tasks'}
+
+def test_note_added_before_loading_is_searchable(tmp_path):
+    """A note added while knowledge is unloaded shows up once it loads, even if not yet flushed."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    manager = PKMSTaskManager(data_manager=dm, autosave_interval=60)
+    with patch('builtins.input', side_effect=["Packaging", "Use uv", "python"]):
+        manager.add_knowledge_entry()
+    assert 'knowledge' not in vars(manager)
+
+    assert [e.title for e in manager.knowledge] == ["Packaging"]
+    assert [e.title for e in manager.search_index.search("uv")] == ["Packaging"]
+    manager.autosaver.stop()
+
+def test_import_breakdown_lists_direct_imports():
+    total, slowest = import_breakdown("src.search")
+    assert total > 0
+    assert "src.models" in {name for _, name in slowest}
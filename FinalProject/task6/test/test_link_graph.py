@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.models import KnowledgeEntry, Link, Task
+from src.data_manager import DataManager
+from src.sqlite_store import SQLiteDataManager
+from src.link_graph import LinkGraph
+from src.__main__ import PKMSTaskManager
+
+# --- Graph Tests ---
+
+def test_primary_and_explicit_links_share_an_edge():
+    task = Task(title="T", description="", due_date="", knowledge_link_id="note-a")
+    graph = LinkGraph([Link("T-id", "x")], [task])
+    graph.add_link(Link(task.id, "note-a"))
+    graph.add_link(Link(task.id, "note-a")) # filing twice changes nothing
+    assert graph.targets(task.id) == ["note-a"]
+    assert graph.sources("note-a") == [task.id]
+
+    task.knowledge_link_id = "note-b"
+    graph.update_task(task)
+    assert graph.targets(task.id) == ["note-a", "note-b"] # the explicit link survives
+    graph.remove_link(Link(task.id, "note-a"))
+    assert graph.targets(task.id) == ["note-b"]
+    assert graph.sources("note-a") == []
+
+def test_neighborhood_walks_both_directions_by_distance():
+    graph = LinkGraph([Link("t1", "n1"), Link("t2", "n1"), Link("t2", "n2"), Link("n2", "n3")])
+    assert graph.neighborhood("t1", hops=1) == {"n1": 1}
+    assert graph.neighborhood("t1", hops=3) == {"n1": 1, "t2": 2, "n2": 3}
+    assert len(graph.neighborhood("t1", hops=5, limit=2)) == 2
+
+    graph.remove_node("n1")
+    assert graph.neighborhood("t1") == {}
+    assert graph.targets("t2") == ["n2"]
+
+# --- Manager Tests ---
+
+@pytest.fixture(params=["json", "sqlite"])
+def data_manager(request, tmp_path):
+    if request.param == "sqlite":
+        dm = SQLiteDataManager(data_dir=str(tmp_path / '.data'))
+        yield dm
+        dm.close()
+    else:
+        yield DataManager(data_dir=str(tmp_path / '.data'))
+
+def test_links_added_from_the_menu_persist_in_both_directions(data_manager):
+    note = KnowledgeEntry(title="Design doc", content="Body")
+    other = KnowledgeEntry(title="Spec", content="Body")
+    task = Task(title="Build it", description="", due_date="", knowledge_link_id=note.id)
+    data_manager.save_data([note, other], 'pkm')
+    data_manager.save_data([task], 'task')
+
+    manager = PKMSTaskManager(data_manager=data_manager)
+    with patch('builtins.input', side_effect=[task.id[:8], other.id[:8]]):
+        manager.show_links()
+
+    graph = PKMSTaskManager(data_manager=data_manager).link_graph
+    assert graph.targets(task.id) == [note.id, other.id]
+    assert graph.sources(other.id) == [task.id]
+
+def test_prioritization_context_follows_links_two_hops_out(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    note = KnowledgeEntry(title="Launch plan", content="Plan body", summary="Launch summary", is_summarized=True)
+    task = Task(title="Write copy", description="", due_date="", knowledge_link_id=note.id)
+    sibling = Task(title="Book venue", description="", due_date="", knowledge_link_id=note.id)
+    dm.save_data([note], 'pkm')
+    dm.save_data([task, sibling], 'task')
+
+    context = PKMSTaskManager(data_manager=dm)._task_context(task)
+    assert context == "Launch summary\n\nRelated: task 'Book venue'"
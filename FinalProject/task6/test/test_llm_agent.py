@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager
+from src.__main__ import PKMSTaskManager
+from src.llm_agent import LLMAgent, TokenBucket
+from src.llm_cache import LLMCache
+from src.metrics import metrics
+
+# --- Fixtures ---
+
+class StandInLLM:
+    """Local OpenAI-compatible server that sleeps before answering and tracks concurrency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.payload = None # raw body to answer with instead of echoing the title
+        self._lock = threading.Lock()
+
+    def handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stand_in._lock:
+                    stand_in.requests += 1
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(stand_in.max_in_flight, stand_in.in_flight)
+                time.sleep(stand_in.latency)
+                with stand_in._lock:
+                    stand_in.in_flight -= 1
+                # Echo the title line back so callers can check result order
+                title = body['messages'][1]['content'].split('\n')[1]
+                payload = stand_in.payload or json.dumps({'choices': [{'message': {'content': f" {title} "}}]}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+@pytest.fixture
+def llm_server():
+    stand_in = StandInLLM(latency=0.05)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stand_in.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stand_in.url = f"http://127.0.0.1:{server.server_port}/v1"
+    yield stand_in
+    server.shutdown()
+    server.server_close()
+
+# --- Concurrency Tests ---
+
+def test_summaries_run_concurrently_and_keep_input_order(llm_server):
+    """Calls overlap up to max_in_flight and results line up with their entries."""
+    agent = LLMAgent(base_url=llm_server.url, max_in_flight=4)
+    entries = [KnowledgeEntry(title=f"Note {i}", content="Body") for i in range(12)]
+
+    start = time.perf_counter()
+    summaries = agent.summarize_entries(entries)
+    elapsed = time.perf_counter() - start
+
+    assert summaries == [f"Title: Note {i}" for i in range(12)]
+    assert llm_server.max_in_flight == 4
+    assert elapsed < 12 * llm_server.latency
+
+def test_single_in_flight_is_sequential(llm_server):
+    agent = LLMAgent(base_url=llm_server.url, max_in_flight=1)
+    tasks = [(Task(title=f"T{i}", description="", due_date="2025-01-01"), "") for i in range(3)]
+    agent.prioritize_tasks(tasks)
+    assert llm_server.requests == 3
+    assert llm_server.max_in_flight == 1
+
+def test_unreachable_endpoint_returns_none():
+    """Network failures return None instead of raising or inventing a result."""
+    agent = LLMAgent(base_url="http://127.0.0.1:9", timeout=1)
+    task = Task(title="T", description="", due_date="2025-01-01")
+    assert agent.prioritize_task(task, "") is None
+    assert agent.summarize_entry(KnowledgeEntry(title="N", content="")) is None
+
+def test_malformed_responses_count_as_failed_calls(llm_server):
+    """Empty choices, a non-object body or non-text content return None and are counted as errors."""
+    def errors():
+        return sum(c['value'] for c in metrics.snapshot()['counters'] if c['name'] == "pkms_llm_errors_total")
+
+    agent = LLMAgent(base_url=llm_server.url)
+    task = Task(title="T", description="", due_date="2025-01-01")
+    before = errors()
+    for payload in ({'choices': []}, ["not", "an", "object"], {'choices': [{'message': {'content': None}}]}):
+        llm_server.payload = json.dumps(payload).encode()
+        assert agent.summarize_entry(KnowledgeEntry(title="N", content="")) is None
+        assert agent.prioritize_task(task, "") is None
+    assert errors() == before + 6
+    assert agent.calls == 0
+
+def test_token_bucket_limits_rate():
+    """After the initial burst, tokens are handed out at the configured rate."""
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.perf_counter()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 5 / 50 * 0.9
+
+# --- Cache Tests ---
+
+@pytest.fixture
+def cache(tmp_path):
+    llm_cache = LLMCache(str(tmp_path / '.data' / 'llm_cache.db'))
+    yield llm_cache
+    llm_cache.close()
+
+def test_duplicate_prompts_hit_the_cache(llm_server, cache):
+    """Identical entries (e.g. a re-import) only reach the model once."""
+    agent = LLMAgent(base_url=llm_server.url, cache=cache)
+    original = KnowledgeEntry(title="Note", content="Body")
+    duplicate = KnowledgeEntry(title="Note", content="Body")
+
+    assert agent.summarize_entry(original) == agent.summarize_entry(duplicate)
+    assert llm_server.requests == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_cache_key_includes_model(llm_server, cache):
+    """Switching models does not reuse another model's answers."""
+    entry = KnowledgeEntry(title="Note", content="Body")
+    LLMAgent(base_url=llm_server.url, model="a", cache=cache).summarize_entry(entry)
+    LLMAgent(base_url=llm_server.url, model="b", cache=cache).summarize_entry(entry)
+    assert llm_server.requests == 2
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'llm_cache.db')
+    first = LLMCache(path)
+    first.put("k", "v")
+    first.close()
+    second = LLMCache(path)
+    assert second.get("k") == "v"
+    second.close()
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Past the byte budget, the entry used longest ago goes first."""
+    small = LLMCache(str(tmp_path / 'llm_cache.db'), max_bytes=10)
+    small.put("a", "xxxx")
+    small.put("b", "xxxx")
+    assert small.get("a") == "xxxx"
+    small.put("c", "xxxx")
+    assert small.get("b") is None
+    assert small.get("a") == "xxxx" and small.get("c") == "xxxx"
+    assert small.stats()['evictions'] == 1
+    small.close()
+
+# --- Agent Cycle Checkpoint Tests ---
+
+def test_budgeted_cycle_resumes_where_it_stopped(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([KnowledgeEntry(title=f"Note {i}", content=f"Topic {i} " * (i + 1)) for i in range(5)], 'pkm')
+    dm.save_data([Task(title="Ship", description="urgent deadline", due_date="")], 'task')
+
+    PKMSTaskManager(data_manager=dm).run_agent_cycle(max_calls=3, batch_size=2)
+    done = [e.title for e in dm.load_data(KnowledgeEntry, 'pkm') if e.is_summarized]
+    assert done == ["Note 0", "Note 1", "Note 2"]
+    assert not dm.load_data(Task, 'task')[0].is_prioritized
+
+    manager = PKMSTaskManager(data_manager=dm)
+    manager.run_agent_cycle()
+    assert manager.llm_agent.calls == 3 # two notes and one task left
+    assert all(e.is_summarized for e in dm.load_data(KnowledgeEntry, 'pkm'))
+    assert dm.load_data(Task, 'task')[0].priority == "high"
+
+def test_interrupted_cycle_keeps_committed_batches(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([KnowledgeEntry(title=f"Note {i}", content=f"Topic {i} " * (i + 1)) for i in range(4)], 'pkm')
+    manager = PKMSTaskManager(data_manager=dm)
+    real = manager.llm_agent.summarize_entries
+    batches = iter([None, KeyboardInterrupt()]) # the second batch is interrupted
+
+    def flaky(entries, budget=None):
+        error = next(batches)
+        if error:
+            raise error
+        return real(entries, budget)
+
+    with patch.object(manager.llm_agent, 'summarize_entries', side_effect=flaky):
+        with pytest.raises(KeyboardInterrupt):
+            manager.run_agent_cycle(batch_size=2)
+    assert [e.title for e in dm.load_data(KnowledgeEntry, 'pkm') if e.is_summarized] == ["Note 0", "Note 1"]
+
+def test_failed_calls_leave_records_unflagged(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([KnowledgeEntry(title=f"Note {i}", content="Body") for i in range(3)], 'pkm')
+    dm.save_data([Task(title="Ship", description="", due_date="")], 'task')
+    manager = PKMSTaskManager(data_manager=dm)
+    manager.llm_agent.base_url = "http://127.0.0.1:9"
+    manager.llm_agent.timeout = 1
+    manager.run_agent_cycle()
+
+    assert not any(e.is_summarized or e.summary for e in dm.load_data(KnowledgeEntry, 'pkm'))
+    assert not dm.load_data(Task, 'task')[0].is_prioritized
+
+def test_time_budget_is_checked_before_each_call(tmp_path):
+    """A batch stops at max_seconds instead of finishing every call in it."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([KnowledgeEntry(title=f"Note {i}", content="Body") for i in range(10)], 'pkm')
+    manager = PKMSTaskManager(data_manager=dm)
+    real = manager.llm_agent.summarize_entry
+
+    def slow(entry):
+        time.sleep(0.05)
+        return real(entry)
+
+    with patch.object(manager.llm_agent, 'summarize_entry', side_effect=slow):
+        manager.run_agent_cycle(max_seconds=0.12, batch_size=10)
+    summarized = [e.title for e in dm.load_data(KnowledgeEntry, 'pkm') if e.is_summarized]
+    assert summarized == [f"Note {i}" for i in range(len(summarized))]
+    assert 1 <= len(summarized) <= 4
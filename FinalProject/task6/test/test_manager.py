@@ -1 +1,237 @@
+import json
+import os
+import threading
 
+import pytest
+
+from src.models import KnowledgeEntry, Link, Task
+from src.data_manager import DataManager, JOURNAL_SUFFIX
+from src.binary_snapshot import BINARY_SUFFIX, MAGIC, read_snapshot, verify_snapshot
+
+# --- DataManager Journal Tests ---
+
+def test_append_record_writes_journal_not_snapshot(data_manager):
+    """Appending a record only touches the journal file."""
+    entry = KnowledgeEntry(title="Note", content="Body")
+    data_manager.append_record(entry, 'pkm')
+
+    assert not os.path.exists(data_manager.pkm_path)
+    with open(data_manager.pkm_path + JOURNAL_SUFFIX, encoding='utf-8') as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['record']['id'] == entry.id
+
+def test_load_data_replays_journal_over_snapshot(data_manager):
+    """Updates in the journal replace snapshot records in place."""
+    first = Task(title="First", description="", due_date="2025-01-01")
+    second = Task(title="Second", description="", due_date="2025-01-02")
+    data_manager.save_data([first, second], 'task')
+
+    first.status = "complete"
+    third = Task(title="Third", description="", due_date="2025-01-03")
+    data_manager.append_records([first, third], 'task')
+
+    loaded = data_manager.load_data(Task, 'task')
+    assert [t.title for t in loaded] == ["First", "Second", "Third"]
+    assert loaded[0].status == "complete"
+
+def test_torn_journal_line_is_skipped(data_manager):
+    """A partially written trailing line from a crash does not lose earlier records."""
+    entry = KnowledgeEntry(title="Kept", content="Body")
+    data_manager.append_record(entry, 'pkm')
+    with open(data_manager.pkm_path + JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "rec')
+
+    loaded = data_manager.load_data(KnowledgeEntry, 'pkm')
+    assert [e.title for e in loaded] == ["Kept"]
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    """Crossing the threshold compacts the journal in the background."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'), compact_threshold=3)
+    entries = [KnowledgeEntry(title=f"Note {i}", content="Body") for i in range(3)]
+    for entry in entries:
+        dm.append_record(entry, 'pkm')
+    dm.wait_for_compaction()
+
+    assert not os.path.exists(dm.pkm_path + JOURNAL_SUFFIX)
+    with open(dm.pkm_path, encoding='utf-8') as f:
+        assert [d['title'] for d in json.load(f)] == ["Note 0", "Note 1", "Note 2"]
+    assert len(DataManager(data_dir=dm.data_dir).load_data(KnowledgeEntry, 'pkm')) == 3
+
+@pytest.mark.parametrize("binary_snapshots", [False, True])
+def test_loads_during_compaction_see_every_appended_record(tmp_path, binary_snapshots):
+    """A load racing a journal rotation never misses records appended before it started."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'), compact_threshold=5,
+                     binary_snapshots=binary_snapshots)
+    appended = []
+    done = threading.Event()
+
+    def writer():
+        for i in range(300):
+            entry = KnowledgeEntry(title=f"Note {i}", content="Body")
+            dm.append_record(entry, 'pkm')
+            appended.append(entry.id)
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        while not done.is_set():
+            expected = list(appended)
+            loaded = {e.id for e in dm.load_data(KnowledgeEntry, 'pkm')}
+            assert not set(expected) - loaded
+            streamed = {e.id for e in dm.iter_data(KnowledgeEntry, 'pkm')}
+            assert not set(expected) - streamed
+    finally:
+        thread.join()
+    dm.wait_for_compaction()
+    assert len(dm.load_data(KnowledgeEntry, 'pkm')) == 300
+
+# --- Crash Safety Tests ---
+
+def test_failed_save_leaves_previous_snapshot(data_manager):
+    """An error mid-write keeps the old snapshot intact and removes the temp file."""
+    original = [Task(title="Keep", description="", due_date="2025-01-01")]
+    data_manager.save_data(original, 'task')
+
+    def broken_records():
+        yield Task(title="New", description="", due_date="2025-01-02").to_dict()
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        data_manager._save_file(data_manager.task_path, broken_records())
+    assert [t.title for t in data_manager.load_data(Task, 'task')] == ["Keep"]
+    assert not os.path.exists(data_manager.task_path + ".tmp")
+
+def test_concurrent_durable_appends_share_fsyncs(tmp_path):
+    """Group commit: many durable appends, far fewer fsyncs, nothing lost."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'), compact_threshold=10**6,
+                     group_commit_window=0.005)
+
+    def writer(n):
+        for i in range(20):
+            dm.append_record(Task(title=f"{n}-{i}", description="", due_date=""), 'task')
+            dm.append_records([Task(title=f"{n}-{i}-d", description="", due_date="")], 'task', durable=True)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(dm.load_data(Task, 'task')) == 8 * 20 * 2
+    assert 0 < dm.fsync_count < 8 * 20
+    assert dm.sync() == dm._write_seq
+
+# --- Streaming Loader Tests ---
+
+def test_save_file_matches_json_dump_layout(data_manager):
+    """The streaming writer produces the same bytes as json.dump(indent=4)."""
+    records = [{'id': '1', 'title': 'A\n]', 'tags': ['x', 'y']}, {'id': '2', 'nested': {'k': None}}]
+    data_manager._save_file(data_manager.task_path, records)
+    with open(data_manager.task_path, encoding='utf-8') as f:
+        assert f.read() == json.dumps(records, indent=4)
+
+def test_iter_data_streams_across_small_chunks(data_manager, monkeypatch):
+    """Elements spanning read-chunk boundaries are reassembled correctly."""
+    monkeypatch.setattr('src.data_manager.READ_CHUNK_SIZE', 16)
+    entries = [KnowledgeEntry(title=f"Note {i}", content="x" * (i * 10)) for i in range(20)]
+    data_manager.save_data(entries, 'pkm')
+
+    streamed = data_manager.iter_data(KnowledgeEntry, 'pkm')
+    assert next(streamed).title == "Note 0"
+    assert [e.title for e in streamed] == [f"Note {i}" for i in range(1, 20)]
+
+def test_truncated_snapshot_keeps_complete_records(data_manager):
+    """A snapshot cut off mid-element still yields the records before the cut."""
+    with open(data_manager.pkm_path, 'w', encoding='utf-8') as f:
+        f.write('[{"id": "1", "title": "Kept", "content": ""}, {"id": "2", "tit')
+    assert [e.title for e in data_manager.load_data(KnowledgeEntry, 'pkm')] == ["Kept"]
+
+# --- Binary Snapshot Tests ---
+
+def test_binary_snapshot_loads_same_records_as_json(tmp_path):
+    """The .bin companion yields the same records, journal included, as the JSON."""
+    binary = DataManager(data_dir=str(tmp_path / '.data'))
+    tasks = [Task(title=f"Task {i}", description="", due_date="2025-01-01") for i in range(5)]
+    binary.save_data(tasks, 'task')
+    assert os.path.exists(binary.task_path + BINARY_SUFFIX)
+
+    tasks[1].status = "complete"
+    binary.append_records([tasks[1], Task(title="New", description="", due_date="")], 'task')
+    with open(binary.task_path + JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'op': 'delete', 'id': tasks[3].id}) + "\n")
+
+    json_only = DataManager(data_dir=str(tmp_path / '.data'), binary_snapshots=False)
+    expected = [t.to_dict() for t in json_only.load_data(Task, 'task')]
+    loaded = binary.load_data(Task, 'task')
+    assert [t.to_dict() for t in loaded] == expected
+    assert len(loaded) == 5 and loaded[0].status == "pending"
+
+def test_stale_binary_snapshot_is_ignored(data_manager):
+    """Editing the JSON by hand makes the .bin stale, so the JSON is read."""
+    data_manager.save_data([KnowledgeEntry(title="Old", content="Body")], 'pkm')
+    assert verify_snapshot(data_manager.pkm_path)
+    with open(data_manager.pkm_path, 'w', encoding='utf-8') as f:
+        json.dump([{'id': '1', 'title': 'Edited', 'content': ''}], f)
+
+    assert not verify_snapshot(data_manager.pkm_path)
+    assert [e.title for e in data_manager.load_data(KnowledgeEntry, 'pkm')] == ["Edited"]
+
+def test_binary_snapshot_checks_content_not_just_size_and_mtime(data_manager):
+    """A same-size edit with the old mtime restored is still caught by the hash."""
+    data_manager.save_data([KnowledgeEntry(title="Old", content="Body", id="1")], 'pkm')
+    stat = os.stat(data_manager.pkm_path)
+    with open(data_manager.pkm_path, encoding='utf-8') as f:
+        text = f.read()
+    with open(data_manager.pkm_path, 'w', encoding='utf-8') as f:
+        f.write(text.replace('"Old"', '"New"'))
+    os.utime(data_manager.pkm_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert [e.title for e in data_manager.load_data(KnowledgeEntry, 'pkm')] == ["New"]
+
+def test_binary_snapshot_from_another_python_is_ignored(data_manager, monkeypatch):
+    data_manager.save_data([KnowledgeEntry(title="Note", content="Body")], 'pkm')
+    assert read_snapshot(data_manager.pkm_path) is not None
+    monkeypatch.setattr('src.binary_snapshot._python_version', lambda: (2, 7, 2))
+    assert read_snapshot(data_manager.pkm_path) is None
+
+def test_binary_snapshot_objects_get_model_defaults(data_manager):
+    """Records written without optional fields load with from_dict's defaults."""
+    data_manager._save_file(data_manager.task_path, [
+        {'id': str(i), 'title': f"Task {i}", 'description': "", 'due_date': ""} for i in range(3)])
+    assert read_snapshot(data_manager.task_path) is not None
+
+    loaded = data_manager.load_data(Task, 'task')
+    assert [(t.status, t.priority, t.is_prioritized) for t in loaded] == [("pending", "medium", False)] * 3
+
+def test_binary_snapshot_is_written_in_chunks(data_manager, monkeypatch):
+    """Records spanning several chunks load in order, interned, with derived Link ids."""
+    monkeypatch.setattr('src.binary_snapshot.CHUNK_ROWS', 2)
+    tasks = [Task(title=f"Task {i}", description="", due_date="", status=''.join(['compl', 'ete']))
+             for i in range(5)]
+    links = [Link(f"a{i}", f"b{i}") for i in range(3)]
+    data_manager.save_data(tasks, 'task')
+    data_manager.save_data(links, 'link')
+    assert read_snapshot(data_manager.task_path) is not None
+
+    loaded = data_manager.load_data(Task, 'task')
+    assert [t.to_dict() for t in loaded] == [t.to_dict() for t in tasks]
+    assert loaded[0].status is loaded[4].status
+    assert [l.id for l in data_manager.load_data(Link, 'link')] == [l.id for l in links]
+
+def test_unusable_binary_snapshots_fall_back_to_json(data_manager):
+    """Mixed record shapes write no .bin; an unreadable one is ignored."""
+    data_manager.save_data([Task(title="T", description="", due_date="")], 'task')
+    data_manager._save_file(data_manager.task_path, [{'id': '1', 'title': 'A', 'description': '', 'due_date': ''},
+                                                     {'id': '2', 'title': 'B', 'description': '', 'due_date': '',
+                                                      'status': 'complete'}])
+    assert not os.path.exists(data_manager.task_path + BINARY_SUFFIX)
+    assert not os.path.exists(data_manager.task_path + BINARY_SUFFIX + ".tmp")
+    assert [t.status for t in data_manager.load_data(Task, 'task')] == ["pending", "complete"]
+
+    with open(data_manager.task_path + BINARY_SUFFIX, 'wb') as f:
+        f.write(MAGIC + b"truncated")
+    assert read_snapshot(data_manager.task_path) is None
+    assert not verify_snapshot(data_manager.task_path)
+    assert len(data_manager.load_data(Task, 'task')) == 2
@@ -0,0 +1,78 @@
+import json
+import random
+
+import pytest
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager
+from src.llm_agent import LLMAgent
+from src.llm_cache import LLMCache
+from src.metrics import Metrics, metrics
+from src.__main__ import PKMSTaskManager
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def find(snapshot, name, **labels):
+    kind = 'histograms' if any(h['name'] == name for h in snapshot['histograms']) else 'counters'
+    return next(m for m in snapshot[kind] if m['name'] == name and all(m['labels'].get(k) == v for k, v in labels.items()))
+
+# --- Registry Tests ---
+
+def test_percentiles_are_within_bucket_error():
+    registry = Metrics()
+    rng = random.Random(0)
+    samples = sorted(rng.uniform(0.001, 0.1) for _ in range(10000))
+    for s in samples:
+        registry.observe("op_seconds", s)
+    h = registry.snapshot()['histograms'][0]
+    for key, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+        exact = samples[int(q * len(samples)) - 1]
+        assert abs(h[key] - exact) / exact < 0.1
+    assert h['count'] == 10000
+
+def test_prometheus_and_json_dumps(tmp_path):
+    registry = Metrics()
+    registry.inc("reads_total", 3, file="tasks.json")
+    registry.observe("op_seconds", 0.002, op="search")
+    text = registry.to_prometheus()
+    assert '# TYPE reads_total counter\nreads_total{file="tasks.json"} 3' in text
+    assert 'op_seconds{op="search",quantile="0.99"}' in text
+    assert 'op_seconds_count{op="search"} 1' in text
+
+    registry.dump(str(tmp_path / "metrics.json"))
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data['counters'][0]['value'] == 3
+
+# --- Instrumentation Tests ---
+
+def test_storage_and_operations_are_recorded(tmp_path):
+    # JSON snapshots only, so the bytes read are the bytes written
+    dm = DataManager(data_dir=str(tmp_path / '.data'), binary_snapshots=False)
+    dm.save_data([Task(title="T", description="", due_date="")], 'task')
+    manager = PKMSTaskManager(data_manager=dm)
+    manager.list_tasks()
+    manager.list_tasks()
+
+    snap = metrics.snapshot()
+    assert find(snap, "pkms_operation_seconds", op="list_tasks")['count'] == 2
+    assert find(snap, "pkms_storage_seconds", op="load", file="task")['count'] == 1
+    written = find(snap, "pkms_storage_written_bytes_total", file="tasks.json")['value']
+    read = find(snap, "pkms_storage_read_bytes_total", file="tasks.json")['value']
+    assert written == read == (tmp_path / '.data' / 'tasks.json').stat().st_size
+
+def test_llm_calls_flag_cache_hits(tmp_path):
+    cache = LLMCache(str(tmp_path / 'llm_cache.db'))
+    agent = LLMAgent(cache=cache)
+    entry = KnowledgeEntry(title="Note", content="Body")
+    agent.summarize_entry(entry)
+    agent.summarize_entry(entry)
+    cache.close()
+
+    snap = metrics.snapshot()
+    assert find(snap, "pkms_llm_calls_total", task="summarize", cache="miss")['value'] == 1
+    assert find(snap, "pkms_llm_calls_total", task="summarize", cache="hit")['value'] == 1
+    assert find(snap, "pkms_llm_call_seconds", cache="hit")['count'] == 1
@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from src.models import KnowledgeEntry, Task, Schedule
+from src.data_manager import DataManager
+from src.content_store import ContentRef, ContentStore
+
+# --- Model Layout Tests ---
+
+def test_models_use_slots():
+    """Records carry no per-instance __dict__."""
+    for obj in (KnowledgeEntry(title="t", content="c"),
+                Task(title="t", description="d", due_date="2025-01-01"),
+                Schedule(title="t", day_of_week="Monday", start_time="09:00", end_time="10:00")):
+        assert not hasattr(obj, '__dict__')
+
+def test_repeated_strings_are_interned():
+    """Equal status/priority/tag values share one string object."""
+    a = Task.from_dict({'title': 'a', 'description': '', 'due_date': '', 'status': ''.join(['pen', 'ding'])})
+    b = Task.from_dict({'title': 'b', 'description': '', 'due_date': '', 'status': ''.join(['pend', 'ing'])})
+    assert a.status is b.status
+    x = KnowledgeEntry(title="x", content="", tags=[''.join(['wo', 'rk'])])
+    y = KnowledgeEntry(title="y", content="", tags=[''.join(['w', 'ork'])])
+    assert x.tags[0] is y.tags[0]
+
+def test_to_dict_round_trip_keeps_json_shape():
+    """to_dict returns the same keys the JSON files have always used."""
+    data = {'id': '1', 'title': 'T', 'description': 'D', 'due_date': '2025-01-01', 'status': 'pending',
+            'priority': 'high', 'knowledge_link_id': None, 'created_at': 'now', 'is_prioritized': True}
+    assert Task.from_dict(data).to_dict() == data
+
+# --- Content Store Tests ---
+
+def test_large_bodies_are_stored_out_of_line_and_read_on_access(data_manager):
+    """Snapshots and journals hold [offset, length]; loaded entries read the body when asked."""
+    body = "transcript line\n" * 1000
+    large = KnowledgeEntry(title="Large", content=body)
+    small = KnowledgeEntry(title="Small", content="Short body")
+    data_manager.save_data([large, small], 'pkm')
+    assert isinstance(large._content, ContentRef) # the saved entry let go of its text
+    later = KnowledgeEntry(title="Later", content="é" * 5000)
+    data_manager.append_record(later, 'pkm')
+
+    with open(data_manager.pkm_path, encoding='utf-8') as f:
+        stored = {d['title']: d['content'] for d in json.load(f)}
+    assert stored["Small"] == "Short body" and len(stored["Large"]) == 2
+    assert os.path.getsize(data_manager.content_store.path) == len(body) + len("é".encode()) * 5000
+
+    for binary_snapshots in (True, False):
+        fresh = DataManager(data_dir=data_manager.data_dir, binary_snapshots=binary_snapshots)
+        loaded = {e.title: e for e in fresh.load_data(KnowledgeEntry, 'pkm')}
+        assert isinstance(loaded["Large"]._content, ContentRef)
+        assert loaded["Large"].content == body and loaded["Later"].content == "é" * 5000
+        assert loaded["Large"].preview(15) == "transcript line"
+        assert loaded["Large"].to_dict() == large.to_dict()
+    # Saving the loaded entries again reuses their references
+    fresh.save_data(list(loaded.values()), 'pkm')
+    assert os.path.getsize(data_manager.content_store.path) == len(body) + len("é".encode()) * 5000
+
+def test_stored_body_needs_a_content_store():
+    with pytest.raises(ValueError, match="content store"):
+        KnowledgeEntry.from_dict({'id': '1', 'title': 't', 'content': [0, 10]})
+
+def test_content_store_maps_bodies_appended_after_the_first_read(tmp_path):
+    store = ContentStore(str(tmp_path / "content.dat"))
+    first = store.put("ü" * 5000)
+    assert store.preview(first, 3) == "üüü"
+    second = store.put("second body")
+    assert store.get(second) == "second body" # past the end of the first map
+    assert store.get(first) == "ü" * 5000
+    store.close()
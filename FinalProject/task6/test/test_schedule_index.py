@@ -0,0 +1,77 @@
+import random
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from src.models import Schedule
+from src.data_manager import DataManager
+from src.schedule_index import ScheduleIndex, WEEKDAYS, week_intervals, weekday_number
+from src.__main__ import PKMSTaskManager
+
+def block(day, start, end, title="Block"):
+    return Schedule(title=title, day_of_week=day, start_time=start, end_time=end)
+
+# --- Parsing Tests ---
+
+def test_weekday_names_and_abbreviations():
+    assert weekday_number("monday") == 0
+    assert weekday_number("Sun") == 6
+    with pytest.raises(ValueError):
+        weekday_number("Funday")
+
+def test_overnight_block_wraps_the_week():
+    assert week_intervals(block("Sunday", "23:00", "01:00")) == [(10020, 10080), (0, 60)]
+
+# --- Query Tests ---
+
+def test_back_to_back_blocks_do_not_conflict():
+    index = ScheduleIndex([block("Monday", "09:00", "10:00", "A")])
+    assert index.conflicts(block("Monday", "10:00", "11:00")) == []
+    assert [b.title for b in index.conflicts(block("mon", "09:30", "10:30"))] == ["A"]
+
+def test_at_finds_blocks_in_progress():
+    late = block("Sunday", "22:00", "02:00", "Late shift")
+    index = ScheduleIndex([late, block("Monday", "09:00", "17:00", "Work")])
+    assert index.at("Monday", "01:30") == [late]
+    assert [b.title for b in index.at_datetime(datetime(2025, 1, 6, 12, 0))] == ["Work"] # a Monday
+    assert index.at("Monday", "17:00") == []
+
+def test_queries_match_a_linear_scan():
+    rng = random.Random(0)
+    blocks = []
+    for i in range(2000):
+        start = rng.randrange(24 * 60)
+        end = (start + rng.randrange(15, 600)) % (24 * 60)
+        blocks.append(block(rng.choice(WEEKDAYS), f"{start // 60:02d}:{start % 60:02d}",
+                            f"{end // 60:02d}:{end % 60:02d}", f"B{i}"))
+    index = ScheduleIndex(blocks)
+
+    def overlaps(a, b):
+        return any(s1 < e2 and s2 < e1 for s1, e1 in week_intervals(a) for s2, e2 in week_intervals(b))
+
+    for probe in blocks[:50]:
+        expected = {b.id for b in blocks if b.id != probe.id and overlaps(probe, b)}
+        assert {b.id for b in index.conflicts(probe)} == expected
+
+def test_ordered_follows_weekday_then_time():
+    index = ScheduleIndex([block("Wednesday", "09:00", "10:00", "W"), block("Friday", "08:00", "09:00", "F"),
+                           block("Monday", "13:00", "14:00", "M2"), block("Monday", "08:00", "09:00", "M1"),
+                           block("Someday", "08:00", "09:00", "?")])
+    assert [b.title for b in index.ordered()] == ["M1", "M2", "W", "F", "?"]
+
+# --- Manager Tests ---
+
+def test_add_work_schedule_rejects_conflict_unless_confirmed(tmp_path):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([block("Monday", "09:00", "10:00", "Standup")], 'schedule')
+    manager = PKMSTaskManager(data_manager=dm)
+
+    with patch('builtins.input', side_effect=["Review", "mon", "09:30", "10:30", "", "n"]):
+        manager.add_work_schedule()
+    assert len(manager.schedules) == 1
+
+    with patch('builtins.input', side_effect=["Review", "mon", "09:30", "10:30", "", "y"]):
+        manager.add_work_schedule()
+    assert manager.schedules[-1].day_of_week == "Monday"
+    assert len(dm.load_data(Schedule, 'schedule')) == 2
@@ -0,0 +1,197 @@
+import random
+from unittest.mock import patch
+
+import pytest
+
+from src.models import KnowledgeEntry, Task
+from src.data_manager import DataManager
+from src.related import related_entries
+from src.__main__ import PKMSTaskManager
+from src.search import InvertedIndex, tokenize, ranked_search, ALL_FIELDS
+from src.sharded_search import ShardedSearch
+
+# --- Fixtures ---
+
+@pytest.fixture
+def entries():
+    """A small corpus with overlapping terms."""
+    return [
+        KnowledgeEntry(title="Python packaging", content="Use uv to build wheels.", tags=["python", "tools"]),
+        KnowledgeEntry(title="Meeting notes", content="Discussed the Python deadline.", tags=["work"]),
+        KnowledgeEntry(title="Groceries", content="Eggs, milk, bread.", tags=["home"]),
+    ]
+
+@pytest.fixture
+def index(entries):
+    idx = InvertedIndex()
+    for entry in entries:
+        idx.add(entry)
+    return idx
+
+# --- Inverted Index Tests ---
+
+def test_tokenize_lowercases_and_splits_punctuation():
+    assert tokenize("Eggs, MILK.bread") == ["eggs", "milk", "bread"]
+
+def test_multi_word_query_intersects_postings(index, entries):
+    """Every query word must match; results keep insertion order."""
+    assert index.search("python") == entries[:2]
+    assert index.search("python deadline") == [entries[1]]
+    assert index.search("python groceries") == []
+
+def test_query_words_match_term_prefixes(index, entries):
+    """A partial word still finds entries, like the old substring search."""
+    assert index.search("pyth meet") == [entries[1]]
+
+def test_re_adding_an_entry_replaces_its_postings(index, entries):
+    entries[2].title = "Hardware store"
+    index.add(entries[2])
+    assert index.search("groceries") == []
+    assert index.search("hardware") == [entries[2]]
+
+def test_persisted_index_only_indexes_new_entries(index, entries, tmp_path):
+    """After a reload, sync tokenizes only entries the saved index has not seen."""
+    path = str(tmp_path / 'knowledge.index.json')
+    index.save(path)
+
+    new_entry = KnowledgeEntry(title="Python typing", content="Protocols", tags=[])
+    loaded = InvertedIndex.load(path)
+    assert loaded.sync(entries[1:] + [new_entry]) == 1
+    assert loaded.search("python") == [entries[1], new_entry]
+    assert len(loaded) == 3
+
+def test_sync_reindexes_entries_edited_since_the_index_was_saved(index, entries, tmp_path):
+    """A persisted index that missed an edit (e.g. a crash before exit) is corrected on load."""
+    path = str(tmp_path / 'knowledge.index.json')
+    index.save(path)
+
+    entries[2].title = "Hardware store"
+    loaded = InvertedIndex.load(path)
+    assert loaded.sync(entries) == 1
+    assert loaded.search("groceries") == []
+    assert loaded.search("hardware") == [entries[2]]
+
+# --- Ranked Search Tests ---
+
+def test_ranked_search_prefers_title_hits(index, entries):
+    """A title match outranks a content-only match for the same term."""
+    results = ranked_search(index, "python")
+    assert [entry for _, entry in results] == entries[:2]
+    assert results[0][0] > results[1][0]
+
+def test_ranked_search_scores_summaries(index, entries):
+    """Words that only appear in an AI summary are found by ranked search."""
+    entries[2].summary = "Weekly shopping list"
+    index.add(entries[2])
+    assert index.search("shopping") == []
+    assert [entry for _, entry in ranked_search(index, "shopping")] == [entries[2]]
+
+def test_ranked_search_paginates(index):
+    """limit/offset pages partition the ranked results without overlap."""
+    everything = [entry.id for _, entry in ranked_search(index, "python", limit=10)]
+    first = ranked_search(index, "python", limit=1)
+    second = ranked_search(index, "python", limit=1, offset=1)
+    assert [e.id for _, e in first + second] == everything
+    assert ranked_search(index, "python", limit=1, offset=2) == []
+
+def test_field_weights_change_the_order(index, entries):
+    """Zeroing the title weight lets the content match win."""
+    results = ranked_search(index, "python", field_weights={'title': 0.0, 'content': 5.0, 'tags': 0.0})
+    assert results[0][1] is entries[1]
+
+# --- Sharded Search Tests ---
+
+def test_sharded_search_matches_single_index():
+    """Shards scored with summed statistics rank exactly like one index, updates included."""
+    words = ["python", "deadline", "wheel", "notes", "bread", "pytest", "release"]
+    corpus = [KnowledgeEntry(title=f"{words[i % 7]} {i}", content=" ".join(words[(i * j) % 7] for j in range(i % 5 + 1)),
+                             tags=[words[i % 3]]) for i in range(60)]
+    single = InvertedIndex()
+    for entry in corpus:
+        single.add(entry)
+    sharded = ShardedSearch(corpus, shards=3, batch_size=7)
+    try:
+        corpus[4].summary = "python release notes"
+        single.add(corpus[4])
+        sharded.add(corpus[4])
+        for query in ("py", "python notes", "release", "missing"):
+            expected = [(round(score, 9), e.id) for score, e in ranked_search(single, query, limit=5, offset=2)]
+            actual = [(round(score, 9), entry_id) for score, entry_id in sharded.ranked(query, limit=5, offset=2)]
+            assert actual == expected
+            assert sharded.count(query) == len(single.search_docs(query, field_mask=ALL_FIELDS))
+    finally:
+        sharded.close()
+
+def test_sharded_pages_cost_one_round_each(entries):
+    """The count's statistics are reused by every page of the same query until entries change."""
+    sharded = ShardedSearch(entries, shards=2)
+    rounds = []
+    gather = sharded._gather
+    sharded._gather = lambda fn, *args: rounds.append(fn.__name__) or gather(fn, *args)
+    try:
+        assert sharded.count("python") == 2
+        assert len(sharded.ranked("python", limit=1) + sharded.ranked("python", limit=1, offset=1)) == 2
+        assert rounds == ['_stats', '_top', '_top']
+
+        sharded.add(KnowledgeEntry(title="Python again", content="", tags=[]))
+        assert sharded.count("python") == 3
+        assert rounds[-1] == '_stats'
+    finally:
+        sharded.close()
+
+def test_agent_cycle_in_sharded_mode_indexes_summaries_in_the_shards(tmp_path, entries):
+    """Summaries go to the shards; the single-process index is never built."""
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data(entries, 'pkm')
+    manager = PKMSTaskManager(data_manager=dm)
+    manager.search_shards = 2
+    try:
+        manager.load_search()
+        manager.run_agent_cycle()
+        summary_word = tokenize(dm.load_data(KnowledgeEntry, 'pkm')[2].summary)[0]
+        assert any(e.id == entries[2].id for _, e in manager.search_page(summary_word))
+        assert not manager._is_loaded('search_index')
+    finally:
+        manager.sharded_search.close()
+
+# --- Related Notes Tests ---
+
+def test_related_entries_rank_by_tfidf(index, entries):
+    """The note sharing the rarer task words comes first; unrelated notes are left out."""
+    results = related_entries(index, "Fix python deadline", k=5)
+    assert [e for _, e in results] == [entries[1], entries[0]]
+    assert related_entries(index, "nothing in common") == []
+
+def test_related_entries_numpy_and_python_paths_agree(monkeypatch):
+    """Same scores and order from both paths, including ties, repeated words and removed notes."""
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    words = [f"w{i}" for i in range(40)]
+    idx = InvertedIndex()
+    notes = []
+    for i in range(300):
+        notes.append(KnowledgeEntry(title=" ".join(rng.choices(words, k=3)),
+                                    content=" ".join(rng.choices(words, k=rng.randint(0, 30))),
+                                    tags=rng.sample(words, 2)))
+        if i % 50 == 0: # exact copies score the same; the earlier one ranks first
+            notes.append(KnowledgeEntry(title=notes[-1].title, content=notes[-1].content, tags=notes[-1].tags))
+    for note in notes:
+        idx.add(note)
+    for note in notes[::7]:
+        idx.remove(note.id)
+    queries = [" ".join(rng.choices(words, k=n)) for n in (1, 2, 4, 8, 8)] + ["w1 w1 w1 w2", "unknown w3"]
+
+    def ranked():
+        return [[(round(s, 9), e.id) for s, e in related_entries(idx, q, k=k)] for q in queries for k in (1, 5, 50)]
+
+    fast = ranked()
+    monkeypatch.setattr('src.related.np', None)
+    assert fast == ranked()
+
+def test_add_task_offers_related_notes_for_linking(tmp_path, entries):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data(entries, 'pkm')
+    manager = PKMSTaskManager(data_manager=dm)
+    with patch('builtins.input', side_effect=["Bake", "Buy bread and eggs", "2025-01-01", "1"]):
+        manager.add_task()
+    assert dm.load_data(Task, 'task')[0].knowledge_link_id == entries[2].id
@@ -0,0 +1,116 @@
+import pytest
+
+from src.models import KnowledgeEntry, Task, Schedule
+from src.data_manager import DataManager
+from src.sqlite_store import SQLiteDataManager, migrate_json_to_sqlite
+from src.__main__ import PKMSTaskManager
+
+# --- Fixtures ---
+
+@pytest.fixture
+def sqlite_manager(tmp_path):
+    """Provides a SQLiteDataManager backed by a temporary database."""
+    store = SQLiteDataManager(data_dir=str(tmp_path / '.data'))
+    yield store
+    store.close()
+
+# --- SQLite Backend Tests ---
+
+def test_sqlite_round_trip_all_models(sqlite_manager):
+    """Every model type survives a save/load cycle through SQLite."""
+    entry = KnowledgeEntry(title="Note", content="Body", tags=["a", "b"], is_summarized=True)
+    task = Task(title="Task", description="Desc", due_date="2025-01-01", knowledge_link_id=entry.id)
+    schedule = Schedule(title="Standup", day_of_week="Monday", start_time="09:00", end_time="09:15")
+    sqlite_manager.save_data([entry], 'pkm')
+    sqlite_manager.save_data([task], 'task')
+    sqlite_manager.save_data([schedule], 'schedule')
+
+    assert sqlite_manager.load_data(KnowledgeEntry, 'pkm')[0].to_dict() == entry.to_dict()
+    assert sqlite_manager.load_data(Task, 'task')[0].to_dict() == task.to_dict()
+    assert sqlite_manager.load_data(Schedule, 'schedule')[0].to_dict() == schedule.to_dict()
+
+def test_sqlite_update_keeps_load_order(sqlite_manager):
+    """Updating a record changes it in place instead of moving it to the end."""
+    tasks = [Task(title=t, description="", due_date="2025-01-01") for t in ("First", "Second", "Third")]
+    sqlite_manager.append_records(tasks, 'task')
+    tasks[0].status = "complete"
+    sqlite_manager.append_record(tasks[0], 'task')
+
+    loaded = sqlite_manager.load_data(Task, 'task')
+    assert [t.title for t in loaded] == ["First", "Second", "Third"]
+    assert loaded[0].status == "complete"
+    assert [t.title for t in sqlite_manager.iter_data(Task, 'task')] == ["First", "Second", "Third"]
+
+def test_sqlite_query_tasks_filters_in_sql(sqlite_manager):
+    """Status and prioritization filters are applied by the query."""
+    done = Task(title="Done", description="", due_date="2025-01-01", status="complete")
+    open_task = Task(title="Open", description="", due_date="2025-01-02")
+    ranked = Task(title="Ranked", description="", due_date="2025-01-03", is_prioritized=True)
+    sqlite_manager.append_records([done, open_task, ranked], 'task')
+
+    pending = sqlite_manager.query_tasks(Task, status="pending")
+    assert {t.title for t in pending} == {"Open", "Ranked"}
+    unranked = sqlite_manager.query_tasks(Task, status="pending", is_prioritized=False)
+    assert [t.title for t in unranked] == ["Open"]
+    assert sqlite_manager.find_task(Task, open_task.id[:8], status="pending").id == open_task.id
+    assert sqlite_manager.find_task(Task, done.id[:8], status="pending") is None
+
+def test_sqlite_priority_order_uses_rank_index(sqlite_manager):
+    """Priority ordering ranks high > medium > low (not alphabetically) via idx_tasks_order."""
+    tasks = [Task(title=p, description="", due_date="2025-01-01", priority=p) for p in ("medium", "low", "high")]
+    sqlite_manager.append_records(tasks, 'task')
+    ordered = sqlite_manager.query_tasks(Task, status="pending", order_by='priority')
+    assert [t.priority for t in ordered] == ["high", "medium", "low"]
+
+    from src.sqlite_store import TASK_ORDERINGS
+    plan = sqlite_manager.conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM tasks WHERE status = 'pending' ORDER BY {TASK_ORDERINGS['priority']} LIMIT 10"
+    ).fetchall()
+    assert any('idx_tasks_order' in row[-1] for row in plan)
+    assert not any('TEMP B-TREE' in row[-1] for row in plan)
+
+def test_manager_completes_task_through_sqlite(sqlite_manager, monkeypatch):
+    """complete_task resolves the prefix in SQL and persists the new status."""
+    task = Task(title="Ship it", description="", due_date="2025-01-01")
+    sqlite_manager.append_record(task, 'task')
+    manager = PKMSTaskManager(data_manager=sqlite_manager)
+    assert manager.tasks == []
+
+    monkeypatch.setattr('builtins.input', lambda _: task.id[:8])
+    manager.complete_task()
+    assert sqlite_manager.get_record(Task, 'task', task.id).status == "complete"
+
+def test_migrate_json_to_sqlite_applies_snapshot_and_journal(tmp_path):
+    """The migrator copies snapshot rows and replays journal updates."""
+    data_dir = str(tmp_path / '.data')
+    dm = DataManager(data_dir=data_dir)
+    tasks = [Task(title=f"Task {i}", description="", due_date="2025-01-01") for i in range(5)]
+    dm.save_data(tasks, 'task')
+    tasks[0].status = "complete"
+    dm.append_record(tasks[0], 'task')
+
+    applied = migrate_json_to_sqlite(data_dir, batch_size=2)
+    assert applied['task'] == 6
+
+    store = SQLiteDataManager(data_dir=data_dir)
+    assert store.count('task') == 5
+    assert store.get_record(Task, 'task', tasks[0].id).status == "complete"
+    store.close()
+
+def test_sqlite_keeps_large_bodies_in_the_content_store(tmp_path):
+    """Rows hold a content_ref into content.dat, also for bodies migrated from JSON."""
+    data_dir = str(tmp_path / '.data')
+    body = "x" * 10000
+    DataManager(data_dir=data_dir).save_data([KnowledgeEntry(title="Migrated", content=body)], 'pkm')
+    migrate_json_to_sqlite(data_dir, file_types=('pkm',))
+
+    store = SQLiteDataManager(data_dir=data_dir)
+    store.append_record(KnowledgeEntry(title="Added", content=body + "y"), 'pkm')
+    rows = store.conn.execute("SELECT title, content, content_ref FROM knowledge ORDER BY rowid").fetchall()
+    assert [(r['title'], r['content'], r['content_ref'] is not None) for r in rows] == [
+        ("Migrated", "", True), ("Added", "", True)]
+    store.close()
+
+    store = SQLiteDataManager(data_dir=data_dir)
+    assert [e.content for e in store.load_data(KnowledgeEntry, 'pkm')] == [body, body + "y"]
+    store.close()
@@ -0,0 +1,62 @@
+import random
+import time
+
+from src.models import Task
+from src.data_manager import DataManager
+from src.task_index import TaskOrderIndex, task_sort_key
+from src.__main__ import PKMSTaskManager
+
+def task(title, priority="medium", due_date="2025-01-01", status="pending"):
+    return Task(title=title, description="", due_date=due_date, priority=priority, status=status)
+
+# --- Ordering Tests ---
+
+def test_high_outranks_medium_then_due_date_breaks_ties():
+    index = TaskOrderIndex([
+        task("medium-early", "medium", "2025-01-01"),
+        task("high-late", "high", "2025-06-01"),
+        task("low", "low", "2025-01-01"),
+        task("high-no-date", "high", ""),
+        task("high-early", "high", "2025-02-01"),
+    ])
+    assert [t.title for t in index] == ["high-early", "high-late", "high-no-date", "medium-early", "low"]
+
+def test_updates_keep_order_and_drop_other_statuses():
+    rng = random.Random(0)
+    tasks = [task(f"T{i}", rng.choice(["low", "medium", "high"]), f"2025-{rng.randint(1, 12):02d}-01")
+             for i in range(3000)]
+    index = TaskOrderIndex(tasks[:1000])
+    for t in tasks[1000:]:
+        index.update(t)
+    for t in rng.sample(tasks, 500):
+        t.priority = rng.choice(["low", "medium", "high"])
+        index.update(t)
+    completed = rng.sample(tasks, 800)
+    for t in completed:
+        t.status = "complete"
+        index.update(t)
+
+    expected = sorted((t for t in tasks if t.status == "pending"), key=task_sort_key)
+    assert list(index) == expected
+    assert index.top(5) == expected[:5]
+    assert len(index) == len(expected)
+
+def test_top_n_ignores_completed_backlog():
+    index = TaskOrderIndex([task(f"Done {i}", status="complete") for i in range(100000)] +
+                           [task(f"Open {i}") for i in range(100)])
+    start = time.perf_counter()
+    top = index.top(10)
+    assert time.perf_counter() - start < 0.001
+    assert len(top) == 10 and len(index) == 100
+
+# --- Manager Tests ---
+
+def test_list_tasks_orders_by_priority_rank(tmp_path, capsys):
+    dm = DataManager(data_dir=str(tmp_path / '.data'))
+    dm.save_data([task("Medium", "medium"), task("High", "high"), task("Low", "low")], 'task')
+    manager = PKMSTaskManager(data_manager=dm)
+    capsys.readouterr()
+
+    manager.list_tasks("pending", limit=2)
+    lines = [l for l in capsys.readouterr().out.splitlines() if l[:1].isdigit()]
+    assert [l.split("]")[1].split("(")[0].strip() for l in lines] == ["High", "Medium"]